@@ -5,15 +5,42 @@ from queue import Queue
 from langchain_core.runnables import RunnableConfig  
 from app.core.base import BaseNode
 from app.core.env_model import Env
+from app.core.context import run_config, current_cancel_token
+from app.core.graph_registry import graph_registry, get_graph, release_thread
+from app.core.metrics import registry
+from app.core.tracing import current_span, span, use_span
 
 from app.analyst_agent.state import ReportState
 from app.analyst_agent.transcript_analyst_node import TranscriptAnalystNode
-from app.analyst_agent.react_code_agent import react_code_agent, AgentContextState
+from app.analyst_agent.react_code_agent import AgentContextState
 from app.analyst_agent.metric_insight_node import MetricInsightNode
 from app.analyst_agent.analysis_planner_node import AnalysisPlannerNode
 from app.analyst_agent.data_extractor_node import DataExtractorNode
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, Any, Tuple
+from functools import partial, lru_cache
+import os
+import uuid
+
+
+@lru_cache(maxsize=None)
+def get_metric_executor() -> ThreadPoolExecutor:
+    '''Metric pipelines of every analysis share this pool (ANALYSIS_METRIC_WORKERS, default 4).'''
+    return ThreadPoolExecutor(
+        max_workers=int(os.environ.get("ANALYSIS_METRIC_WORKERS", 4)),
+        thread_name_prefix="metric-pipeline",
+    )
+
+
+def _collect_metric_pool():
+    if get_metric_executor.cache_info().currsize == 0:
+        return
+    # ThreadPoolExecutor has no public queue size; _work_queue holds submitted, not yet started metrics
+    depth = get_metric_executor()._work_queue.qsize()
+    yield "transcript_metric_pool_queue_depth", "gauge", "Metric pipelines waiting for a pool thread.", [({}, depth)]
+
+
+registry.add_collector(_collect_metric_pool)
 
 
 class MetricInsightSchedulingNode(BaseNode):
@@ -21,9 +48,8 @@ class MetricInsightSchedulingNode(BaseNode):
         super().__init__(verbose=verbose, track_time=track_time, queue=queue, env=env)
         self.verbose = verbose
         self.track_time = track_time
-        self.queue = queue
-        self.env = env
         self.name = "Extracting Table and Chart."
+        self.insight_node = MetricInsightNode(verbose=verbose, track_time=track_time, queue=None, env=env)
         
     def run(self, state: ReportState):
         report_plan = []
@@ -90,46 +116,64 @@ class MetricInsightSchedulingNode(BaseNode):
             """Run react_code_agent then MetricInsightNode for a single metric.
             Returns (metric_id, { 'insight': MetricInsightv2, 'cost': float })."""
             metric_id = getattr(metric_spec, 'id', None) or metric_spec.model_dump().get('id', '')
-            # 1) Run code agent
-            # Suppress per-metric event emission; keep logs intact
-            graph = react_code_agent(verbose=self.verbose, track_time=self.track_time, queue=None, env=self.env)
-            cfg = RunnableConfig(thread_id=f"{state['run_id']}:{metric_id}", max_iterations=30)
-            inputs = build_agent_input(metric_spec)
-            agent_result: AgentContextState = graph.invoke(input=inputs, config=cfg)
-            agent_cost = float(agent_result.get('cost', 0.0)) if isinstance(agent_result, dict) else getattr(agent_result, 'cost', 0.0)
-
-            # 2) Run insight node using agent outputs
-            csv_path = agent_result.get('csv_path', '') if isinstance(agent_result, dict) else getattr(agent_result, 'csv_path', '')
-            chart_path = agent_result.get('img_path', '') if isinstance(agent_result, dict) else getattr(agent_result, 'img_path', '')
-            status = agent_result.get('status', {'status': 'unknown', 'message': ''}) if isinstance(agent_result, dict) else getattr(agent_result, 'status', {'status': 'unknown', 'message': ''})
-
-            insight_input = {
-                'csv_path': csv_path,
-                'chart_path': chart_path,
-                'metric_spec': metric_spec,
-                'analyst': state['analyst'],
-                'run_id': state['run_id'],
-                'metric_id': metric_id,
-                'cost': 0.0,
-                'message': getattr(status, 'message', status.get('message', '') if isinstance(status, dict) else ''),
-            }
+            with use_span(parent_span), span(f"metric {metric_id}", kind="metric", metric_id=metric_id):
+                # 1) Run code agent (shared compiled graph)
+                # Suppress per-metric event emission; keep logs intact
+                graph = get_graph("react_code_agent")
+                # shared checkpointer: run_id(초 단위)와 metric_id만으로는 동시에 시작한 다른 분석과 겹치므로 uuid를 붙인다
+                cfg = run_config(queue=None, env=env, cancel=cancel, thread_id=f"{state['run_id']}:{metric_id}:{uuid.uuid4().hex}", max_iterations=30)
+                inputs = build_agent_input(metric_spec)
+                try:
+                    with span("react_code_agent", kind="graph"):
+                        agent_result: AgentContextState = graph.invoke(input=inputs, config=cfg)
+                finally:
+                    release_thread(graph, cfg)
+                agent_cost = float(agent_result.get('cost', 0.0)) if isinstance(agent_result, dict) else getattr(agent_result, 'cost', 0.0)
 
-            insight_node = MetricInsightNode(verbose=self.verbose, track_time=self.track_time, queue=None, env=self.env)
-            insight_result = insight_node(insight_input)
-            total_cost = agent_cost + float(insight_result.get('cost', 0.0))
-            return metric_id, {
-                'insight': insight_result.get('metric_insight'),
-                'cost': total_cost,
-            }
+                # 2) Run insight node using agent outputs
+                csv_path = agent_result.get('csv_path', '') if isinstance(agent_result, dict) else getattr(agent_result, 'csv_path', '')
+                chart_path = agent_result.get('img_path', '') if isinstance(agent_result, dict) else getattr(agent_result, 'img_path', '')
+                status = agent_result.get('status', {'status': 'unknown', 'message': ''}) if isinstance(agent_result, dict) else getattr(agent_result, 'status', {'status': 'unknown', 'message': ''})
+
+                insight_input = {
+                    'csv_path': csv_path,
+                    'chart_path': chart_path,
+                    'metric_spec': metric_spec,
+                    'analyst': state['analyst'],
+                    'run_id': state['run_id'],
+                    'metric_id': metric_id,
+                    'cost': 0.0,
+                    'message': getattr(status, 'message', status.get('message', '') if isinstance(status, dict) else ''),
+                }
+
+                insight_result = self.insight_node(insight_input, config=cfg)
+                total_cost = agent_cost + float(insight_result.get('cost', 0.0))
+                return metric_id, {
+                    'insight': insight_result.get('metric_insight'),
+                    'cost': total_cost,
+                }
 
+        # worker thread에는 contextvars가 전달되지 않으므로 env / cancel token / trace span을 꺼내 넘긴다
+        env = self.env
+        cancel = current_cancel_token()
+        parent_span = current_span()
         metrics = state['metric_plan']
         total = len(metrics)
-        max_workers = min(4, max(1, total))
         results_by_id: Dict[str, Dict[str, Any]] = {}
 
-        with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            future_map = {executor.submit(run_full_pipeline_for_metric, spec): spec for spec in metrics}
-            completed = 0
+        # Process-wide metric pool shared by all analyses (bounded thread count under bursts)
+        executor = get_metric_executor()
+        future_map = {executor.submit(run_full_pipeline_for_metric, spec): spec for spec in metrics}
+
+        # On cancel, drop metrics still waiting for a pool thread; running ones stop at their next node
+        def cancel_pending():
+            for future in future_map:
+                future.cancel()
+
+        if cancel is not None:
+            cancel.add_callback(cancel_pending)
+        completed = 0
+        try:
             for future in as_completed(future_map):
                 spec = future_map[future]
                 metric_id = getattr(spec, 'id', None) or spec.model_dump().get('id', '')
@@ -138,11 +182,17 @@ class MetricInsightSchedulingNode(BaseNode):
                     results_by_id[metric_id] = result_bundle
                 except Exception as e:
                     # In case of failure, create a minimal error-like result
-                    self.logger.error(f"react_code_agent failed for metric {metric_id}: {e}")
+                    if cancel is None or not cancel.cancelled:
+                        self.logger.error(f"react_code_agent failed for metric {metric_id}: {e}")
                     results_by_id[metric_id] = {'insight': None, 'cost': 0.0}
                 finally:
                     completed += 1
                     self.emit_event("progress", completed=completed, total=total, metric_id=metric_id)
+        finally:
+            if cancel is not None:
+                cancel.remove_callback(cancel_pending)
+        if cancel is not None:
+            cancel.raise_if_cancelled()
 
         for metric_spec in metrics:
             metric_id = getattr(metric_spec, 'id', None) or metric_spec.model_dump().get('id', '')
@@ -173,3 +223,6 @@ def transcript_analyst_graph(verbose: bool = False, track_time: bool = False, qu
     report_graph.add_edge("transcript_analyst", END)
     memory = MemorySaver()
     return report_graph.compile(checkpointer=memory)
+
+
+graph_registry.register("transcript_analyst", partial(transcript_analyst_graph, verbose=True, track_time=True))
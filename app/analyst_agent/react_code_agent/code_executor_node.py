@@ -9,6 +9,7 @@ import matplotlib.pyplot as plt
 from app.analyst_agent.react_code_agent.state import DataFrameState, ChartState, Status
 from app.core.base import BaseNode
 from app.core.util import is_alert
+from app.core.tracing import span
 from langgraph.types import Command
 from langgraph.graph import END
 import matplotlib as mpl
@@ -139,10 +140,13 @@ class DataFrameCodeExecutorNode(BaseNode):
             g_env = self._create_exec_env_for_df(registry, artifact_dir, dataset)  # offer save_df
             # l_env: Dict[str, Any] = {}
             
-            with redirect_stdout(stdout_stream), redirect_stderr(stderr_stream):
+            with redirect_stdout(stdout_stream), redirect_stderr(stderr_stream), \
+                    span("exec df_code", kind="exec", attempt=state.get("attempts", 0) + 1) as exec_span:
                 try:
                     exec(code, g_env, g_env)
-                except Exception:
+                except Exception as e:
+                    if exec_span is not None:
+                        exec_span.fail(e)
                     err = traceback.format_exc()
                     errors.append(err)
                     error_log = err  # ← 전체 traceback 저장
@@ -371,11 +375,14 @@ class ChartCodeExecutorNode(BaseNode):
                 self.logger.debug("Executing chart_code …")
 
                 with redirect_stdout(stdout_stream), redirect_stderr(stderr_stream):
-                    with warnings.catch_warnings(record=True) as warning_list:
+                    with warnings.catch_warnings(record=True) as warning_list, \
+                            span("exec chart_code", kind="exec", attempt=state.get("attempts", 0) + 1) as exec_span:
                         warnings.simplefilter("always")
                         try:
                             exec(code, g_env, l_env)
-                        except Exception:
+                        except Exception as e:
+                            if exec_span is not None:
+                                exec_span.fail(e)
                             errors.append(traceback.format_exc())
                             error_log = "Chart exec failed"
                             self.logger.exception("Chart execution failed")
@@ -3,6 +3,7 @@ from app.analyst_agent.react_code_agent.router_node import RouterNode
 from app.analyst_agent.react_code_agent.code_generator_node import DataFrameCodeGeneratorNode, ChartCodeGeneratorNode
 from app.analyst_agent.react_code_agent.state import AgentContextState, DataFrameState, ChartState, Status
 from typing import Dict, Any
+from functools import partial
 from langgraph.graph import StateGraph, END, START
 from langgraph.graph.state import CompiledStateGraph
 from langgraph.checkpoint.memory import MemorySaver  
@@ -10,6 +11,8 @@ from queue import Queue
 from langchain_core.runnables import RunnableConfig  
 from app.core.base import BaseNode
 from app.core.env_model import Env
+from app.core.graph_registry import graph_registry, get_graph
+from app.core.tracing import span
 
 
 #TODO bring csv file path and create methods to read csv file in codeexecutornode.
@@ -23,7 +26,8 @@ class ChartAgentExecutorNode(BaseNode):
     
     def run(self, state: AgentContextState):
         config = RunnableConfig(recursion_limit=5) 
-        chart_graph = chart_code_react_agent(queue=self.queue, env=self.env)
+        # 공유 compile된 graph, queue/env는 부모 config(RunContext)를 따라간다
+        chart_graph = get_graph("chart_code_react_agent")
 
         user_query = state['user_query']
         df_name = state['df_name']
@@ -63,10 +67,11 @@ class ChartAgentExecutorNode(BaseNode):
         self.logger.debug("Invoking chart_code_react_agent …")
         self.logger.debug(f"chart_code_react_agent input preview: {input_values}")
 
-        result : ChartState = chart_graph.invoke(
-            input=input_values,
-            config=config
-            )
+        with span("chart_code_react_agent", kind="graph"):
+            result : ChartState = chart_graph.invoke(
+                input=input_values,
+                config=config
+                )
         img_path = result['img_path']
         chart_desc = result['chart_desc']
         chart_name = result['chart_name']
@@ -90,7 +95,7 @@ class DataFrameAgentExecutorNode(BaseNode):
     def run(self, state: AgentContextState):
         
         config = RunnableConfig(recursion_limit=5) 
-        df_graph = df_code_react_agent(queue=self.queue, env=self.env)
+        df_graph = get_graph("df_code_react_agent")
 
         DEFAULT_DATAFRAME_STATE = {
             "user_query": "",
@@ -121,10 +126,11 @@ class DataFrameAgentExecutorNode(BaseNode):
             "run_id": state["run_id"],
             "cost": state["cost"],
         }
-        result : DataFrameState = df_graph.invoke(
-            input=input_values,
-            config=config
-            )
+        with span("df_code_react_agent", kind="graph"):
+            result : DataFrameState = df_graph.invoke(
+                input=input_values,
+                config=config
+                )
         ''' output format
         df_code: str = Field(..., description="Python code to generate the DataFrame")
         df_name: str = Field(..., description="DataFrame name")
@@ -211,3 +217,8 @@ def check_next_action(state: Dict[str, Any]) -> str:
     elif next_action == "finish":
         print("---CODE AGENT FINISH---")
         return "finish"
+
+
+graph_registry.register("chart_code_react_agent", chart_code_react_agent)
+graph_registry.register("df_code_react_agent", df_code_react_agent)
+graph_registry.register("react_code_agent", partial(react_code_agent, verbose=True, track_time=True))
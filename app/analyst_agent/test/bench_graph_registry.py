@@ -0,0 +1,68 @@
+import os
+import time
+import argparse
+
+# ChatOpenAI는 생성 시점에 key만 확인한다 (네트워크 호출 없음)
+os.environ.setdefault("OPENAI_API_KEY", "bench")
+os.environ.setdefault("UPSTAGE_API_KEY", "bench")
+
+from app.core.graph_registry import graph_registry  # noqa: E402
+from app.analyst_agent.graph import transcript_analyst_graph  # noqa: E402
+from app.analyst_agent.metric_insight_node import MetricInsightNode  # noqa: E402
+from app.analyst_agent.react_code_agent.graph import (  # noqa: E402
+    react_code_agent, chart_code_react_agent, df_code_react_agent,
+)
+from app.parser.graph import transcript_extract_graph, ocr_grade_extractor_graph  # noqa: E402
+
+
+def bench(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="per-request graph build/compile vs shared graph registry")
+    parser.add_argument("--metrics", type=int, default=5, help="metrics per analysis")
+    parser.add_argument("--loops", type=int, default=2, help="df/chart agent invocations per metric")
+    args = parser.parse_args()
+
+    builds = {
+        "transcript_analyst": lambda: transcript_analyst_graph(verbose=True, track_time=True),
+        "react_code_agent": lambda: react_code_agent(track_time=True),
+        "df_code_react_agent": df_code_react_agent,
+        "chart_code_react_agent": chart_code_react_agent,
+        "metric_insight_node": lambda: MetricInsightNode(env=None),
+        "transcript_extract": transcript_extract_graph,
+        "ocr_grade_extractor": ocr_grade_extractor_graph,
+    }
+    cost = {name: bench(fn) for name, fn in builds.items()}
+
+    print(f"{'graph':>24} {'build+compile':>14}")
+    for name, seconds in cost.items():
+        print(f"{name:>24} {seconds * 1e3:>12.1f}ms")
+
+    # 이전 /analyze: analyst graph 1번 + metric마다 react agent, insight node, loop마다 df/chart agent를 새로 build
+    per_analysis = cost["transcript_analyst"] + args.metrics * (
+        cost["react_code_agent"] + cost["metric_insight_node"]
+        + args.loops * (cost["df_code_react_agent"] + cost["chart_code_react_agent"])
+    )
+    per_upload = cost["transcript_extract"] + cost["ocr_grade_extractor"]
+
+    graph_registry.warmup()
+    lookups = ["transcript_analyst"] + args.metrics * (
+        ["react_code_agent"] + args.loops * ["df_code_react_agent", "chart_code_react_agent"]
+    )
+    shared = bench(lambda: [graph_registry.get(name) for name in lookups])
+
+    print()
+    print(f"/analyze ({args.metrics} metrics x {args.loops} loops): rebuilt {per_analysis * 1e3:.1f}ms, shared registry {shared * 1e3:.3f}ms")
+    print(f"/upload: rebuilt {per_upload * 1e3:.1f}ms, shared registry ~0ms")
+    print(f"one-time warmup: {sum(graph_registry.compile_seconds.values()) * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,372 @@
+import argparse
+import asyncio
+import json
+import os
+import random
+from abc import ABC, abstractmethod
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Set
+from urllib.parse import urlparse
+
+
+# session에 subscriber가 하나도 남지 않음 / session의 run 취소 요청
+IDLE, CANCEL = "idle", "cancel"
+
+
+class Subscription:
+    '''
+    WebSocket 하나의 bounded 전송 buffer.
+
+    - deliver()는 event loop thread에서 block 없이 호출 (producer는 socket 속도를 기다리지 않음)
+    - buffer가 가득 차면 가장 오래된 message를 버린다 (마지막 eof는 항상 남음)
+    '''
+    def __init__(self, session_id: str, max_buffer: int = 256):
+        self.session_id = session_id
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max(1, max_buffer))
+        self.dropped = 0
+
+    def deliver(self, message: str):
+        if self._queue.full():
+            self._queue.get_nowait()
+            self.dropped += 1
+        self._queue.put_nowait(message)
+
+    async def get(self) -> str:
+        return await self._queue.get()
+
+
+class Broker(ABC):
+    '''
+    session_id 단위 pub/sub.
+
+    - publish(): session의 모든 subscriber(여러 탭, 여러 worker)에게 전달
+    - signal(): 모든 worker의 listener에 control signal 전달 (IDLE, CANCEL)
+    - subscriber가 없어지면 IDLE signal을 보낸다 (연결 종료에 따른 run 취소용)
+    '''
+    @abstractmethod
+    async def publish(self, session_id: str, message: str) -> bool:
+        pass
+
+    @abstractmethod
+    async def subscribe(self, session_id: str, max_buffer: int = 256) -> Subscription:
+        pass
+
+    @abstractmethod
+    async def unsubscribe(self, subscription: Subscription):
+        pass
+
+    @abstractmethod
+    async def signal(self, session_id: str, kind: str):
+        pass
+
+    @abstractmethod
+    def add_signal_listener(self, listener: Callable[[str, str], None]):
+        pass
+
+    async def close(self):
+        pass
+
+
+class InProcessBroker(Broker):
+    '''단일 process(uvicorn worker 1개)용 broker'''
+    def __init__(self):
+        self._subscriptions: Dict[str, Set[Subscription]] = {}
+        self._listeners: List[Callable[[str, str], None]] = []
+
+    def _deliver(self, session_id: str, message: str) -> int:
+        subscriptions = self._subscriptions.get(session_id, ())
+        for subscription in subscriptions:
+            subscription.deliver(message)
+        return len(subscriptions)
+
+    def _notify(self, session_id: str, kind: str):
+        for listener in self._listeners:
+            try:
+                listener(session_id, kind)
+            except Exception:
+                pass
+
+    def _add(self, subscription: Subscription) -> bool:
+        '''session의 첫 subscriber이면 True'''
+        subscriptions = self._subscriptions.setdefault(subscription.session_id, set())
+        subscriptions.add(subscription)
+        return len(subscriptions) == 1
+
+    def _remove(self, subscription: Subscription) -> bool:
+        '''session의 마지막 subscriber였으면 True'''
+        subscriptions = self._subscriptions.get(subscription.session_id)
+        if not subscriptions or subscription not in subscriptions:
+            return False
+        subscriptions.discard(subscription)
+        if subscriptions:
+            return False
+        self._subscriptions.pop(subscription.session_id, None)
+        return True
+
+    async def publish(self, session_id: str, message: str) -> bool:
+        return self._deliver(session_id, message) > 0
+
+    async def subscribe(self, session_id: str, max_buffer: int = 256) -> Subscription:
+        subscription = Subscription(session_id, max_buffer)
+        self._add(subscription)
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription):
+        if self._remove(subscription):
+            self._notify(subscription.session_id, IDLE)
+
+    async def signal(self, session_id: str, kind: str):
+        self._notify(session_id, kind)
+
+    def add_signal_listener(self, listener: Callable[[str, str], None]):
+        self._listeners.append(listener)
+
+
+class TcpBroker(InProcessBroker):
+    '''
+    BrokerServer에 붙는 broker (여러 uvicorn worker가 같은 server를 공유).
+
+    - worker 안의 subscriber fan-out은 InProcessBroker와 같고, session의 첫/마지막 subscriber일 때만 server에 sub/unsub
+    - publish / signal은 server를 거쳐 (자기 자신을 포함한) 모든 worker로 전달
+    - 연결은 background task가 유지: 끊기거나 연결에 실패하면 jitter backoff 후 다시 연결하고
+      열려 있는 session을 모두 다시 subscribe (publish가 없는 session도 복구된다)
+    - 연결이 없는 동안 publish / signal은 기다리지 않고 바로 실패 처리
+    '''
+    def __init__(self, host: str = "127.0.0.1", port: int = 8790, reconnect_base: float = 0.2, reconnect_max: float = 5.0):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.reconnect_base = reconnect_base
+        self.reconnect_max = reconnect_max
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+        # 첫 연결 시도가 끝났는지 (그 전의 호출만 연결을 기다린다)
+        self._attempted: Optional[asyncio.Event] = None
+        self._closed = False
+
+    def _start(self):
+        if self._task is None or self._task.done():
+            self._attempted = asyncio.Event()
+            self._task = asyncio.ensure_future(self._run())
+
+    def _backoff(self, attempt: int) -> float:
+        # full jitter
+        return random.uniform(0, min(self.reconnect_max, self.reconnect_base * (2 ** attempt)))
+
+    async def _run(self):
+        attempt = 0
+        while not self._closed:
+            try:
+                reader, writer = await asyncio.open_connection(self.host, self.port)
+            except OSError:
+                self._attempted.set()
+                attempt += 1
+                await asyncio.sleep(self._backoff(attempt))
+                continue
+            self._writer = writer
+            attempt = 0
+            try:
+                for session_id in self._subscriptions:
+                    self._write({"op": "sub", "session": session_id})
+                self._attempted.set()
+                await writer.drain()
+                await self._read_loop(reader)
+            except (ConnectionError, OSError):
+                pass
+            finally:
+                self._writer = None
+                writer.close()
+            attempt += 1
+            await asyncio.sleep(self._backoff(attempt))
+
+    async def _connection(self) -> asyncio.StreamWriter:
+        self._start()
+        await self._attempted.wait()
+        writer = self._writer
+        if writer is None or writer.is_closing():
+            raise ConnectionError(f"event broker {self.host}:{self.port} is not connected")
+        return writer
+
+    def _write(self, payload: dict):
+        self._writer.write(json.dumps(payload, ensure_ascii=False).encode() + b"\n")
+
+    async def _send(self, payload: dict):
+        writer = await self._connection()
+        writer.write(json.dumps(payload, ensure_ascii=False).encode() + b"\n")
+        await writer.drain()
+
+    async def _read_loop(self, reader: asyncio.StreamReader):
+        '''연결이 끊기면 return (다시 연결은 _run이 한다)'''
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    return
+                payload = json.loads(line)
+                if payload.get("op") == "msg":
+                    self._deliver(payload["session"], payload["message"])
+                elif payload.get("op") == "signal":
+                    self._notify(payload["session"], payload["kind"])
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+
+    async def publish(self, session_id: str, message: str) -> bool:
+        try:
+            await self._send({"op": "pub", "session": session_id, "message": message})
+            return True
+        except (ConnectionError, OSError):
+            return False
+
+    async def subscribe(self, session_id: str, max_buffer: int = 256) -> Subscription:
+        subscription = Subscription(session_id, max_buffer)
+        if self._add(subscription):
+            try:
+                await self._send({"op": "sub", "session": session_id})
+            except (ConnectionError, OSError):
+                pass  # 다시 연결될 때 복구
+        return subscription
+
+    async def unsubscribe(self, subscription: Subscription):
+        # IDLE은 모든 worker의 subscriber를 아는 server가 보낸다
+        if self._remove(subscription):
+            try:
+                await self._send({"op": "unsub", "session": subscription.session_id})
+            except (ConnectionError, OSError):
+                pass
+
+    async def signal(self, session_id: str, kind: str):
+        try:
+            await self._send({"op": "signal", "session": session_id, "kind": kind})
+        except (ConnectionError, OSError):
+            self._notify(session_id, kind)
+
+    async def close(self):
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+
+
+class _BrokerClient:
+    def __init__(self, writer: asyncio.StreamWriter, max_buffer: int):
+        self.writer = writer
+        self.sessions: Set[str] = set()
+        self.outbox: asyncio.Queue = asyncio.Queue(maxsize=max_buffer)
+        self.dropped = 0
+
+    def send(self, payload: dict):
+        if self.outbox.full():
+            self.outbox.get_nowait()
+            self.dropped += 1
+        self.outbox.put_nowait(json.dumps(payload, ensure_ascii=False).encode() + b"\n")
+
+    async def pump(self):
+        while True:
+            self.writer.write(await self.outbox.get())
+            await self.writer.drain()
+
+
+class BrokerServer:
+    '''
+    TcpBroker들이 공유하는 local broker (newline-delimited JSON over TCP).
+
+        uv run python -m app.api.broker --port 8790
+
+    - client(worker)마다 bounded outbox를 두어 느린 worker 하나가 다른 worker로의 전달을 막지 않는다
+    - session의 마지막 subscriber가 빠지면 모든 client에 IDLE signal
+    '''
+    def __init__(self, host: str = "127.0.0.1", port: int = 8790, client_buffer: int = 10000):
+        self.host = host
+        self.port = port
+        self.client_buffer = client_buffer
+        self._clients: Set[_BrokerClient] = set()
+        self._sessions: Dict[str, Set[_BrokerClient]] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    def _broadcast_signal(self, session_id: str, kind: str):
+        for client in self._clients:
+            client.send({"op": "signal", "session": session_id, "kind": kind})
+
+    def _unsubscribe(self, client: _BrokerClient, session_id: str):
+        client.sessions.discard(session_id)
+        subscribers = self._sessions.get(session_id)
+        if subscribers is None or client not in subscribers:
+            return
+        subscribers.discard(client)
+        if not subscribers:
+            self._sessions.pop(session_id, None)
+            self._broadcast_signal(session_id, IDLE)
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        client = _BrokerClient(writer, self.client_buffer)
+        self._clients.add(client)
+        pump = asyncio.ensure_future(client.pump())
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                payload = json.loads(line)
+                op, session_id = payload.get("op"), payload.get("session")
+                if op == "pub":
+                    message = {"op": "msg", "session": session_id, "message": payload.get("message")}
+                    for subscriber in self._sessions.get(session_id, ()):
+                        subscriber.send(message)
+                elif op == "sub":
+                    client.sessions.add(session_id)
+                    self._sessions.setdefault(session_id, set()).add(client)
+                elif op == "unsub":
+                    self._unsubscribe(client, session_id)
+                elif op == "signal":
+                    self._broadcast_signal(session_id, payload.get("kind"))
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            self._clients.discard(client)
+            for session_id in list(client.sessions):
+                self._unsubscribe(client, session_id)
+            pump.cancel()
+            writer.close()
+
+
+@lru_cache(maxsize=None)
+def get_broker() -> Broker:
+    '''
+    EVENT_BROKER_URL이 없거나 "memory"이면 InProcessBroker, "tcp://host:port"이면 TcpBroker
+    '''
+    url = os.environ.get("EVENT_BROKER_URL", "memory")
+    if url in ("", "memory"):
+        return InProcessBroker()
+    parsed = urlparse(url)
+    if parsed.scheme != "tcp":
+        raise ValueError(f"Unsupported EVENT_BROKER_URL: {url}")
+    return TcpBroker(parsed.hostname or "127.0.0.1", parsed.port or 8790)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="local event broker for multi-worker WebSocket fan-out")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8790)
+    args = parser.parse_args()
+
+    async def serve():
+        server = BrokerServer(args.host, args.port)
+        await server.start()
+        print(f"event broker listening on {server.host}:{server.port}")
+        await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    main()
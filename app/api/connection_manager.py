@@ -1,33 +1,74 @@
 from fastapi import WebSocket
-from typing import Dict
+from typing import Dict, Optional, Set
+import os
+from app.core.context import CancelToken
+from .broker import Broker, Subscription, IDLE, CANCEL, get_broker
 
 class ConnectionManager:
     '''
-    Manage multiple WebSocket clients using session_id as the key.
-    
-    - connect(): Accepts a new WebSocket and registers it with the given session_id.
-    - disconnect(): Removes the WebSocket associated with the session_id.
-    - send_to(): Sends a message to the specific WebSocket associated with the session_id.
+    Manage WebSocket clients per session_id through a pub/sub Broker.
+
+    - connect(): Accepts a new WebSocket and subscribes it to the session (several tabs / workers may subscribe to the same session).
+    - pump(): Sends the subscription's buffered messages to its WebSocket until the socket closes.
+    - disconnect(): Unsubscribes the WebSocket. When the session has no subscriber left on any worker, runs that follow the connection are cancelled.
+    - send_to(): Publishes a message to every subscriber of the session without waiting for slow sockets.
+    - add_run() / remove_run() / cancel_runs(): Track the CancelToken of in-flight graph runs per session.
     '''
-    def __init__(self):
-        self.active_connections: Dict[str, WebSocket] = {}
+    def __init__(self, broker: Optional[Broker] = None, send_buffer: Optional[int] = None):
+        self._broker = broker
+        self.send_buffer = send_buffer or int(os.environ.get("WS_SEND_BUFFER", 256))
+        self.active_connections: Dict[str, Set[WebSocket]] = {}
+        # session_id -> {token: cancel_on_disconnect}
+        self.active_runs: Dict[str, Dict[CancelToken, bool]] = {}
 
-    async def connect(self, websocket: WebSocket, session_id: str):
-        await websocket.accept()
-        self.active_connections[session_id] = websocket
+    @property
+    def broker(self) -> Broker:
+        if self._broker is None:
+            self._broker = get_broker()
+            self._broker.add_signal_listener(self._on_signal)
+        return self._broker
 
-    def disconnect(self, session_id: str):
-        self.active_connections.pop(session_id, None)
+    def _on_signal(self, session_id: str, kind: str):
+        for token, cancel_on_disconnect in list(self.active_runs.get(session_id, {}).items()):
+            if kind == CANCEL:
+                token.cancel("cancelled by client")
+            elif kind == IDLE and cancel_on_disconnect:
+                token.cancel("websocket disconnected")
 
-    async def send_to(self, session_id: str, message: str) -> bool:
-        websocket = self.active_connections.get(session_id)
-        if not websocket:
-            return False
+    async def connect(self, websocket: WebSocket, session_id: str) -> Subscription:
+        await websocket.accept()
+        self.active_connections.setdefault(session_id, set()).add(websocket)
+        return await self.broker.subscribe(session_id, self.send_buffer)
+
+    async def pump(self, websocket: WebSocket, subscription: Subscription):
         try:
-            await websocket.send_text(message)
-            return True
+            while True:
+                await websocket.send_text(await subscription.get())
         except Exception:
-            self.disconnect(session_id)
-            return False
+            # socket이 닫히면 receive 쪽에서 disconnect 처리
+            pass
+
+    async def disconnect(self, session_id: str, websocket: WebSocket, subscription: Subscription):
+        sockets = self.active_connections.get(session_id, set())
+        sockets.discard(websocket)
+        if not sockets:
+            self.active_connections.pop(session_id, None)
+        await self.broker.unsubscribe(subscription)
+
+    def add_run(self, session_id: str, token: CancelToken, cancel_on_disconnect: bool = True):
+        self.active_runs.setdefault(session_id, {})[token] = cancel_on_disconnect
+
+    def remove_run(self, session_id: str, token: CancelToken):
+        runs = self.active_runs.get(session_id, {})
+        runs.pop(token, None)
+        if not runs:
+            self.active_runs.pop(session_id, None)
+
+    async def cancel_runs(self, session_id: str):
+        '''run이 다른 worker에 있을 수 있으므로 broker를 통해 모든 worker에 취소를 알린다'''
+        await self.broker.signal(session_id, CANCEL)
+
+    async def send_to(self, session_id: str, message: str) -> bool:
+        return await self.broker.publish(session_id, message)
 
-manager = ConnectionManager()
\ No newline at end of file
+manager = ConnectionManager()
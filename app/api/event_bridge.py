@@ -0,0 +1,123 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Callable, Optional, Union
+
+from app.core.context import CancelToken, RunCancelled
+from .connection_manager import ConnectionManager, manager as default_manager
+from .job_executor import JobExecutor
+
+
+_DONE = object()
+
+
+class GraphEventBridge:
+    '''
+    worker thread에서 실행되는 graph의 node event를 WebSocket으로 바로 전달하는 bridge.
+
+    - node에는 queue 대신 이 객체를 넘긴다 (put()만 사용). put()은 thread-safe하게 asyncio.Queue로 넘긴다
+    - run()은 graph 함수를 thread에서 실행하면서 event가 들어오는 즉시 전송 (polling 없음)
+    - keepalive_sec 동안 보낸 event가 없으면 {"event": "keepalive"}, 끝나면 {"event": "eof"}
+    - log_path가 주어지면 보낸 event를 JSONL로 기록
+    - executor(JobExecutor)가 주어지면 그 slot에서 실행하고, 대기 중에는 {"event": "queued", "position": n}을 전송
+    - cancel(CancelToken)이 취소되면 대기열의 job은 빠지고, 실행 중인 graph는 다음 node에서 멈춘다 (RunCancelled)
+    '''
+    def __init__(
+        self,
+        session_id: str,
+        log_path: Optional[Union[str, Path]] = None,
+        keepalive_sec: float = 15.0,
+        connections: ConnectionManager = default_manager,
+    ):
+        self.session_id = session_id
+        self.log_path = log_path
+        self.keepalive_sec = keepalive_sec
+        self.connections = connections
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._events: Optional[asyncio.Queue] = None
+
+    def put(self, event: Any):
+        '''graph thread에서 호출 (queue.Queue.put 대체)'''
+        self._loop.call_soon_threadsafe(self._events.put_nowait, event)
+
+    async def _send(self, event: Any, log_fp):
+        await self.connections.send_to(self.session_id, json.dumps(event))
+        if log_fp is not None:
+            try:
+                log_fp.write(json.dumps(event, ensure_ascii=False) + "\n")
+                log_fp.flush()
+            except Exception:
+                pass
+
+    def _queued(self, executor: JobExecutor, position: int):
+        self._events.put_nowait({"event": "queued", "queue": executor.name, "position": position})
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        executor: Optional[JobExecutor] = None,
+        on_start: Optional[Callable[[], None]] = None,
+        cancel: Optional[CancelToken] = None,
+    ) -> Any:
+        '''
+        fn(*args)를 thread에서 실행하고 event를 중계한 뒤 fn의 반환값을 돌려준다 (예외는 그대로 전달)
+        executor가 가득 차 있으면 event 전송 전에 JobRejected를 그대로 올린다
+        '''
+        self._loop = asyncio.get_running_loop()
+        self._events = asyncio.Queue()
+        if executor is not None:
+            executor.check_admission(self.session_id)
+
+        log_fp = open(self.log_path, "a", encoding="utf-8") if self.log_path else None
+        try:
+            if executor is None:
+                if on_start is not None:
+                    on_start()
+                # asyncio.to_thread는 contextvars를 복사해서 실행
+                task = asyncio.ensure_future(asyncio.to_thread(fn, *args))
+            else:
+                task = asyncio.ensure_future(executor.run(
+                    fn, *args,
+                    session_id=self.session_id,
+                    on_position=lambda position: self._queued(executor, position),
+                    on_start=on_start,
+                ))
+            # fn이 끝나기 전에 put된 event는 모두 _DONE보다 먼저 queue에 들어간다
+            task.add_done_callback(lambda _: self._events.put_nowait(_DONE))
+            # 취소는 다른 thread(graph, WebSocket)에서 올 수 있으므로 loop thread에서 task를 취소
+            def cancel_task():
+                self._loop.call_soon_threadsafe(task.cancel)
+
+            if cancel is not None:
+                cancel.add_callback(cancel_task)
+
+            try:
+                while True:
+                    try:
+                        event = await asyncio.wait_for(self._events.get(), timeout=self.keepalive_sec)
+                    except asyncio.TimeoutError:
+                        await self._send({"event": "keepalive"}, log_fp)
+                        continue
+                    if event is _DONE:
+                        break
+                    await self._send(event, log_fp)
+            except asyncio.CancelledError:
+                # 요청이 취소되면 대기열에 남아 있는 job은 실행하지 않도록 같이 취소
+                # (이미 실행 중이면 graph가 다음 node에서 멈추고 thread가 끝날 때까지 기다린 뒤 정리)
+                if cancel is not None:
+                    cancel.cancel("request cancelled")
+                task.cancel()
+                await asyncio.wait([task])
+                raise
+            finally:
+                if cancel is not None:
+                    cancel.remove_callback(cancel_task)
+
+            await self._send({"event": "eof"}, log_fp)
+            if task.cancelled() and cancel is not None and cancel.cancelled:
+                raise RunCancelled(cancel.reason)
+            return task.result()
+        finally:
+            if log_fp is not None:
+                log_fp.close()
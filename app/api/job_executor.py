@@ -0,0 +1,191 @@
+import asyncio
+import math
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import copy_context
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Deque, Dict, Optional
+
+from app.core.metrics import registry
+
+
+class JobRejected(Exception):
+    '''admission 실패. status_code(429 | 503)와 retry_after(초)를 HTTP 응답으로 그대로 사용'''
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+@dataclass
+class _Waiter:
+    future: asyncio.Future
+    session_id: Optional[str]
+    on_position: Optional[Callable[[int], None]] = None
+    position: int = 0
+
+
+class JobExecutor:
+    '''
+    process-wide bounded executor (parse / analysis 각각 하나).
+
+    - 동시에 실행하는 job은 max_concurrency개, 나머지는 최대 max_queue개까지 FIFO로 대기
+    - 대기열이 가득 차면 503, 같은 session의 job이 max_per_session개 이상이면 429 (JobRejected)
+    - 대기 중인 job에는 순번이 바뀔 때마다 on_position(position)을 호출 (1 = 다음 차례)
+    - Retry-After는 최근 job 실행 시간(EWMA)과 대기열 길이로 추정
+    - event loop thread에서만 호출 (admission 상태는 lock 없이 loop 안에서만 변경)
+    '''
+    def __init__(
+        self,
+        name: str,
+        max_concurrency: int = 4,
+        max_queue: int = 16,
+        max_per_session: int = 2,
+        default_job_sec: float = 30.0,
+    ):
+        self.name = name
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue = max(0, max_queue)
+        self.max_per_session = max(1, max_per_session)
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix=f"{name}-job")
+        self._running = 0
+        self._waiters: Deque[_Waiter] = deque()
+        self._per_session: Dict[str, int] = {}
+        self._avg_job_sec = default_job_sec
+        self.rejected = 0
+        self.completed = 0
+
+    def _retry_after(self) -> int:
+        rounds = (len(self._waiters) + 1) / self.max_concurrency
+        return max(1, math.ceil(self._avg_job_sec * rounds))
+
+    def check_admission(self, session_id: Optional[str] = None):
+        '''upload를 읽기 전에 바로 거절할 수 있도록 따로 호출 가능'''
+        if session_id is not None and self._per_session.get(session_id, 0) >= self.max_per_session:
+            self.rejected += 1
+            raise JobRejected(429, f"Too many {self.name} jobs for this session", self._retry_after())
+        if self._running >= self.max_concurrency and len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise JobRejected(503, f"{self.name} queue is full", self._retry_after())
+
+    def _notify_positions(self):
+        for position, waiter in enumerate(self._waiters, start=1):
+            if waiter.on_position is not None and waiter.position != position:
+                waiter.position = position
+                waiter.on_position(position)
+
+    def _release(self):
+        # 대기 중인 job이 있으면 slot을 그대로 넘긴다 (_running 유지)
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.future.done():
+                waiter.future.set_result(None)
+                self._notify_positions()
+                return
+        self._running -= 1
+
+    async def run(
+        self,
+        fn: Callable[..., Any],
+        *args: Any,
+        session_id: Optional[str] = None,
+        on_position: Optional[Callable[[int], None]] = None,
+        on_start: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        '''
+        admission 후 slot이 나면 on_start()를 부르고 fn(*args)을 worker thread에서 실행 (contextvars 복사)
+        실행 중에 취소되면 thread는 멈출 수 없으므로 끝날 때까지 slot을 잡고 기다린 뒤 취소를 전달한다
+        '''
+        self.check_admission(session_id)
+        if session_id is not None:
+            self._per_session[session_id] = self._per_session.get(session_id, 0) + 1
+        try:
+            if self._running < self.max_concurrency and not self._waiters:
+                self._running += 1
+            else:
+                waiter = _Waiter(asyncio.get_running_loop().create_future(), session_id, on_position)
+                self._waiters.append(waiter)
+                self._notify_positions()
+                try:
+                    await waiter.future
+                except asyncio.CancelledError:
+                    if waiter in self._waiters:
+                        self._waiters.remove(waiter)
+                        self._notify_positions()
+                    elif waiter.future.done() and not waiter.future.cancelled():
+                        # slot을 넘겨받은 직후 취소된 경우 다음 job에 넘긴다
+                        self._release()
+                    raise
+
+            if on_start is not None:
+                on_start()
+            start = time.monotonic()
+            future = asyncio.get_running_loop().run_in_executor(self._executor, copy_context().run, fn, *args)
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                await asyncio.wait([future])
+                if not future.cancelled():
+                    future.exception()  # 취소로 끝난 run의 예외(RunCancelled)는 여기서 소비
+                raise
+            finally:
+                self.completed += 1
+                self._avg_job_sec = 0.8 * self._avg_job_sec + 0.2 * (time.monotonic() - start)
+                self._release()
+        finally:
+            if session_id is not None:
+                remaining = self._per_session.get(session_id, 1) - 1
+                if remaining:
+                    self._per_session[session_id] = remaining
+                else:
+                    self._per_session.pop(session_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "running": self._running,
+            "queued": len(self._waiters),
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_job_sec": round(self._avg_job_sec, 3),
+        }
+
+
+_executors: Dict[str, JobExecutor] = {}
+
+
+def _collect_metrics():
+    '''/metrics scrape 시점의 대기열 상태'''
+    stats = {kind: executor.stats() for kind, executor in list(_executors.items())}
+    yield "transcript_job_queue_depth", "gauge", "Jobs waiting for an executor slot.", [({"queue": k}, s["queued"]) for k, s in stats.items()]
+    yield "transcript_jobs_running", "gauge", "Jobs holding an executor slot.", [({"queue": k}, s["running"]) for k, s in stats.items()]
+    yield "transcript_jobs_completed_total", "counter", "Jobs finished (any outcome).", [({"queue": k}, s["completed"]) for k, s in stats.items()]
+    yield "transcript_jobs_rejected_total", "counter", "Jobs rejected with 429/503.", [({"queue": k}, s["rejected"]) for k, s in stats.items()]
+
+
+registry.add_collector(_collect_metrics)
+
+
+@lru_cache(maxsize=None)
+def get_job_executor(kind: str) -> JobExecutor:
+    '''
+    kind = "parse" | "analysis"
+    {KIND}_JOB_CONCURRENCY, {KIND}_JOB_QUEUE_SIZE, JOB_MAX_PER_SESSION 환경변수로 설정
+    '''
+    defaults = {"parse": (4, 16, 30.0), "analysis": (2, 8, 120.0)}
+    concurrency, queue_size, job_sec = defaults[kind]
+    prefix = kind.upper()
+    executor = JobExecutor(
+        name=kind,
+        max_concurrency=int(os.environ.get(f"{prefix}_JOB_CONCURRENCY", concurrency)),
+        max_queue=int(os.environ.get(f"{prefix}_JOB_QUEUE_SIZE", queue_size)),
+        max_per_session=int(os.environ.get("JOB_MAX_PER_SESSION", 2)),
+        default_job_sec=job_sec,
+    )
+    _executors[kind] = executor
+    return executor
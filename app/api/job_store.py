@@ -0,0 +1,165 @@
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Optional, Union
+
+
+QUEUED, RUNNING, SUCCEEDED, FAILED, CANCELLED = "queued", "running", "succeeded", "failed", "cancelled"
+FINISHED = (SUCCEEDED, FAILED, CANCELLED)
+INTERRUPTED = "interrupted: worker is gone"
+# job을 가진 worker: host:pid:boot id (pid가 재사용돼도 boot id로 구분)
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    session_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    result TEXT,
+    error TEXT,
+    owner TEXT,
+    heartbeat_at REAL
+)
+"""
+_MIGRATIONS = {"owner": "TEXT", "heartbeat_at": "REAL"}
+
+
+def _owner_gone(owner: Optional[str], heartbeat_at: Optional[float], lease: float, now: float) -> bool:
+    '''owner가 없거나(이전 schema), heartbeat가 lease보다 오래됐거나, 같은 host에서 pid가 죽었으면 True'''
+    if not owner or heartbeat_at is None or now - heartbeat_at > lease:
+        return True
+    host, pid, _ = owner.rsplit(":", 2)
+    if host != socket.gethostname():
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        return True
+    except (PermissionError, ValueError):
+        return False
+    # 살아 있는 pid가 이 process이면 boot id가 다른 이전 process(pid 재사용)의 job
+    return int(pid) == os.getpid()
+
+
+class JobStore:
+    '''
+    비동기 job(/jobs/...)의 상태와 결과를 남기는 sqlite3 store.
+
+    - client 연결이 끊겨도 결과는 남아 있어 다시 계산하지 않고 조회 가능
+    - job마다 owner(WORKER_ID)와 heartbeat를 남기고, owner가 사라진 끝나지 않은 job만
+      failed(INTERRUPTED)로 정리 (같은 파일을 쓰는 다른 worker의 job은 건드리지 않음)
+    - 여러 thread에서 호출하므로 connection 하나를 lock으로 보호
+    '''
+    def __init__(self, path: Union[str, Path] = ":memory:", lease: float = 30.0):
+        self.path = str(path)
+        self.owner = WORKER_ID
+        self.lease = lease
+        if self.path != ":memory:":
+            Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(_SCHEMA)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            for column, type_ in _MIGRATIONS.items():
+                if column not in columns:
+                    self._conn.execute(f"ALTER TABLE jobs ADD COLUMN {column} {type_}")
+        self.reap()
+        self._stopped = threading.Event()
+        threading.Thread(target=self._heartbeat_loop, name="job-store-heartbeat", daemon=True).start()
+
+    def _heartbeat_loop(self):
+        while not self._stopped.wait(self.lease / 3):
+            try:
+                self.heartbeat()
+                self.reap()
+            except sqlite3.Error:
+                pass
+
+    def heartbeat(self):
+        '''이 worker의 끝나지 않은 job lease 갱신'''
+        self._execute(
+            "UPDATE jobs SET heartbeat_at = ? WHERE owner = ? AND status IN (?, ?)",
+            (time.time(), self.owner, QUEUED, RUNNING),
+        )
+
+    def reap(self) -> int:
+        '''owner가 사라진 queued / running job을 failed로. 정리한 job 수'''
+        now = time.time()
+        rows = self._execute(
+            "SELECT id, owner, heartbeat_at FROM jobs WHERE status IN (?, ?) AND (owner IS NULL OR owner != ?)",
+            (QUEUED, RUNNING, self.owner),
+        ).fetchall()
+        gone = [row["id"] for row in rows if _owner_gone(row["owner"], row["heartbeat_at"], self.lease, now)]
+        for job_id in gone:
+            self._execute(
+                "UPDATE jobs SET status = ?, error = ?, finished_at = ? WHERE id = ? AND status IN (?, ?)",
+                (FAILED, INTERRUPTED, now, job_id, QUEUED, RUNNING),
+            )
+        return len(gone)
+
+    def close(self):
+        self._stopped.set()
+
+    def _execute(self, sql: str, params=()) -> sqlite3.Cursor:
+        with self._lock:
+            return self._conn.execute(sql, params)
+
+    def create(self, kind: str, session_id: str) -> str:
+        job_id = uuid.uuid4().hex
+        self._execute(
+            "INSERT INTO jobs (id, kind, session_id, status, created_at, owner, heartbeat_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (job_id, kind, session_id, QUEUED, time.time(), self.owner, time.time()),
+        )
+        return job_id
+
+    def mark_running(self, job_id: str):
+        self._execute("UPDATE jobs SET status = ?, started_at = ? WHERE id = ? AND status = ?", (RUNNING, time.time(), job_id, QUEUED))
+
+    def _finish(self, job_id: str, status: str, result: Any = None, error: Optional[str] = None):
+        # 이미 끝난(취소된) job은 덮어쓰지 않음. 단 owner가 살아서 끝낸 job이 lease 만료로 잘못 정리됐으면 결과로 바로잡는다
+        self._execute(
+            f"UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? WHERE id = ? "
+            f"AND (status NOT IN ({','.join('?' * len(FINISHED))}) OR (owner = ? AND status = ? AND error = ?))",
+            (status, None if result is None else json.dumps(result, ensure_ascii=False), error, time.time(), job_id, *FINISHED, self.owner, FAILED, INTERRUPTED),
+        )
+
+    def succeed(self, job_id: str, result: Any):
+        self._finish(job_id, SUCCEEDED, result=result)
+
+    def fail(self, job_id: str, error: str):
+        self._finish(job_id, FAILED, error=error)
+
+    def cancel(self, job_id: str):
+        self._finish(job_id, CANCELLED, error="cancelled")
+
+    def get(self, job_id: str, with_result: bool = False) -> Optional[Dict[str, Any]]:
+        row = self._execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        # owner / heartbeat는 worker 간 정리용 (API 응답에는 내보내지 않음)
+        job.pop("owner")
+        job.pop("heartbeat_at")
+        result = job.pop("result")
+        if with_result:
+            job["result"] = None if result is None else json.loads(result)
+        return job
+
+
+@lru_cache(maxsize=None)
+def get_job_store() -> JobStore:
+    '''JOB_STORE_PATH (default .cache/jobs.sqlite3), JOB_LEASE_SECONDS (default 30)'''
+    return JobStore(os.environ.get("JOB_STORE_PATH", ".cache/jobs.sqlite3"), lease=float(os.environ.get("JOB_LEASE_SECONDS", 30)))
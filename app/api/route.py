@@ -1,21 +1,35 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException, WebSocket, WebSocketDisconnect
-from app.parser.graph import transcript_extract_graph
+from fastapi import APIRouter, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, HTMLResponse
+import app.parser.graph  # noqa: F401  (graph registry 등록)
+from app.parser.blob_store import open_blob_store, close_blob_store
+from app.parser.artifacts import get_artifact_writer
+from app.parser.layout_registry import get_layout_registry
+from app.parser.cache import DiskCache
 from pydantic    import BaseModel
 import os
 import shutil
 import tempfile
-from app.analyst_agent import transcript_analyst_graph, AnalysisSpec, ReportState
-from typing import Union, Dict, Any, Optional
+from app.analyst_agent import AnalysisSpec, ReportState
+from typing import Union, Dict, Any, Optional, Callable, Awaitable, Tuple
 import asyncio
-import time
-from queue import Queue
 import json
-from threading import Thread
 from .connection_manager import manager
+from .broker import CANCEL
+from .event_bridge import GraphEventBridge
+from .job_executor import JobRejected, get_job_executor
+from .upload import InvalidUpload, UploadTooLarge, max_upload_bytes, stream_upload
+from .single_flight import SingleFlight
+from .trace_view import render_trace_html
+from .job_store import get_job_store, QUEUED, SUCCEEDED, CANCELLED, FINISHED
 from pathlib import Path
 from app.core import Env, RunLogger
 from datetime import datetime
-from langchain_core.runnables import RunnableConfig  
+from app.core.context import run_config, CancelToken, RunCancelled
+from app.core.graph_registry import get_graph, release_thread
+from app.core.metrics import registry as metrics_registry
+from app.core.tracing import TRACE_FILE, trace_run, span, read_trace
+import uuid
+from functools import lru_cache
 
 
 
@@ -25,6 +39,7 @@ CLIENT_DATA_DIR = Path("test_data")
 
 class PDFProcessResponse(BaseModel):
     final_result: Union[str, Dict]
+    run_id: Optional[str] = None
 
 
 class AnalyzeRequest(BaseModel):
@@ -37,120 +52,204 @@ class Report(BaseModel):
     run_id: str
     cost: float = 0.0
 
+class JobSubmitted(BaseModel):
+    job_id: str
+    status: str = QUEUED
+
 @router.websocket("/ws/{session_id}")
 async def websocket_endpoint(websocket: WebSocket, session_id: str):
-    await manager.connect(websocket, session_id)
+    subscription = await manager.connect(websocket, session_id)
+    # 전송은 socket별 task가 buffer에서 꺼내 보내므로 느린 socket이 graph event 발행을 막지 않는다
+    sender = asyncio.create_task(manager.pump(websocket, subscription))
     try:
         async for _ in websocket.iter_text():
             pass
     except WebSocketDisconnect:
         pass
     finally:
-        manager.disconnect(session_id)
+        sender.cancel()
+        await manager.disconnect(session_id, websocket, subscription)
 
 
+@router.post("/cancel/{session_id}")
+async def cancel_session_runs(session_id: str):
+    '''
+    Cancels every in-flight /upload, /analyze or job run of the session on any worker. Runs stop at their next graph node.
+    '''
+    await manager.cancel_runs(session_id)
+    return {"cancelled": True}
 
-@router.post("/upload/{session_id}")
-async def parse_pdf(session_id: str, file: UploadFile = File(...)):
-    
+
+
+def _rejected(e: JobRejected) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+
+@router.get("/jobs/stats")
+async def job_stats():
     '''
-    Accepts a PDF-file upload, processes it through the LangGraph pipeline,
-    and returns the extracted final result as Json(dict)
+    Returns running / queued / rejected counts of the parse and analysis job executors,
+    and how many /analyze requests joined an identical in-flight run.
     '''
-    file_name = file.filename or 'uploaded_file'
-    file_suffix = os.path.splitext(file_name)[1].lower()
+    return {
+        **{kind: get_job_executor(kind).stats() for kind in ("parse", "analysis")},
+        "analysis_single_flight": _analysis_flights.stats(),
+    }
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    '''
+    Prometheus text exposition: per-node latency histograms, node errors, in-flight nodes,
+    LLM tokens / cost and job queue depth of this worker.
+    '''
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
+
+@router.get("/runs/{run_id}/trace")
+async def run_trace(run_id: str, session_id: Optional[str] = None, format: str = "html"):
+    '''
+    Timeline of one run's trace spans (run → graph → metric → node → llm / exec / http).
+    format=json returns the raw spans. Without session_id the newest run with this run_id is used.
+    '''
+    if any(part in value for value in (run_id, session_id or "") for part in ("/", "\\", "..", "*", "?", "[")):
+        raise HTTPException(status_code=400, detail="Invalid run_id / session_id")
+    users_dir = CLIENT_DATA_DIR / "users"
+    pattern = f"{session_id}/{run_id}/logs/{TRACE_FILE}" if session_id else f"*/{run_id}/logs/{TRACE_FILE}"
+    paths = sorted(users_dir.glob(pattern), key=lambda p: p.stat().st_mtime)
+    if not paths:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    spans = read_trace(paths[-1])
+    # 같은 초에 시작한 run은 logs 디렉터리를 같이 쓰므로 마지막 trace만 보여준다
+    if spans:
+        roots = [s for s in spans if s["parent_id"] is None]
+        latest = max(roots, key=lambda s: s["start"])["trace_id"] if roots else spans[-1]["trace_id"]
+        spans = [s for s in spans if s["trace_id"] == latest]
+    if format == "json":
+        return spans
+    return HTMLResponse(render_trace_html(spans, title=f"run {run_id}"))
+
+
+@router.get("/layouts/stats")
+async def layout_stats():
+    '''
+    Returns hit/miss counts of the transcript layout registry and the known layouts.
+    '''
+    return get_layout_registry().stats()
+
+
+def _accept_pdf(filename: str, content_type: str):
+    if os.path.splitext(filename or 'uploaded_file')[1].lower() != '.pdf' or content_type not in ('application/pdf', 'application/octet-stream'):
+        raise InvalidUpload("Invalid file type, Please upload a PDF file")
+
+
+async def _save_upload(session_id: str, request: Request) -> Tuple[str, str, str]:
+    '''
+    admission 확인 후 multipart body의 PDF를 받는 대로 temp dir에 저장하고 (temp_dir, temp_path, sha256)을 반환
+    sha256은 parse cache key로 그대로 쓰므로 파일을 다시 읽지 않는다
+    '''
+    # upload endpoint는 File(...)을 쓰지 않아 FastAPI가 body를 미리 읽지 않는다.
+    # 대기열이 가득 찼으면 body를 받기 전에 거절 (거절된 요청이 upload 전체를 보내지 않아도 된다)
+    try:
+        get_job_executor("parse").check_admission(session_id)
+    except JobRejected as e:
+        raise _rejected(e)
 
-    if file_suffix != '.pdf' or file.content_type not in ('application/pdf', 'application/octet-stream'):
-        raise HTTPException(status_code=400, detail="Invalid file type, Please upload a PDF file")
-    
     # Save the uploaded file to a secure temporary dir.
     temp_dir = tempfile.mkdtemp()
     temp_path = os.path.join(temp_dir, f'{session_id}.pdf')
 
     try:
-        file_contents = await file.read()
-        with open(temp_path, 'wb') as f:
-            f.write(file_contents)
+        upload = await stream_upload(request, temp_path, max_upload_bytes(), accept=_accept_pdf)
+
+    except UploadTooLarge as e:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise HTTPException(status_code=413, detail=str(e))
+
+    except InvalidUpload as e:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise HTTPException(status_code=400, detail=str(e))
 
     except Exception as e:
         shutil.rmtree(temp_dir, ignore_errors=True)
         raise HTTPException(status_code=500, detail=f"Fail store the file: {e}")
-    
-    finally:
-        await file.close()
 
+    return temp_dir, temp_path, upload.sha256
+
+
+# body를 직접 stream으로 읽는 upload endpoint의 OpenAPI 문서용 (File(...) 대신)
+_PDF_UPLOAD_BODY = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "required": ["file"],
+                    "properties": {"file": {"type": "string", "format": "binary"}},
+                }
+            }
+        },
+    }
+}
+
+
+async def _run_parse(
+    session_id: str,
+    temp_dir: str,
+    temp_path: str,
+    digest: str,
+    cancel: CancelToken,
+    on_start: Optional[Callable[[], None]] = None,
+) -> PDFProcessResponse:
+    # element 이미지 bytes는 run 동안 BlobStore에만 두고 state에는 handle만 전달
+    blob_store = open_blob_store()
     try:
         run_id = datetime.now().strftime("%Y-%m-%d-%H-%M%S")
         logs_dir = CLIENT_DATA_DIR / "users" / session_id / run_id / "logs"
         logs_dir.mkdir(parents=True, exist_ok=True)
-        ws_events_path = logs_dir / "ws_events.jsonl"
-        ws_events_fp = open(ws_events_path, "a", encoding="utf-8")
-        q = Queue()
-        graph = transcript_extract_graph(queue=q)
-        config = {"configurable": {"thread_id": str(session_id)}}
-        input_state = {'filepath': temp_path}
-        
-        result_state = {}
+        bridge = GraphEventBridge(session_id, log_path=logs_dir / "ws_events.jsonl")
+        graph = get_graph("transcript_extract")
+        # 공유 graph(checkpointer)이므로 thread_id는 run마다 새로 만든다
+        config = run_config(queue=bridge, cancel=cancel, thread_id=f"{session_id}:{uuid.uuid4().hex}")
+        input_state = {'filepath': temp_path, 'file_sha256': digest, 'blob_store_id': blob_store.id}
+
         def run_graph():
-            result = graph.invoke(input=input_state, config=config)
-            result_state.update(result)
-
-        thread = Thread(target=run_graph)
-        thread.start()
-
-        last_sent = time.monotonic()
-        keepalive_sec = 15.0
-        while thread.is_alive() or not q.empty():
-            if not q.empty():
-                event = q.get()
-                await manager.send_to(session_id, json.dumps(event))
+            with trace_run(logs_dir / TRACE_FILE, "parse", run_id=run_id, session_id=session_id):
                 try:
-                    ws_events_fp.write(json.dumps(event, ensure_ascii=False) + "\n")
-                    ws_events_fp.flush()
-                except Exception:
-                    pass
-                last_sent = time.monotonic()
-            else:
-                if time.monotonic() - last_sent >= keepalive_sec:
-                    check_live = {"event": "keepalive"}
-                    await manager.send_to(session_id, json.dumps(check_live))
-                    try:
-                        ws_events_fp.write(json.dumps(check_live, ensure_ascii=False) + "\n")
-                        ws_events_fp.flush()
-                    except Exception:
-                        pass
-                    last_sent = time.monotonic()
-                await asyncio.sleep(0.1)
-        
-        eof_evt = {"event": "eof"}
-        await manager.send_to(session_id, json.dumps(eof_evt))
+                    with span("transcript_extract", kind="graph"):
+                        return graph.invoke(input=input_state, config=config)
+                finally:
+                    release_thread(graph, config)
+
         try:
-            ws_events_fp.write(json.dumps(eof_evt, ensure_ascii=False) + "\n")
-            ws_events_fp.flush()
-        except Exception:
-            pass
-        await asyncio.sleep(0.1)
-        thread.join()
+            result_state = await bridge.run(run_graph, executor=get_job_executor("parse"), on_start=on_start, cancel=cancel)
+        except JobRejected as e:
+            raise _rejected(e)
+        except RunCancelled:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Pipeline failed: {e}")
 
     finally:
-        try:
-            ws_events_fp.close()
-        except Exception:
-            pass
+        # temp_dir 아래로 background 저장 중인 artifact가 있으면 끝난 뒤 정리
+        get_artifact_writer().flush(timeout=10)
         shutil.rmtree(temp_dir, ignore_errors=True)
+        close_blob_store(blob_store.id)
 
     final_text = result_state.get("final_result", None)
     if not final_text:
         raise HTTPException(status_code=500, detail="No final result produced by the pipeline.")
 
-    return PDFProcessResponse(final_result=final_text)
-    
+    return PDFProcessResponse(final_result=final_text, run_id=run_id)
 
-@router.post("/analyze/{session_id}")
-async def analyze_transcript(session_id: str, req: AnalyzeRequest):
-    """
-    Analyzes the transcript report with Table and Chart.
-    """
+
+async def _run_analysis(
+    session_id: str,
+    req: AnalyzeRequest,
+    cancel: CancelToken,
+    on_start: Optional[Callable[[], None]] = None,
+) -> Report:
     transcript = req.transcript
     analyst = req.analyst
     
@@ -164,9 +263,7 @@ async def analyze_transcript(session_id: str, req: AnalyzeRequest):
     run_logger=logger,
     url=req.url,
     )
-    q = Queue()
-    graph = transcript_analyst_graph(queue=q, verbose=True, env=env, track_time=True)
-    config = RunnableConfig(thread_id=str(session_id), max_iterations=80)
+    graph = get_graph("transcript_analyst")
     text_transcript = json.dumps(transcript, ensure_ascii=False, indent=2)
     input_state = ReportState(
         dataset=text_transcript,
@@ -175,61 +272,250 @@ async def analyze_transcript(session_id: str, req: AnalyzeRequest):
         run_id=run_id,
     )
 
-    result_state = {}
-    def run_graph():
-        result = graph.invoke(input=input_state, config=config)
-        result_state.update(result)
-
     logs_dir = CLIENT_DATA_DIR / "users" / session_id / run_id / "logs"
     logs_dir.mkdir(parents=True, exist_ok=True)
-    ws_events_path = logs_dir / "ws_events.jsonl"
-    ws_events_fp = open(ws_events_path, "a", encoding="utf-8")
-
-    thread = Thread(target=run_graph)
-    thread.start()
-
-    last_sent = time.monotonic()
-    keepalive_sec = 15.0
-    while thread.is_alive() or not q.empty():
-        if not q.empty():
-            event = q.get()
-            await manager.send_to(session_id, json.dumps(event))
+    bridge = GraphEventBridge(session_id, log_path=logs_dir / "ws_events.jsonl")
+    config = run_config(queue=bridge, env=env, cancel=cancel, thread_id=f"{session_id}:{uuid.uuid4().hex}", max_iterations=80)
+
+    def run_graph():
+        with trace_run(logs_dir / TRACE_FILE, "analyze", run_id=run_id, session_id=session_id):
             try:
-                ws_events_fp.write(json.dumps(event, ensure_ascii=False) + "\n")
-                ws_events_fp.flush()
-            except Exception:
-                pass
-            last_sent = time.monotonic()
-        else:
-
-            if time.monotonic() - last_sent >= keepalive_sec:
-                check_live = {"event": "keepalive"}
-                await manager.send_to(session_id, json.dumps(check_live))
-                try:
-                    ws_events_fp.write(json.dumps(check_live, ensure_ascii=False) + "\n")
-                    ws_events_fp.flush()
-                except Exception:
-                    pass
-                last_sent = time.monotonic()
-            await asyncio.sleep(0.1)
-    
-    eof_evt = {"event": "eof"}
-    await manager.send_to(session_id, json.dumps(eof_evt))
-    try:
-        ws_events_fp.write(json.dumps(eof_evt, ensure_ascii=False) + "\n")
-        ws_events_fp.flush()
-    except Exception:
-        pass
-    await asyncio.sleep(0.1)
-    thread.join()
+                with span("transcript_analyst", kind="graph"):
+                    return graph.invoke(input=input_state, config=config)
+            finally:
+                release_thread(graph, config)
+
     try:
-        ws_events_fp.close()
-    except Exception:
-        pass
-            
+        result_state = await bridge.run(run_graph, executor=get_job_executor("analysis"), on_start=on_start, cancel=cancel)
+    except JobRejected as e:
+        raise _rejected(e)
+    except RunCancelled:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Pipeline failed: {e}")
+
     report = result_state.get("report", None)
     total_cost = float(result_state.get("cost", 0.0) or 0.0)
     if not report:
         raise HTTPException(status_code=500, detail="No final result produced by the pipeline.")
 
     return Report(report=report, run_id=run_id, cost=total_cost)
+
+
+# 같은 분석 요청의 동시 실행을 하나로 합친다 (worker 단위)
+_analysis_flights = SingleFlight()
+
+
+@lru_cache(maxsize=None)
+def get_analysis_cache() -> Optional[DiskCache]:
+    '''완료된 report cache. ANALYSIS_CACHE_TTL_SEC (default 3600, 0이면 끔), ANALYSIS_CACHE_DIR (default .cache/analysis)'''
+    ttl_sec = float(os.environ.get("ANALYSIS_CACHE_TTL_SEC", 3600))
+    if ttl_sec <= 0:
+        return None
+    return DiskCache(
+        cache_dir=os.environ.get("ANALYSIS_CACHE_DIR", ".cache/analysis"),
+        namespace="reports",
+        ttl_sec=ttl_sec,
+        max_bytes=64 * 1024 * 1024,
+    )
+
+
+def _analyze_key(session_id: str, req: AnalyzeRequest) -> str:
+    # report와 artifact는 session 폴더에 쓰이므로 session도 key에 포함 (make_key는 key 정렬 JSON으로 정규화)
+    return DiskCache.make_key("analyze/v1", session_id, req.transcript, req.analyst.model_dump(mode="json"), req.url)
+
+
+def _cached_report(key: str) -> Optional[Report]:
+    cache = get_analysis_cache()
+    cached = cache.get(key) if cache is not None else None
+    return Report(**cached) if cached is not None else None
+
+
+async def _analyze_once(
+    session_id: str,
+    req: AnalyzeRequest,
+    cancel: CancelToken,
+    on_start: Optional[Callable[[], None]] = None,
+) -> Report:
+    '''
+    캐시된 report가 있으면 바로 반환 (처음 run의 run_id / cost 그대로), 같은 요청이 실행 중이면 그 run에 붙는다
+    '''
+    key = _analyze_key(session_id, req)
+    cached = _cached_report(key)
+    if cached is not None:
+        if on_start is not None:
+            on_start()
+        # WebSocket으로 진행 상황을 기다리는 client도 바로 끝나도록
+        await manager.send_to(session_id, json.dumps({"event": "cached", "run_id": cached.run_id}))
+        await manager.send_to(session_id, json.dumps({"event": "eof"}))
+        return cached
+
+    async def start(flight_cancel: CancelToken, flight_on_start: Callable[[], None]) -> Report:
+        report = await _run_analysis(session_id, req, flight_cancel, on_start=flight_on_start)
+        cache = get_analysis_cache()
+        if cache is not None:
+            await asyncio.to_thread(cache.set, key, report.model_dump())
+        return report
+
+    return await _analysis_flights.run(key, start, cancel, on_start=on_start)
+
+
+async def _cancel_on_http_disconnect(request: Request, cancel: CancelToken):
+    # upload body는 이미 끝까지 읽었으므로 다음 ASGI message는 client 연결 종료(http.disconnect)
+    while (await request.receive())["type"] != "http.disconnect":
+        pass
+    cancel.cancel("client disconnected")
+
+
+async def _run_attached(
+    request: Request,
+    session_id: str,
+    run: Callable[[CancelToken], Awaitable[BaseModel]],
+) -> BaseModel:
+    '''
+    동기 endpoint용: HTTP 또는 session의 WebSocket 연결이 끊기거나 /cancel/{session_id}가 호출되면 run을 취소
+    '''
+    cancel = CancelToken()
+    manager.add_run(session_id, cancel, cancel_on_disconnect=True)
+    watcher = asyncio.create_task(_cancel_on_http_disconnect(request, cancel))
+    try:
+        return await run(cancel)
+    except RunCancelled as e:
+        raise HTTPException(status_code=409, detail=f"Run cancelled: {e}")
+    finally:
+        watcher.cancel()
+        manager.remove_run(session_id, cancel)
+
+
+@router.post("/upload/{session_id}", openapi_extra=_PDF_UPLOAD_BODY)
+async def parse_pdf(request: Request, session_id: str):
+    
+    '''
+    Accepts a PDF-file upload, processes it through the LangGraph pipeline,
+    and returns the extracted final result as Json(dict)
+    '''
+    temp_dir, temp_path, digest = await _save_upload(session_id, request)
+    return await _run_attached(request, session_id, lambda cancel: _run_parse(session_id, temp_dir, temp_path, digest, cancel))
+    
+
+@router.post("/analyze/{session_id}")
+async def analyze_transcript(request: Request, session_id: str, req: AnalyzeRequest):
+    """
+    Analyzes the transcript report with Table and Chart.
+    """
+    return await _run_attached(request, session_id, lambda cancel: _analyze_once(session_id, req, cancel))
+
+
+# 이 worker에서 실행 중인 job task. 상태/결과는 JobStore에 남는다
+_job_tasks: Dict[str, asyncio.Task] = {}
+
+
+def _job_channel(job_id: str) -> str:
+    '''job의 CancelToken을 등록하는 broker key (job을 가진 worker가 /jobs/{job_id}/cancel signal을 받는다)'''
+    return f"job:{job_id}"
+
+
+def _start_job(
+    kind: str,
+    session_id: str,
+    run: Callable[[CancelToken, Callable[[], None]], Awaitable[BaseModel]],
+) -> JobSubmitted:
+    '''
+    job을 store에 만들고 run(cancel, on_start)을 background task로 실행. 결과는 client 연결과 무관하게 store에 저장
+    (WebSocket이 끊겨도 취소하지 않음. /jobs/{job_id}/cancel 또는 /cancel/{session_id}로만 취소)
+    '''
+    store = get_job_store()
+    job_id = store.create(kind, session_id)
+    cancel = CancelToken()
+    manager.add_run(session_id, cancel, cancel_on_disconnect=False)
+    manager.add_run(_job_channel(job_id), cancel, cancel_on_disconnect=False)
+
+    async def run_job():
+        try:
+            response = await run(cancel, lambda: store.mark_running(job_id))
+            store.succeed(job_id, response.model_dump())
+        except (asyncio.CancelledError, RunCancelled):
+            store.cancel(job_id)
+        except HTTPException as e:
+            store.fail(job_id, str(e.detail))
+        except Exception as e:
+            store.fail(job_id, f"Pipeline failed: {e}")
+        finally:
+            _job_tasks.pop(job_id, None)
+            manager.remove_run(session_id, cancel)
+            manager.remove_run(_job_channel(job_id), cancel)
+
+    _job_tasks[job_id] = asyncio.create_task(run_job())
+    return JobSubmitted(job_id=job_id)
+
+
+@router.post("/jobs/upload/{session_id}", status_code=202, openapi_extra=_PDF_UPLOAD_BODY)
+async def submit_parse_job(request: Request, session_id: str):
+    '''
+    Same as /upload, but returns a job id immediately. Poll /jobs/{job_id} and fetch /jobs/{job_id}/result.
+    '''
+    temp_dir, temp_path, digest = await _save_upload(session_id, request)
+    return _start_job("parse", session_id, lambda cancel, on_start: _run_parse(session_id, temp_dir, temp_path, digest, cancel, on_start=on_start))
+
+
+@router.post("/jobs/analyze/{session_id}", status_code=202)
+async def submit_analysis_job(session_id: str, req: AnalyzeRequest):
+    '''
+    Same as /analyze, but returns a job id immediately. Poll /jobs/{job_id} and fetch /jobs/{job_id}/result.
+    '''
+    key = _analyze_key(session_id, req)
+    # 캐시 hit이나 실행 중인 같은 run에 붙는 job은 새 slot을 쓰지 않는다
+    if not _analysis_flights.in_flight(key) and _cached_report(key) is None:
+        try:
+            get_job_executor("analysis").check_admission(session_id)
+        except JobRejected as e:
+            raise _rejected(e)
+    return _start_job("analysis", session_id, lambda cancel, on_start: _analyze_once(session_id, req, cancel, on_start=on_start))
+
+
+def _get_job(job_id: str, with_result: bool = False) -> Dict[str, Any]:
+    job = get_job_store().get(job_id, with_result=with_result)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    '''
+    Returns the status (queued | running | succeeded | failed | cancelled) of a job.
+    '''
+    return _get_job(job_id)
+
+
+@router.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    '''
+    Returns the stored result of a finished job (the same body as /upload or /analyze).
+    '''
+    job = _get_job(job_id, with_result=True)
+    if job["status"] not in FINISHED:
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}", headers={"Retry-After": "1"})
+    if job["status"] == CANCELLED:
+        raise HTTPException(status_code=409, detail="Job was cancelled")
+    if job["status"] != SUCCEEDED:
+        raise HTTPException(status_code=500, detail=job["error"] or "Pipeline failed")
+    return job["result"]
+
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_job(job_id: str):
+    '''
+    Cancels a queued or running job. Finished jobs are returned unchanged.
+    '''
+    job = _get_job(job_id)
+    if job["status"] in FINISHED:
+        return job
+    get_job_store().cancel(job_id)
+    task = _job_tasks.get(job_id)
+    if task is not None:
+        task.cancel()
+    else:
+        # 다른 worker의 job: broker로 알려 owner worker가 run을 멈추게 한다
+        await manager.broker.signal(_job_channel(job_id), CANCEL)
+    return _get_job(job_id)
@@ -0,0 +1,100 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.context import CancelToken, RunCancelled
+
+
+@dataclass
+class _Flight:
+    cancel: CancelToken
+    task: Optional[asyncio.Task] = None
+    waiters: int = 0
+    running: bool = False
+    on_start: List[Callable[[], None]] = field(default_factory=list)
+
+    def started(self):
+        self.running = True
+        callbacks, self.on_start = self.on_start, []
+        for callback in callbacks:
+            callback()
+
+
+class SingleFlight:
+    '''
+    같은 key로 동시에 들어온 요청을 run 하나로 합친다 (event loop thread 전용).
+
+    - 첫 요청이 start(cancel, on_start)를 background task로 시작하고, 이후 요청은 같은 task의 결과를 기다린다
+    - run은 자기 CancelToken을 따로 가지며, 붙어 있는 요청이 모두 떠났을 때(각 요청의 token 취소)만 취소된다.
+      취소된 run은 바로 key에서 빠지므로 그 뒤에 온 같은 요청은 새 run을 시작한다
+    - on_start는 run이 실제로 시작될 때 (이미 시작됐으면 붙는 즉시) 요청마다 호출
+    '''
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self.started = 0
+        self.joined = 0
+
+    def in_flight(self, key: str) -> bool:
+        return key in self._flights
+
+    def _launch(self, key: str, start: Callable[[CancelToken, Callable[[], None]], Awaitable[Any]]) -> _Flight:
+        flight = _Flight(cancel=CancelToken())
+        flight.task = asyncio.ensure_future(start(flight.cancel, flight.started))
+
+        def finished(task: asyncio.Task):
+            if self._flights.get(key) is flight:
+                self._flights.pop(key)
+            # 기다리는 요청이 없어도 예외가 소비되도록
+            if not task.cancelled():
+                task.exception()
+
+        flight.task.add_done_callback(finished)
+        self._flights[key] = flight
+        self.started += 1
+        return flight
+
+    async def run(
+        self,
+        key: str,
+        start: Callable[[CancelToken, Callable[[], None]], Awaitable[Any]],
+        cancel: CancelToken,
+        on_start: Optional[Callable[[], None]] = None,
+    ) -> Any:
+        flight = self._flights.get(key)
+        # 취소된 flight는 다음 node 경계에서 멈출 때까지 살아 있으므로 붙지 않고 새로 시작
+        if flight is None or flight.cancel.cancelled:
+            flight = self._launch(key, start)
+        else:
+            self.joined += 1
+        flight.waiters += 1
+        if on_start is not None:
+            if flight.running:
+                on_start()
+            else:
+                flight.on_start.append(on_start)
+
+        loop = asyncio.get_running_loop()
+        detached = loop.create_future()
+
+        def detach():
+            loop.call_soon_threadsafe(lambda: detached.done() or detached.set_result(None))
+
+        cancel.add_callback(detach)
+        try:
+            done, _ = await asyncio.wait({flight.task, detached}, return_when=asyncio.FIRST_COMPLETED)
+            if flight.task in done:
+                return flight.task.result()
+            raise RunCancelled(cancel.reason)
+        finally:
+            cancel.remove_callback(detach)
+            detached.cancel()
+            if on_start in flight.on_start:
+                flight.on_start.remove(on_start)
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                flight.cancel.cancel(cancel.reason or "all requests left")
+                if self._flights.get(key) is flight:
+                    self._flights.pop(key)
+
+    def stats(self) -> dict:
+        return {"in_flight": len(self._flights), "started": self.started, "joined": self.joined}
@@ -0,0 +1,103 @@
+from collections import defaultdict
+from html import escape
+from typing import Any, Dict, List, Tuple
+
+
+KIND_COLORS = {
+    "run": "#6b7280",
+    "graph": "#2563eb",
+    "metric": "#7c3aed",
+    "node": "#0d9488",
+    "llm": "#ea580c",
+    "exec": "#ca8a04",
+    "http": "#db2777",
+}
+# row에 같이 보여줄 attribute (run_id / session_id는 제목에 한 번만)
+ROW_ATTRS = ("metric_id", "attempt", "retry", "status_code", "model", "prompt_tokens", "completion_tokens", "elements")
+
+_STYLE = """
+body { font: 13px -apple-system, BlinkMacSystemFont, "Segoe UI", sans-serif; margin: 24px; color: #111827; }
+h1 { font-size: 18px; margin: 0 0 4px; }
+.meta { color: #6b7280; margin-bottom: 16px; }
+table { border-collapse: collapse; width: 100%; }
+td, th { padding: 2px 8px; border-bottom: 1px solid #f3f4f6; white-space: nowrap; text-align: left; }
+td.bar { width: 50%; position: relative; }
+td.bar div { position: absolute; top: 4px; height: 12px; min-width: 1px; border-radius: 2px; }
+td.num { text-align: right; font-variant-numeric: tabular-nums; }
+tr.error td.name { color: #dc2626; }
+.attrs { color: #6b7280; }
+h2 { font-size: 15px; margin: 24px 0 8px; }
+"""
+
+
+def _order(spans: List[Dict[str, Any]]) -> List[Tuple[int, Dict[str, Any]]]:
+    '''부모 → 자식 순서(시작 시각 순)로 펼친 (depth, span) 목록. 부모가 없는 span은 최상위로'''
+    ids = {s["span_id"] for s in spans}
+    children: Dict[Any, List[Dict[str, Any]]] = defaultdict(list)
+    for s in spans:
+        children[s["parent_id"] if s["parent_id"] in ids else None].append(s)
+    rows: List[Tuple[int, Dict[str, Any]]] = []
+    stack = [(0, s) for s in sorted(children[None], key=lambda s: s["start"], reverse=True)]
+    while stack:
+        depth, s = stack.pop()
+        rows.append((depth, s))
+        stack += [(depth + 1, c) for c in sorted(children[s["span_id"]], key=lambda c: c["start"], reverse=True)]
+    return rows
+
+
+def render_trace_html(spans: List[Dict[str, Any]], title: str) -> str:
+    '''
+    trace 하나(span dict 목록)를 timeline HTML로.
+    각 row의 bar는 run 시작 기준 위치 / 길이, 아래에 span 이름별 누적 시간 요약.
+    '''
+    if not spans:
+        return f"<!doctype html><title>{escape(title)}</title><p>No spans.</p>"
+    t0 = min(s["start"] for s in spans)
+    end = max(s["start"] + (s.get("duration") or 0.0) for s in spans)
+    total = max(end - t0, 1e-9)
+
+    rows = []
+    for depth, s in _order(spans):
+        duration = s.get("duration") or 0.0
+        left = (s["start"] - t0) / total * 100
+        width = duration / total * 100
+        attrs = " ".join(f"{k}={escape(str(s['attrs'][k]))}" for k in ROW_ATTRS if k in s.get("attrs", {}))
+        if s.get("error"):
+            attrs += f" {escape(s['error'])}"
+        color = KIND_COLORS.get(s["kind"], "#9ca3af")
+        rows.append(
+            f'<tr class="{escape(s.get("status", "ok"))}">'
+            f'<td class="name" style="padding-left:{8 + depth * 16}px">{escape(s["name"])}</td>'
+            f'<td>{escape(s["kind"])}</td>'
+            f'<td class="num">{(s["start"] - t0) * 1000:.0f}</td>'
+            f'<td class="num">{duration * 1000:.1f}</td>'
+            f'<td class="bar"><div style="left:{left:.3f}%;width:{width:.3f}%;background:{color}"></div></td>'
+            f'<td class="attrs">{attrs}</td></tr>'
+        )
+
+    # 같은 이름의 span(node, llm model, http path 등)을 합친 시간: 병렬 metric은 wall-clock보다 클 수 있다
+    totals: Dict[Tuple[str, str], List[float]] = defaultdict(lambda: [0, 0.0])
+    for s in spans:
+        if s["kind"] == "run":
+            continue
+        name = s["name"] if s["kind"] != "metric" else "metric"
+        entry = totals[(s["kind"], name)]
+        entry[0] += 1
+        entry[1] += s.get("duration") or 0.0
+    summary = "".join(
+        f'<tr><td>{escape(name)}</td><td>{escape(kind)}</td><td class="num">{count}</td>'
+        f'<td class="num">{seconds * 1000:.1f}</td><td class="num">{seconds / total * 100:.1f}%</td></tr>'
+        for (kind, name), (count, seconds) in sorted(totals.items(), key=lambda item: -item[1][1])
+    )
+
+    root_attrs = next((s.get("attrs", {}) for s in spans if s["parent_id"] is None), {})
+    meta = " · ".join(f"{k}={escape(str(v))}" for k, v in root_attrs.items())
+    return (
+        f"<!doctype html><html><head><meta charset=\"utf-8\"><title>{escape(title)}</title>"
+        f"<style>{_STYLE}</style></head><body>"
+        f"<h1>{escape(title)}</h1><div class=\"meta\">{meta} · {len(spans)} spans · wall {total:.2f}s</div>"
+        f"<table><tr><th>span</th><th>kind</th><th>start ms</th><th>ms</th><th>timeline</th><th></th></tr>{''.join(rows)}</table>"
+        f"<h2>Time by span</h2>"
+        f"<table><tr><th>span</th><th>kind</th><th>count</th><th>total ms</th><th>of wall</th></tr>{summary}</table>"
+        f"</body></html>"
+    )
@@ -0,0 +1,173 @@
+import asyncio
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import BinaryIO, Callable, Dict, List, Optional, Union
+
+from python_multipart.multipart import MultipartParser, parse_options_header
+from starlette.requests import Request
+
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+# multipart boundary / header 여유분 (Content-Length는 파일 크기보다 약간 크다)
+_MULTIPART_OVERHEAD = 64 * 1024
+
+
+class UploadTooLarge(Exception):
+    def __init__(self, max_bytes: int):
+        super().__init__(f"File is larger than {max_bytes // (1024 * 1024)} MB")
+        self.max_bytes = max_bytes
+
+
+def max_upload_bytes() -> int:
+    '''UPLOAD_MAX_MB (default 64)'''
+    return int(float(os.environ.get("UPLOAD_MAX_MB", 64)) * 1024 * 1024)
+
+
+class InvalidUpload(Exception):
+    pass
+
+
+@dataclass
+class StreamedUpload:
+    filename: str
+    content_type: str
+    sha256: str
+    size: int
+
+
+class _FilePart:
+    '''MultipartParser callback: field 이름이 맞는 첫 file part의 header와 data만 모은다'''
+    def __init__(self, field: str):
+        self.field = field
+        self.found = False
+        self.headers_done = False
+        self.filename = ""
+        self.content_type = ""
+        self._active = False
+        self._header_field = b""
+        self._header_value = b""
+        self._headers: Dict[bytes, bytes] = {}
+        self._data: List[bytes] = []
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self._on_part_begin,
+            "on_header_field": lambda data, start, end: setattr(self, "_header_field", self._header_field + data[start:end]),
+            "on_header_value": lambda data, start, end: setattr(self, "_header_value", self._header_value + data[start:end]),
+            "on_header_end": self._on_header_end,
+            "on_headers_finished": self._on_headers_finished,
+            "on_part_data": self._on_part_data,
+            "on_part_end": self._on_part_end,
+        }
+
+    def _on_part_begin(self):
+        self._headers = {}
+
+    def _on_header_end(self):
+        self._headers[self._header_field.lower()] = self._header_value
+        self._header_field, self._header_value = b"", b""
+
+    def _on_headers_finished(self):
+        _, options = parse_options_header(self._headers.get(b"content-disposition", b""))
+        if self.found or options.get(b"name", b"").decode("latin-1") != self.field:
+            return
+        self.found = self._active = self.headers_done = True
+        self.filename = options.get(b"filename", b"").decode("utf-8", "replace")
+        self.content_type = self._headers.get(b"content-type", b"").decode("latin-1")
+
+    def _on_part_data(self, data: bytes, start: int, end: int):
+        if self._active:
+            self._data.append(data[start:end])
+
+    def _on_part_end(self):
+        self._active = False
+
+    def take(self) -> bytes:
+        data, self._data = b"".join(self._data), []
+        return data
+
+
+def _write_chunk(f: BinaryIO, h: "hashlib._Hash", data: bytes):
+    h.update(data)
+    f.write(data)
+
+
+async def stream_upload(
+    request: Request,
+    dest_path: Union[str, Path],
+    max_bytes: int,
+    field: str = "file",
+    accept: Optional[Callable[[str, str], None]] = None,
+    chunk_size: int = UPLOAD_CHUNK_SIZE,
+) -> StreamedUpload:
+    '''
+    multipart/form-data body를 request.stream()에서 받는 대로 parse해서 field 파일을 dest_path에 쓰고 SHA-256을 같이 계산.
+    body 전체를 spool하지 않으므로 받는 중에 한도를 넘으면 그 자리에서 UploadTooLarge (Content-Length 없는 chunked 요청 포함).
+    accept(filename, content_type)는 file part header가 도착하면 data를 받기 전에 호출 (InvalidUpload로 거절).
+    '''
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if content_type != b"multipart/form-data" or not boundary:
+        raise InvalidUpload("Expected a multipart/form-data upload")
+
+    part = _FilePart(field)
+    parser = MultipartParser(boundary, part.callbacks())
+    h = hashlib.sha256()
+    received = size = 0
+    checked = False
+    buffer = bytearray()
+    with open(dest_path, "wb") as f:
+        async for chunk in request.stream():
+            received += len(chunk)
+            if received > max_bytes + _MULTIPART_OVERHEAD:
+                raise UploadTooLarge(max_bytes)
+            parser.write(chunk)
+            if part.headers_done and not checked:
+                checked = True
+                if accept is not None:
+                    accept(part.filename, part.content_type)
+            data = part.take()
+            if not data:
+                continue
+            size += len(data)
+            if size > max_bytes:
+                raise UploadTooLarge(max_bytes)
+            buffer += data
+            # hash / disk write는 chunk_size 단위로 모아서 worker thread에서
+            if len(buffer) >= chunk_size:
+                await asyncio.to_thread(_write_chunk, f, h, bytes(buffer))
+                buffer.clear()
+        parser.finalize()
+        if buffer:
+            await asyncio.to_thread(_write_chunk, f, h, bytes(buffer))
+    if not part.found:
+        raise InvalidUpload(f"Missing '{field}' file field")
+    return StreamedUpload(filename=part.filename, content_type=part.content_type, sha256=h.hexdigest(), size=size)
+
+
+class UploadSizeLimitMiddleware:
+    '''
+    upload endpoint(path에 "/upload/" 포함)의 Content-Length가 max_bytes를 넘으면 body를 읽기 전에 413으로 응답.
+    Content-Length 없이 오는 요청은 stream_upload()가 받는 도중에 같은 한도로 막는다.
+    '''
+    def __init__(self, app, max_bytes: int):
+        self.app = app
+        self.max_bytes = max_bytes
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["method"] == "POST" and "/upload/" in scope["path"]:
+            headers = dict(scope.get("headers") or [])
+            content_length = headers.get(b"content-length")
+            if content_length is not None and content_length.isdigit() and int(content_length) > self.max_bytes + _MULTIPART_OVERHEAD:
+                body = json.dumps({"detail": str(UploadTooLarge(self.max_bytes))}).encode()
+                await send({
+                    "type": "http.response.start",
+                    "status": 413,
+                    "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode()), (b"connection", b"close")],
+                })
+                await send({"type": "http.response.body", "body": body})
+                return
+        await self.app(scope, receive, send)
@@ -7,19 +7,68 @@ import logging
 from typing import Optional
 from app.core.env_model import Env
 from app.core.logger import NoopRunLogger, NoopLoggerAdapter
+from app.core.context import bind_run_context, context_from_config, current_run_context, raise_if_cancelled
+from app.core.metrics import instrument_node
+from app.core.tracing import span
+from contextvars import ContextVar
+from langchain_core.runnables import RunnableConfig
 
 
 
 T = TypeVar("T", bound=dict)
 
 class BaseNode(ABC, Generic[T]):
+    '''
+    queue / env는 생성자 값이 기본이고, config로 RunContext(app.core.context.run_config)가 전달되면 그 값을 사용한다.
+    graph를 한 번 compile해서 여러 요청이 공유하므로 요청 단위 값과 logger는 instance가 아닌 context에 둔다.
+    '''
     def __init__(self, env: Env, track_time=False, queue: Queue=None, logger: Optional[LoggerAdapter] = None, **kwargs):
         self.name = self.__class__.__name__
         self.track_time = track_time
-        self.queue = queue
-        self.env = env
-        self.run_logger = getattr(env, "run_logger", None)
-        self.logger: LoggerAdapter | None = logger
+        self._queue = queue
+        self._env = env
+        self._injected_logger: LoggerAdapter | None = logger
+        self._logger_var: ContextVar[Optional[LoggerAdapter]] = ContextVar(f"{self.name}_logger", default=None)
+
+    @property
+    def queue(self) -> Optional[Queue]:
+        context = current_run_context()
+        return context.queue if context is not None else self._queue
+
+    @queue.setter
+    def queue(self, queue: Optional[Queue]):
+        self._queue = queue
+
+    @property
+    def env(self) -> Optional[Env]:
+        context = current_run_context()
+        if context is not None and context.env is not None:
+            return context.env
+        return self._env
+
+    @env.setter
+    def env(self, env: Optional[Env]):
+        self._env = env
+
+    @property
+    def run_logger(self):
+        return getattr(self.env, "run_logger", None)
+
+    @property
+    def logger(self) -> Optional[LoggerAdapter]:
+        if isinstance(self._injected_logger, LoggerAdapter):
+            return self._injected_logger
+        return self._logger_var.get()
+
+    @logger.setter
+    def logger(self, logger: Optional[LoggerAdapter]):
+        self._logger_var.set(logger)
+
+    @property
+    def pipeline(self) -> str:
+        '''metric label: app.<pipeline>.… (parser / analyst_agent / services)'''
+        parts = self.__class__.__module__.split(".")
+        return parts[1] if len(parts) > 1 else parts[0]
 
     @abstractmethod
     def run(self, state: T) -> T:
@@ -32,7 +81,7 @@ class BaseNode(ABC, Generic[T]):
         - run_id가 없으면 NoopRunLogger
         """
 
-        if isinstance(self.logger, LoggerAdapter):
+        if isinstance(self._injected_logger, LoggerAdapter):
             return
 
         
@@ -65,18 +114,30 @@ class BaseNode(ABC, Generic[T]):
                 **extras
             })
 
-    def __call__(self, state: T) -> T:
-        self._setup_logger(state.get("run_id"))
+    def __call__(self, state: T, config: Optional[RunnableConfig] = None) -> T:
+        with bind_run_context(context_from_config(config)):
+            # 취소된 run은 다음 node(LangGraph step)를 시작하지 않는다
+            raise_if_cancelled()
+            token = self._logger_var.set(None)
+            try:
+                self._setup_logger(state.get("run_id"))
+                # track_time과 무관하게 항상 latency / error / LLM usage를 /metrics로, node span을 trace로 기록
+                with instrument_node(self.pipeline, self.__class__.__name__), span(self.name, kind="node", pipeline=self.pipeline):
+                    return self._call(state)
+            finally:
+                self._logger_var.reset(token)
+
+    def _call(self, state: T) -> T:
         self.emit_event("start")
         
         if self.track_time:
             self.log(f"====< START >====")
-            start = time.time()
+            start = time.perf_counter()
 
         result = self.run(state)
         
         if self.track_time:
-            duration = time.time() - start
+            duration = time.perf_counter() - start
             self.log(f" Finished in {duration:.2f} second")
             self.log(f"====< END >====")
             self.emit_event("end", duration=f"{duration:.2f}")
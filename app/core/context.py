@@ -0,0 +1,129 @@
+from contextlib import contextmanager
+from contextvars import ContextVar, copy_context
+from dataclasses import dataclass
+from queue import Queue
+from typing import Any, Callable, List, Optional
+import threading
+
+from langchain_core.runnables import RunnableConfig
+
+
+RUN_CONTEXT_KEY = "run_context"
+
+
+class RunCancelled(Exception):
+    '''CancelToken이 취소된 run에서 다음 node를 시작하려 할 때 발생'''
+
+
+class CancelToken:
+    '''
+    run 하나의 협조적 취소 신호.
+
+    - cancel()은 어느 thread에서나 호출 가능 (WebSocket/HTTP 연결 종료, cancel endpoint 등)
+    - graph thread는 node 경계(BaseNode.__call__)에서 raise_if_cancelled()로 확인하고 멈춘다
+    - add_callback()으로 등록한 함수는 취소 시점에 한 번 호출 (대기 중인 future 취소 등)
+    '''
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.reason: Optional[str] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self, reason: str = "cancelled"):
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def add_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def remove_callback(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise RunCancelled(self.reason)
+
+
+@dataclass(frozen=True)
+class RunContext:
+    '''
+    요청 단위 값 (event queue, Env, CancelToken). 공유 compile된 graph의 node 생성자 대신 config로 전달한다.
+
+        graph.invoke(inputs, config=run_config(queue=q, env=env, cancel=token, thread_id=...))
+    '''
+    queue: Optional[Queue] = None
+    env: Optional[Any] = None
+    cancel: Optional[CancelToken] = None
+
+
+_current_run_context: ContextVar[Optional[RunContext]] = ContextVar("run_context", default=None)
+
+
+def run_config(
+    queue: Optional[Queue] = None,
+    env: Optional[Any] = None,
+    cancel: Optional[CancelToken] = None,
+    **kwargs,
+) -> RunnableConfig:
+    '''RunContext를 configurable에 담은 RunnableConfig (thread_id 등 나머지 key는 그대로 전달)'''
+    configurable = {**kwargs.pop("configurable", {}), RUN_CONTEXT_KEY: RunContext(queue=queue, env=env, cancel=cancel)}
+    return RunnableConfig(configurable=configurable, **kwargs)
+
+
+def context_from_config(config: Optional[RunnableConfig]) -> Optional[RunContext]:
+    if not config:
+        return None
+    return (config.get("configurable") or {}).get(RUN_CONTEXT_KEY)
+
+
+def current_run_context() -> Optional[RunContext]:
+    return _current_run_context.get()
+
+
+def current_cancel_token() -> Optional[CancelToken]:
+    context = _current_run_context.get()
+    return context.cancel if context is not None else None
+
+
+def raise_if_cancelled():
+    '''현재 run이 취소됐으면 RunCancelled (긴 반복 중간에서도 호출 가능)'''
+    token = current_cancel_token()
+    if token is not None:
+        token.raise_if_cancelled()
+
+
+@contextmanager
+def bind_run_context(context: Optional[RunContext]):
+    '''context가 None이면 바깥(현재) context를 그대로 유지'''
+    if context is None:
+        yield current_run_context()
+        return
+    token = _current_run_context.set(context)
+    try:
+        yield context
+    finally:
+        _current_run_context.reset(token)
+
+
+def submit_in_context(executor, fn, *args, **kwargs):
+    '''현재 contextvars(RunContext 등)를 복사해서 executor thread에서 실행'''
+    return executor.submit(copy_context().run, fn, *args, **kwargs)
@@ -0,0 +1,65 @@
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.graph.state import CompiledStateGraph
+
+
+class GraphRegistry:
+    '''
+    graph factory를 이름으로 등록해 두고 process 당 한 번만 build/compile해서 공유하는 registry.
+
+    - factory는 요청 단위 값(queue, env, run_id) 없이 호출된다. 이런 값은 run_config()로 config에 담아 전달
+    - get()은 처음 호출될 때 compile (warmup()으로 startup 시점에 미리 compile 가능)
+    - compile_seconds에 graph별 build + compile 시간을 기록
+    '''
+    def __init__(self):
+        self._factories: Dict[str, Callable[[], CompiledStateGraph]] = {}
+        self._graphs: Dict[str, CompiledStateGraph] = {}
+        self._lock = threading.RLock()
+        self.compile_seconds: Dict[str, float] = {}
+
+    def register(self, name: str, factory: Callable[[], CompiledStateGraph]):
+        with self._lock:
+            self._factories[name] = factory
+            self._graphs.pop(name, None)
+
+    def get(self, name: str) -> CompiledStateGraph:
+        graph = self._graphs.get(name)
+        if graph is not None:
+            return graph
+        with self._lock:
+            graph = self._graphs.get(name)
+            if graph is None:
+                start = time.perf_counter()
+                graph = self._factories[name]()
+                self.compile_seconds[name] = time.perf_counter() - start
+                self._graphs[name] = graph
+            return graph
+
+    def warmup(self, names: Optional[Iterable[str]] = None):
+        for name in list(names or self._factories):
+            self.get(name)
+
+    def clear(self):
+        with self._lock:
+            self._graphs.clear()
+
+
+graph_registry = GraphRegistry()
+
+
+def get_graph(name: str) -> CompiledStateGraph:
+    return graph_registry.get(name)
+
+
+def release_thread(graph: CompiledStateGraph, config: RunnableConfig):
+    '''
+    공유 graph의 checkpointer(MemorySaver)에서 끝난 run의 thread를 지운다.
+    graph를 요청마다 새로 만들 때는 checkpointer도 같이 버려졌으므로, 공유 graph에서는 run이 끝나면 호출해야 한다.
+    '''
+    thread_id = (config.get("configurable") or {}).get("thread_id") or config.get("thread_id")
+    checkpointer = getattr(graph, "checkpointer", None)
+    if thread_id is not None and hasattr(checkpointer, "delete_thread"):
+        checkpointer.delete_thread(str(thread_id))
@@ -0,0 +1,256 @@
+import math
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import UUID
+
+from langchain_community.callbacks.openai_info import OpenAICallbackHandler
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+
+# 노드 한 번의 실행 시간 (LLM 호출이 있는 노드는 수십 초까지)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+# (labels, value) 목록
+Samples = List[Tuple[Dict[str, str], float]]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    type = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...]) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(self._labels(key))} {_format_value(value)}" for key, value in items]
+
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def dec(self, amount: float = 1.0, **labels: str):
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> ([bucket별 개수], sum, count)
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], float, int]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = self._key(labels)
+        with self._lock:
+            counts, total, count = self._series.get(key) or ([0] * len(self.buckets), 0.0, 0)
+            for i, upper in enumerate(self.buckets):
+                if value <= upper:
+                    counts[i] += 1
+            self._series[key] = (counts, total + value, count + 1)
+
+    def lines(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(counts), total, count)) for key, (counts, total, count) in self._series.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            labels = self._labels(key)
+            for upper, bucket_count in zip(self.buckets, counts):
+                lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': _format_value(upper)})} {bucket_count}")
+            lines.append(f"{self.name}_bucket{_format_labels({**labels, 'le': '+Inf'})} {count}")
+            lines.append(f"{self.name}_sum{_format_labels(labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(labels)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    '''
+    process 단위 metric 모음. render()는 Prometheus text exposition format (0.0.4).
+
+    - counter() / gauge() / histogram()은 같은 이름이면 기존 metric을 돌려준다
+    - add_collector(fn)로 scrape 시점에 값을 읽어오는 metric(대기열 길이 등)을 추가
+      fn() -> [(name, type, help, [(labels, value), ...]), ...]
+    '''
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, str, Samples]]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, help: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, help, labelnames, **kwargs)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, help, labelnames)
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, help, labelnames)
+
+    def histogram(self, name: str, help: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, help, labelnames, buckets=buckets)
+
+    def add_collector(self, collector: Callable[[], Iterable[Tuple[str, str, str, Samples]]]):
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines += [f"# HELP {metric.name} {metric.help}", f"# TYPE {metric.name} {metric.type}", *metric.lines()]
+        for collector in self._collectors:
+            try:
+                collected = list(collector())
+            except Exception:
+                continue
+            for name, metric_type, help, samples in collected:
+                lines += [f"# HELP {name} {help}", f"# TYPE {name} {metric_type}"]
+                lines += [f"{name}{_format_labels(labels)} {_format_value(value)}" for labels, value in samples]
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+NODE_DURATION = registry.histogram(
+    "transcript_node_duration_seconds", "Graph node latency (perf_counter).", ("pipeline", "node")
+)
+NODE_ERRORS = registry.counter(
+    "transcript_node_errors_total", "Graph node calls that raised, by exception type.", ("pipeline", "node", "error")
+)
+NODE_IN_FLIGHT = registry.gauge(
+    "transcript_node_in_flight", "Graph node calls currently running.", ("pipeline", "node")
+)
+LLM_TOKENS = registry.counter(
+    "transcript_llm_tokens_total", "LLM tokens used inside graph nodes.", ("pipeline", "node", "model", "kind")
+)
+LLM_COST = registry.counter(
+    "transcript_llm_cost_usd_total", "Estimated LLM cost (USD) inside graph nodes.", ("pipeline", "node", "model")
+)
+
+
+class _NodeLLMUsage(BaseCallbackHandler):
+    '''
+    process 전체에서 하나. LLM 호출이 시작될 때의 가장 안쪽 node label(_current_node)로
+    token / cost 증가분을 기록 (node가 중첩돼도 호출 하나는 node 하나에만 계산된다)
+    '''
+    def __init__(self):
+        self._labels: Dict[UUID, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, run_id: UUID):
+        label = _current_node.get()
+        if label is not None:
+            with self._lock:
+                self._labels[run_id] = label
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs):
+        self._start(run_id)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs):
+        self._start(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        with self._lock:
+            self._labels.pop(run_id, None)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs):
+        with self._lock:
+            label = self._labels.pop(run_id, None)
+        if label is None:
+            return
+        # 호출 하나의 token / cost 계산은 OpenAICallbackHandler에 맡긴다 (model별 단가 포함)
+        usage = OpenAICallbackHandler()
+        usage.on_llm_end(response)
+        model = (response.llm_output or {}).get("model_name") or "unknown"
+        try:
+            model = response.generations[0][0].message.response_metadata.get("model_name") or model
+        except (AttributeError, IndexError):
+            pass
+        pipeline, node = label
+        labels = {"pipeline": pipeline, "node": node, "model": model}
+        if usage.prompt_tokens:
+            LLM_TOKENS.inc(usage.prompt_tokens, kind="prompt", **labels)
+        if usage.completion_tokens:
+            LLM_TOKENS.inc(usage.completion_tokens, kind="completion", **labels)
+        if usage.total_cost:
+            LLM_COST.inc(usage.total_cost, **labels)
+
+
+# 실행 중인 가장 안쪽 node (pipeline, node)
+_current_node: ContextVar[Optional[Tuple[str, str]]] = ContextVar("current_node", default=None)
+# 노드 안의 LLM 호출(get_openai_callback과 별개로)에 자동으로 붙는 handler. instance가 하나라 중첩 node에서도 한 번만 붙는다
+_node_llm_usage: ContextVar[Optional[_NodeLLMUsage]] = ContextVar("node_llm_usage", default=None)
+register_configure_hook(_node_llm_usage, inheritable=True)
+_NODE_LLM_USAGE = _NodeLLMUsage()
+
+
+@contextmanager
+def instrument_node(pipeline: str, node: str):
+    '''노드 한 번의 실행을 latency histogram / error counter / in-flight gauge / LLM usage에 기록'''
+    token = _node_llm_usage.set(_NODE_LLM_USAGE)
+    node_token = _current_node.set((pipeline, node))
+    NODE_IN_FLIGHT.inc(pipeline=pipeline, node=node)
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException as e:
+        NODE_ERRORS.inc(pipeline=pipeline, node=node, error=type(e).__name__)
+        raise
+    finally:
+        NODE_DURATION.observe(time.perf_counter() - start, pipeline=pipeline, node=node)
+        NODE_IN_FLIGHT.dec(pipeline=pipeline, node=node)
+        _current_node.reset(node_token)
+        _node_llm_usage.reset(token)
@@ -0,0 +1,215 @@
+import json
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.tracers.context import register_configure_hook
+
+
+# run별 logs 디렉터리 아래 파일 이름 (ws_events.jsonl 옆)
+TRACE_FILE = "trace.jsonl"
+# 자식 span이 부모에게서 물려받는 attribute
+INHERITED_ATTRS = ("run_id", "session_id", "metric_id", "attempt")
+
+
+class _Trace:
+    '''run 하나의 span을 JSONL 파일 하나에 쓰는 exporter (span이 끝날 때마다 한 줄)'''
+    def __init__(self, path: Union[str, Path]):
+        self.trace_id = uuid.uuid4().hex
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, span: "Span"):
+        line = json.dumps(span.to_dict(), ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError:
+                pass
+
+
+class Span:
+    '''
+    trace의 구간 하나 (run → graph → node → llm / exec / http).
+    시작/끝 시각은 epoch 초, duration은 perf_counter로 잰다.
+    '''
+    def __init__(self, trace: _Trace, name: str, kind: str, parent: Optional["Span"] = None, **attrs: Any):
+        self.trace = trace
+        self.name = name
+        self.kind = kind
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        inherited = {k: parent.attrs[k] for k in INHERITED_ATTRS if parent is not None and k in parent.attrs}
+        self.attrs: Dict[str, Any] = {**inherited, **{k: v for k, v in attrs.items() if v is not None}}
+        self.start = time.time()
+        self._start_perf = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.thread = threading.current_thread().name
+        self.status = "ok"
+        self.error: Optional[str] = None
+
+    def set(self, **attrs: Any):
+        self.attrs.update({k: v for k, v in attrs.items() if v is not None})
+
+    def fail(self, error: BaseException):
+        self.status = "error"
+        self.error = f"{type(error).__name__}: {error}"[:500]
+
+    def finish(self):
+        if self.duration is None:
+            self.duration = time.perf_counter() - self._start_perf
+            self.trace.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start": self.start,
+            "duration": self.duration,
+            "thread": self.thread,
+            "status": self.status,
+            "error": self.error,
+            "attrs": self.attrs,
+        }
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("trace_span", default=None)
+
+
+def current_span() -> Optional[Span]:
+    return _current_span.get()
+
+
+@contextmanager
+def span(name: str, kind: str = "internal", **attrs: Any) -> Iterator[Optional[Span]]:
+    '''
+    현재 span의 자식 span. trace 중이 아니면(부모 span 없음) 아무것도 하지 않고 None을 넘긴다.
+    contextvars로 전달되므로 thread pool에서는 submit_in_context()로 실행해야 이어진다.
+    '''
+    parent = _current_span.get()
+    if parent is None:
+        yield None
+        return
+    child = Span(parent.trace, name, kind, parent=parent, **attrs)
+    token = _current_span.set(child)
+    try:
+        yield child
+    except BaseException as e:
+        child.fail(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        child.finish()
+
+
+class _LLMSpanHandler(BaseCallbackHandler):
+    '''LLM 호출마다 현재 span 아래에 kind="llm" span을 만든다 (model, token 수)'''
+    def __init__(self):
+        self._spans: Dict[UUID, Span] = {}
+        self._lock = threading.Lock()
+
+    def _start(self, serialized: Optional[Dict[str, Any]], run_id: UUID, kwargs: Dict[str, Any]):
+        parent = _current_span.get()
+        if parent is None:
+            return
+        params = kwargs.get("invocation_params") or {}
+        model = params.get("model_name") or params.get("model") or params.get("_type") or ((serialized or {}).get("kwargs") or {}).get("model_name")
+        llm_span = Span(parent.trace, f"llm {model or 'call'}", "llm", parent=parent, model=model)
+        with self._lock:
+            self._spans[run_id] = llm_span
+
+    def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any):
+        self._start(serialized, run_id, kwargs)
+
+    def on_llm_start(self, serialized, prompts, *, run_id: UUID, **kwargs: Any):
+        self._start(serialized, run_id, kwargs)
+
+    def on_llm_end(self, response, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            llm_span = self._spans.pop(run_id, None)
+        if llm_span is None:
+            return
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        try:
+            usage = response.generations[0][0].message.usage_metadata or usage
+        except (AttributeError, IndexError):
+            pass
+        llm_span.set(
+            prompt_tokens=usage.get("input_tokens", usage.get("prompt_tokens")),
+            completion_tokens=usage.get("output_tokens", usage.get("completion_tokens")),
+        )
+        llm_span.finish()
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        with self._lock:
+            llm_span = self._spans.pop(run_id, None)
+        if llm_span is not None:
+            llm_span.fail(error)
+            llm_span.finish()
+
+
+_llm_span_handler: ContextVar[Optional[_LLMSpanHandler]] = ContextVar("trace_llm_spans", default=None)
+register_configure_hook(_llm_span_handler, inheritable=True)
+_LLM_HANDLER = _LLMSpanHandler()
+
+
+@contextmanager
+def trace_run(path: Union[str, Path], name: str = "run", **attrs: Any) -> Iterator[Span]:
+    '''
+    run 하나의 root span. 안에서 만든 span과 LLM 호출이 path(JSONL)에 기록된다.
+
+        with trace_run(logs_dir / "trace.jsonl", "analyze", run_id=run_id, session_id=session_id):
+            with span("transcript_analyst", kind="graph"):
+                graph.invoke(...)
+    '''
+    root = Span(_Trace(path), name, "run", **attrs)
+    try:
+        with use_span(root):
+            yield root
+    except BaseException as e:
+        root.fail(e)
+        raise
+    finally:
+        root.finish()
+
+
+@contextmanager
+def use_span(parent: Optional[Span]) -> Iterator[Optional[Span]]:
+    '''
+    parent를 현재 span으로 둔다. thread pool로 넘긴 작업을 같은 trace에 이을 때
+    submit 전에 current_span()을 잡아 두었다가 worker thread에서 use_span(parent)로 연다.
+    '''
+    if parent is None:
+        yield None
+        return
+    token = _current_span.set(parent)
+    handler_token = _llm_span_handler.set(_LLM_HANDLER)
+    try:
+        yield parent
+    finally:
+        _llm_span_handler.reset(handler_token)
+        _current_span.reset(token)
+
+
+def read_trace(path: Union[str, Path]) -> List[Dict[str, Any]]:
+    spans = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                try:
+                    spans.append(json.loads(line))
+                except ValueError:
+                    continue
+    return sorted(spans, key=lambda s: s["start"])
@@ -0,0 +1,80 @@
+import os
+import json
+import gzip
+import tempfile
+import threading
+from pathlib import Path
+from functools import lru_cache
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, Optional, Set, Union
+
+
+class ArtifactWriter:
+    '''
+    parser / OCR API 응답을 요청 경로 밖(background thread)에서 파일로 남기는 writer.
+
+    - 응답은 state로 바로 넘기고, 파일은 디버깅/재현용 artifact로만 사용
+    - 들여쓰기 없는 compact JSON을 gzip으로 저장 ("<name>.json.gz"), tmp 파일 rename으로 원자적 교체
+    - enabled=False이면 아무것도 쓰지 않고 path도 None
+    - submit 이후 data를 수정하지 않아야 한다 (background에서 직렬화)
+    '''
+    def __init__(self, enabled: bool = True, max_workers: int = 2, compresslevel: int = 6):
+        self.enabled = enabled
+        self.compresslevel = compresslevel
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="artifact-writer") if enabled else None
+        self._pending: Set[Future] = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def path_for(path: Union[str, Path]) -> str:
+        path = str(path)
+        if path.endswith(".json"):
+            path = path[: -len(".json")]
+        return f"{path}.json.gz"
+
+    def write(self, data: Any, path: Union[str, Path]) -> str:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=self.compresslevel) as f:
+                f.write(json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        return str(path)
+
+    def _done(self, future: Future):
+        with self._lock:
+            self._pending.discard(future)
+        if future.exception() is not None:
+            print(f"[ArtifactWriter] failed to write artifact: {future.exception()!r}")
+
+    def submit(self, data: Any, path: Union[str, Path]) -> Optional[str]:
+        '''background 저장을 예약하고 최종 파일 경로를 반환 (비활성화면 None)'''
+        if not self.enabled:
+            return None
+        target = self.path_for(path)
+        future = self._executor.submit(self.write, data, target)
+        with self._lock:
+            self._pending.add(future)
+        future.add_done_callback(self._done)
+        return target
+
+    def flush(self, timeout: Optional[float] = None):
+        '''예약된 저장이 끝날 때까지 대기'''
+        with self._lock:
+            pending = list(self._pending)
+        wait(pending, timeout=timeout)
+
+
+def load_artifact(path: Union[str, Path]) -> Any:
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@lru_cache(maxsize=None)
+def get_artifact_writer() -> ArtifactWriter:
+    '''PARSER_PERSIST_ARTIFACTS=0 이면 artifact를 남기지 않음'''
+    return ArtifactWriter(enabled=os.environ.get("PARSER_PERSIST_ARTIFACTS", "1") == "1")
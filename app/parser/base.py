@@ -2,6 +2,11 @@ from abc import ABC, abstractmethod
 from typing import Generic, TypeVar
 import time
 from queue import Queue
+from typing import Optional
+from langchain_core.runnables import RunnableConfig
+from app.core.context import bind_run_context, context_from_config, current_run_context, raise_if_cancelled
+from app.core.metrics import instrument_node
+from app.core.tracing import span
 
 T = TypeVar("T", bound=dict)
 
@@ -12,6 +17,22 @@ class BaseNode(ABC, Generic[T]):
         self.track_time = track_time
         self.queue = queue
 
+    @property
+    def queue(self) -> Optional[Queue]:
+        '''config로 RunContext가 전달되면 그 queue, 아니면 생성자 queue'''
+        context = current_run_context()
+        return context.queue if context is not None else self._queue
+
+    @queue.setter
+    def queue(self, queue: Optional[Queue]):
+        self._queue = queue
+
+    @property
+    def pipeline(self) -> str:
+        '''metric label: app.<pipeline>.… (parser / analyst_agent / services)'''
+        parts = self.__class__.__module__.split(".")
+        return parts[1] if len(parts) > 1 else parts[0]
+
     @abstractmethod
     def run(self, state: T) -> T:
         pass
@@ -31,17 +52,25 @@ class BaseNode(ABC, Generic[T]):
                 **extras
             })
 
-    def __call__(self, state: T) -> T:
+    def __call__(self, state: T, config: Optional[RunnableConfig] = None) -> T:
+        with bind_run_context(context_from_config(config)):
+            # 취소된 run은 다음 node(LangGraph step)를 시작하지 않는다
+            raise_if_cancelled()
+            # track_time과 무관하게 항상 latency / error / LLM usage를 /metrics로, node span을 trace로 기록
+            with instrument_node(self.pipeline, self.__class__.__name__), span(self.name, kind="node", pipeline=self.pipeline):
+                return self._call(state)
+
+    def _call(self, state: T) -> T:
         self.emit_event("start")
         
         if self.track_time:
             self.log(f"====< START >====")
-            start = time.time()
+            start = time.perf_counter()
 
         result = self.run(state)
         
         if self.track_time:
-            duration = time.time() - start
+            duration = time.perf_counter() - start
             self.log(f" Finished in {duration:.2f} second")
             self.log(f"====< END >====")
             self.emit_event("end", duration=f"{duration:.2f}")
@@ -0,0 +1,178 @@
+import io
+import os
+import uuid
+import base64
+import shutil
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple, Union
+
+from PIL import Image
+
+
+DEFAULT_MAX_MEMORY_BYTES = int(float(os.environ.get("BLOB_STORE_MAX_MEMORY_MB", 64)) * 1024 * 1024)
+DEFAULT_SPILL_DIR = os.environ.get("BLOB_STORE_SPILL_DIR") or None
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+HANDLE_PREFIX = "blob://"
+
+
+def is_png(data: bytes) -> bool:
+    return data[:8] == PNG_SIGNATURE
+
+
+def write_png(data: bytes, path: Union[str, Path]) -> str:
+    '''이미 PNG이면 bytes를 그대로 쓰고, 아니면 PIL로 PNG 변환해서 저장'''
+    if is_png(data):
+        with open(path, "wb") as f:
+            f.write(data)
+    else:
+        Image.open(io.BytesIO(data)).save(path, format="PNG")
+    return str(path)
+
+
+class BlobStore:
+    '''
+    한 run 동안 디코딩된 이미지 bytes를 한 번만 들고 있는 store.
+
+    LangGraph state / MemorySaver checkpoint에는 base64 문자열 대신 handle("blob://<store_id>/<sha256>")만 들어간다.
+    - 같은 내용은 sha256 기준으로 한 번만 저장
+    - 메모리 사용량이 max_memory_bytes를 넘으면 이후 blob은 spill_dir 아래 파일로 저장
+    - close() 시 spill 파일까지 정리
+    '''
+    def __init__(
+        self,
+        store_id: Optional[str] = None,
+        max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+        spill_dir: Optional[Union[str, Path]] = DEFAULT_SPILL_DIR,
+    ):
+        self.id = store_id or uuid.uuid4().hex
+        self.max_memory_bytes = max_memory_bytes
+        self._spill_root = spill_dir
+        self._spill_dir: Optional[Path] = None
+        self._memory: Dict[str, bytes] = {}
+        self._spilled: Dict[str, Path] = {}
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+
+    def _handle(self, digest: str) -> str:
+        return f"{HANDLE_PREFIX}{self.id}/{digest}"
+
+    @staticmethod
+    def parse_handle(handle: str) -> Tuple[str, str]:
+        '''handle → (store_id, sha256)'''
+        if not handle.startswith(HANDLE_PREFIX):
+            raise ValueError(f"Not a blob handle: {handle!r}")
+        store_id, _, digest = handle[len(HANDLE_PREFIX):].partition("/")
+        return store_id, digest
+
+    @staticmethod
+    def digest(handle: str) -> str:
+        return BlobStore.parse_handle(handle)[1]
+
+    def _spill_path(self, digest: str) -> Path:
+        if self._spill_dir is None:
+            self._spill_dir = Path(tempfile.mkdtemp(prefix=f"blobs-{self.id[:8]}-", dir=self._spill_root))
+        return self._spill_dir / f"{digest}.bin"
+
+    def put(self, data: bytes) -> str:
+        digest = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if digest in self._memory or digest in self._spilled:
+                return self._handle(digest)
+            if self._memory_bytes + len(data) <= self.max_memory_bytes:
+                self._memory[digest] = data
+                self._memory_bytes += len(data)
+            else:
+                path = self._spill_path(digest)
+                path.write_bytes(data)
+                self._spilled[digest] = path
+        return self._handle(digest)
+
+    def put_base64(self, base64_encoding: str) -> str:
+        return self.put(base64.b64decode(base64_encoding))
+
+    def get(self, handle: str) -> bytes:
+        store_id, digest = self.parse_handle(handle)
+        if store_id != self.id:
+            raise KeyError(f"Blob {handle!r} does not belong to store {self.id}")
+        with self._lock:
+            data = self._memory.get(digest)
+            path = self._spilled.get(digest)
+        if data is not None:
+            return data
+        if path is not None:
+            return path.read_bytes()
+        raise KeyError(f"Unknown blob {handle!r}")
+
+    def write_png(self, handle: str, path: Union[str, Path]) -> str:
+        '''blob을 PNG 파일로 저장 (이미 PNG이면 re-encode 없이 그대로 복사)'''
+        with self._lock:
+            spilled = self._spilled.get(self.digest(handle))
+        if spilled is not None:
+            with open(spilled, "rb") as f:
+                if is_png(f.read(8)):
+                    shutil.copyfile(spilled, path)
+                    return str(path)
+        return write_png(self.get(handle), path)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "blobs": len(self._memory) + len(self._spilled),
+                "memory_bytes": self._memory_bytes,
+                "spilled": len(self._spilled),
+            }
+
+    def close(self):
+        with self._lock:
+            self._memory.clear()
+            self._spilled.clear()
+            self._memory_bytes = 0
+            spill_dir, self._spill_dir = self._spill_dir, None
+        if spill_dir is not None:
+            shutil.rmtree(spill_dir, ignore_errors=True)
+
+    def __enter__(self) -> "BlobStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+_stores: Dict[str, BlobStore] = {}
+_stores_lock = threading.Lock()
+
+
+def open_blob_store(store_id: Optional[str] = None, **kwargs) -> BlobStore:
+    '''store_id의 BlobStore를 반환 (없으면 생성해서 등록). run이 끝나면 close_blob_store로 정리'''
+    with _stores_lock:
+        if store_id is not None and store_id in _stores:
+            return _stores[store_id]
+        store = BlobStore(store_id=store_id, **kwargs)
+        _stores[store.id] = store
+        return store
+
+
+def get_blob_store(store_id: str) -> BlobStore:
+    with _stores_lock:
+        return _stores[store_id]
+
+
+def close_blob_store(store_id: str):
+    with _stores_lock:
+        store = _stores.pop(store_id, None)
+    if store is not None:
+        store.close()
+
+
+def resolve_blob(handle: str) -> BlobStore:
+    '''handle이 속한 BlobStore'''
+    store_id, _ = BlobStore.parse_handle(handle)
+    return get_blob_store(store_id)
+
+
+def read_blob(handle: str) -> bytes:
+    return resolve_blob(handle).get(handle)
@@ -0,0 +1,100 @@
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pydantic import BaseModel, Field
+
+from .element import TableBoundary
+from .table_scorer import GRADE_TOKEN_RE
+
+
+SEMESTER_HEADER_RE = re.compile(r"^\d{4}\s*년도.*\d\s*학기")
+CREDIT_TOKEN_RE = re.compile(r"^\d(?:\.\d)?$")
+
+HEADER_KEYWORDS = ("년도", "학기", "과목명", "학점", "성적")
+FOOTER_KEYWORDS = ("합계", "평점평균", "취득학점", "총계", "평균평점")
+
+
+class BoundaryEstimate(BaseModel):
+    boundary: Optional[TableBoundary] = Field(None, description="None이면 boundary를 찾지 못함")
+    confidence: float = Field(0.0, description="boundary에 대한 확신도 (0~1)")
+    features: Dict[str, float] = Field(default_factory=dict)
+
+
+class GradeTableBoundaryDetector:
+    '''
+    GroupXYLine의 줄 단위 결과 [(text, x, y), ...]에서 성적 table의 y boundary를 규칙 기반으로 찾는다.
+    (boundary_detector.yaml prompt의 규칙을 그대로 코드로 옮긴 것)
+
+    ## Rule
+    - header: 학기 header("2021년도 1학기") 또는 column header(년도/학기/과목명/학점/성적 중 3개 이상)
+      y_top = header 줄들의 최소 y
+    - course line: 첫 header 이후, 성적 token(A+, B0, P ...)과 학점 token(3.0 ...)을 모두 가진 줄
+    - y_bottom = 마지막 course line보다 아래(y가 큰) 줄 중 가장 위의 y
+    - footer(합계/평점평균/취득학점 ...)가 course line 아래에 있으면 boundary를 뒷받침하는 신호로 사용
+
+    ## confidence
+    header / course line 수 / footer / grade 구간 안의 course line 밀도로 계산.
+    '''
+    def __init__(self, min_course_lines: int = 3):
+        self.min_course_lines = min_course_lines
+
+    @staticmethod
+    def is_header(text: str) -> bool:
+        text = text.strip()
+        if SEMESTER_HEADER_RE.match(text) or ("년도" in text and "학기" in text):
+            return True
+        return sum(1 for keyword in HEADER_KEYWORDS if keyword in text) >= 3
+
+    @staticmethod
+    def is_course(text: str) -> bool:
+        tokens = text.split()
+        return any(GRADE_TOKEN_RE.match(t) for t in tokens) and any(CREDIT_TOKEN_RE.match(t) for t in tokens)
+
+    @staticmethod
+    def is_footer(text: str) -> bool:
+        compact = text.replace(" ", "")
+        return any(keyword in compact for keyword in FOOTER_KEYWORDS)
+
+    def detect(self, lines: Sequence[Tuple[str, int, int]]) -> BoundaryEstimate:
+        headers: List[int] = []
+        courses: List[int] = []
+        first_header = None
+        for index, (text, _, y) in enumerate(lines):
+            if self.is_header(text):
+                headers.append(y)
+                if first_header is None:
+                    first_header = index
+            elif first_header is not None and self.is_course(text):
+                courses.append(y)
+
+        features = {"headers": len(headers), "course_lines": len(courses), "footer": 0.0, "course_density": 0.0}
+        if not headers or not courses:
+            return BoundaryEstimate(features=features)
+
+        y_top = min(headers)
+        last_course_y = max(courses)
+        below = [(text, y) for text, _, y in lines if y > last_course_y]
+        if below:
+            y_bottom = min(y for _, y in below)
+        else:
+            # 페이지 끝까지 course line이면 SplitByYBoundaryNode의 -3 보정 이후에도 포함되도록
+            y_bottom = last_course_y + 4
+        if y_bottom <= y_top:
+            return BoundaryEstimate(features=features)
+
+        footer = any(self.is_footer(text) for text, _ in below)
+        in_table = [text for text, _, y in lines if y_top <= y < y_bottom]
+        density = len(courses) / max(1, len(in_table) - len(headers))
+        features.update({"footer": float(footer), "course_density": min(1.0, density)})
+
+        confidence = (
+            0.3
+            + 0.3 * min(1.0, len(courses) / self.min_course_lines)
+            + 0.2 * float(footer)
+            + 0.2 * features["course_density"]
+        )
+        return BoundaryEstimate(
+            boundary=TableBoundary(y_top=y_top, y_bottom=y_bottom),
+            confidence=round(confidence, 4),
+            features=features,
+        )
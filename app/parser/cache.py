@@ -0,0 +1,163 @@
+import os
+import json
+import gzip
+import time
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from functools import lru_cache
+from typing import Any, Optional, Union
+
+
+DEFAULT_CACHE_DIR = Path(".cache/upstage")
+DEFAULT_TTL_SEC = 7 * 24 * 3600.0
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+_CHUNK_SIZE = 1024 * 1024
+
+
+def file_sha256(filepath: Union[str, Path]) -> str:
+    '''파일 내용을 chunk 단위로 읽어 SHA-256 hex digest를 반환'''
+    h = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DiskCache:
+    '''
+    Content-addressed JSON cache stored as gzip files on local disk.
+
+    - key는 make_key()로 만든 SHA-256 hex (입력 내용 + 설정값)
+    - ttl_sec이 지난 entry는 get() 시점에 삭제하고 miss로 처리
+    - 전체 크기가 max_bytes를 넘으면 가장 오래 전에 사용된 entry부터 삭제(LRU, mtime 기준)
+    - hits / misses 카운트는 process 단위로 누적
+    '''
+    def __init__(
+        self,
+        cache_dir: Union[str, Path] = DEFAULT_CACHE_DIR,
+        namespace: str = "default",
+        ttl_sec: Optional[float] = DEFAULT_TTL_SEC,
+        max_bytes: Optional[int] = DEFAULT_MAX_BYTES,
+    ):
+        self.dir = Path(cache_dir) / namespace
+        self.ttl_sec = ttl_sec
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(*parts: Any) -> str:
+        h = hashlib.sha256()
+        for part in parts:
+            if isinstance(part, bytes):
+                h.update(part)
+            elif isinstance(part, str):
+                h.update(part.encode("utf-8"))
+            else:
+                h.update(json.dumps(part, sort_keys=True, ensure_ascii=False, default=str).encode("utf-8"))
+            h.update(b"\x00")
+        return h.hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.dir / key[:2] / f"{key}.json.gz"
+
+    def _count(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def get(self, key: str) -> Optional[Any]:
+        path = self.path_for(key)
+        try:
+            mtime = path.stat().st_mtime
+        except FileNotFoundError:
+            self._count(hit=False)
+            return None
+
+        if self.ttl_sec is not None and time.time() - mtime > self.ttl_sec:
+            path.unlink(missing_ok=True)
+            self._count(hit=False)
+            return None
+
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                value = json.load(f)
+        except (OSError, ValueError):
+            # 깨진 entry는 지우고 miss로 처리
+            path.unlink(missing_ok=True)
+            self._count(hit=False)
+            return None
+
+        # LRU eviction을 위해 사용 시각 갱신
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self._count(hit=True)
+        return value
+
+    def set(self, key: str, value: Any) -> Path:
+        path = self.path_for(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # 동시 요청이 같은 key를 쓰더라도 반쯤 쓰인 파일이 보이지 않도록 rename으로 교체
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+                f.write(json.dumps(value, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+            os.replace(tmp_path, path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+        self.evict()
+        return path
+
+    def evict(self):
+        '''TTL 만료 entry를 지우고, 남은 크기가 max_bytes 이하가 될 때까지 LRU 순으로 삭제'''
+        if not self.dir.exists():
+            return
+        now = time.time()
+        entries = []
+        for path in self.dir.glob("*/*.json.gz"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if self.ttl_sec is not None and now - st.st_mtime > self.ttl_sec:
+                path.unlink(missing_ok=True)
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+        if self.max_bytes is None:
+            return
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries, key=lambda e: e[0]):
+            if total <= self.max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+
+
+@lru_cache(maxsize=None)
+def get_cache(namespace: str) -> DiskCache:
+    '''
+    namespace별 process-wide DiskCache (hit/miss 카운트를 요청 간에 공유).
+    UPSTAGE_CACHE_DIR / UPSTAGE_CACHE_TTL_SEC / UPSTAGE_CACHE_MAX_MB는 import 시점이 아니라 처음 만들 때 읽는다 (.env 로드 후)
+    '''
+    return DiskCache(
+        cache_dir=os.environ.get("UPSTAGE_CACHE_DIR", DEFAULT_CACHE_DIR),
+        namespace=namespace,
+        ttl_sec=float(os.environ.get("UPSTAGE_CACHE_TTL_SEC", DEFAULT_TTL_SEC)),
+        max_bytes=int(float(os.environ.get("UPSTAGE_CACHE_MAX_MB", DEFAULT_MAX_BYTES / (1024 * 1024))) * 1024 * 1024),
+    )
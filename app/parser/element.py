@@ -7,7 +7,7 @@ class Element(BaseModel):
     category: str  # upstage-doc-parser categories : table, figure, chart, heading1, header, footer, caption, paragraph, equation, list, index, footnote
     content: str = ""
     markdown: str = ""
-    base64_encoding: Optional[str] = None
+    image_handle: Optional[str] = None  # BlobStore handle (blob://...) - base64 원본은 state에 들고 다니지 않음
     id: Optional[int] = None
     ocr_need : bool = False
 
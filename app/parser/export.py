@@ -1,12 +1,12 @@
 import re
 import os
-import io
 import base64
-from PIL import Image
 from io import StringIO
 import pandas as pd
 from .base import BaseNode
 from .state import ParseState
+from .ocr_words import OCRWords
+from .blob_store import read_blob, resolve_blob, write_png
 from bs4 import BeautifulSoup
 
 class ExportImage(BaseNode):
@@ -14,18 +14,13 @@ class ExportImage(BaseNode):
         """
         문서에서 추출한 이미지를 PNG 파일로 저장하는 클래스입니다.
 
-        base64로 인코딩된 이미지 데이터를 디코딩하여 PNG 파일로 저장합니다.
+        BlobStore handle(image_handle)의 bytes를 PNG 파일로 저장합니다.
+        (handle이 없는 예전 element는 base64를 디코딩해서 저장)
         저장된 이미지는 카테고리별로 분류되어 저장됩니다.
         """
         super().__init__(verbose=verbose, **kwargs)
 
-    def save_to_png(self, base64_encoding, dirname, basename, category, index):
-        # base64 디코딩
-        image_data = base64.b64decode(base64_encoding)
-
-        # 바이트 데이터를 이미지로 변환
-        image = Image.open(io.BytesIO(image_data))
-
+    def save_to_png(self, image_handle, dirname, basename, category, index, base64_encoding=None):
         # dirname 내에 images 폴더와 하위 카테고리 폴더 생성
         image_dir = os.path.join(dirname, "images", category)
         os.makedirs(image_dir, exist_ok=True)
@@ -38,9 +33,10 @@ class ExportImage(BaseNode):
         image_path = os.path.join(image_dir, image_filename)
         abs_image_path = os.path.abspath(image_path)
 
-        # 이미지 저장
-        image.save(abs_image_path)
-        return abs_image_path
+        # 이미지 저장 (이미 PNG bytes이면 re-encode 없이 그대로 기록)
+        if image_handle:
+            return resolve_blob(image_handle).write_png(image_handle, abs_image_path)
+        return write_png(base64.b64decode(base64_encoding), abs_image_path)
 
     def run(self, state: ParseState):
         # 경로
@@ -49,14 +45,13 @@ class ExportImage(BaseNode):
         basename = os.path.basename(filepath)
         for elem in state["raw_elements"]:
             if elem["category"] in ["figure", "chart", "table"]:
-                # base64 인코딩이 있는지 확인
-                base64_encoding = elem.get("base64_encoding")
                 image_path = self.save_to_png(
-                    base64_encoding,
+                    elem.get("image_handle"),
                     dirname,
                     basename,
                     elem["category"],
                     elem["id"],
+                    base64_encoding=elem.get("base64_encoding"),
                 )
                 # element의 png_filepath key를 만들어서 path저장
                 elem["png_filepath"] = image_path
@@ -102,8 +97,10 @@ class ExportHTML(BaseNode):
                     continue
 
                 if elem["category"] in ["figure", "chart", "table"]:
-                    # base64 인코딩이 있는지 확인
+                    # base64 인코딩이 있는지 확인 (BlobStore handle이면 HTML 삽입 시점에만 인코딩)
                     base64_encoding = elem.get("base64_encoding")
+                    if not base64_encoding and elem.get("image_handle"):
+                        base64_encoding = base64.b64encode(read_blob(elem["image_handle"])).decode("ascii")
 
                     # HTML에 src 속성 추가
                     modified_html = self._add_base64_src_to_html(
@@ -268,51 +265,10 @@ class ExportTableCSV(BaseNode):
 
 # TODO Export에서 Json 형식의 자료구조를 추가하기. 약간 신문 기사를 parsing해오는 느낌으로.
 
-from collections import defaultdict
-
 def group_by_lines(ocr_data, page_width, num_cols=3, y_threshold=3):
-    col_width = page_width / num_cols
-    columns = defaultdict(list)
-
-    # 열 분류
-    for entry in ocr_data:
-        x0 = entry["boundingBox"]["vertices"][0]["x"]
-        y0 = entry["boundingBox"]["vertices"][0]["y"]
-        col_index = int(x0 // col_width)
-        col_index = min(col_index, num_cols - 1)
-        columns[col_index].append((y0, x0, entry["text"])) 
-
-    # 좌 → 우, 각 열 내부 y 정렬
-    all_texts = []
-    for col in range(num_cols):
-        sorted_col = sorted(columns[col], key=lambda t: t[0])  # y 기준 정렬
-        all_texts.extend(sorted_col)
-
-    # y가 비슷한 것들끼리 묶기 + 같은 줄 내 x 기준 정렬
-    lines = []
-    current_line = []
-    current_y = None
-
-    for y, x, text in all_texts:
-        if current_y is None:
-            current_y = y
-            current_line.append((x, text))
-        elif abs(y - current_y) <= y_threshold:
-            current_line.append((x, text))
-        else:
-            # x 기준 정렬 추가
-            current_line_sorted = [t[1] for t in sorted(current_line, key=lambda t: t[0])]
-            lines.append(current_line_sorted)
-
-            current_line = [(x, text)]
-            current_y = y
-
-    # 마지막 줄 처리
-    if current_line:
-        current_line_sorted = [t[1] for t in sorted(current_line, key=lambda t: t[0])]
-        lines.append(current_line_sorted)
-
-    return lines
+    # Upstage OCR words → 줄 단위 word list (GroupXYLine과 같은 OCRWords 구현 사용)
+    words = OCRWords.from_upstage_words(ocr_data)
+    return words.group_line_tokens(page_width, num_cols=num_cols, y_threshold=y_threshold)
 
 
 def format_as_text(lines):
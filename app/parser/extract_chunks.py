@@ -0,0 +1,131 @@
+import re
+from typing import Dict, List, Sequence, Tuple
+
+from .rule_extractor import DEFAULT_TEMPLATE
+
+
+SEMESTER_LINE_RE = re.compile(r"^\s*#*\s*" + DEFAULT_TEMPLATE.semester_pattern, re.MULTILINE)
+
+_CREDIT_TOLERANCE = 0.5
+_FAILING_GRADES = {"F", "NP", "U", "FAIL"}
+
+
+def split_transcript_text(text: str, max_chars: int) -> List[str]:
+    '''
+    transcript_text를 학기 header 줄 기준으로 나눠 max_chars 이하 chunk로 묶는다.
+
+    - 첫 학기 header 이전(학생 정보 등)은 첫 chunk에 포함
+    - 학기 block 하나가 max_chars보다 길면 그 block만 단독 chunk
+    - 학기 header가 없거나 전체가 max_chars 이하면 [text]
+    '''
+    if max_chars <= 0 or len(text) <= max_chars:
+        return [text]
+    starts = [m.start() for m in SEMESTER_LINE_RE.finditer(text)]
+    if not starts:
+        return [text]
+    if starts[0] != 0:
+        starts[0] = 0
+    blocks = [text[a:b] for a, b in zip(starts, starts[1:] + [len(text)])]
+
+    chunks, current = [], ""
+    for block in blocks:
+        if current and len(current) + len(block) > max_chars:
+            chunks.append(current)
+            current = ""
+        current += block
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _course_key(course: Dict) -> Tuple:
+    return (
+        re.sub(r"\s+", "", str(course.get("name") or "")),
+        str(course.get("grade") or "").upper(),
+        course.get("credits"),
+    )
+
+
+def _credits_sum(courses: Sequence[Dict], earned_only: bool = False) -> float:
+    return sum(
+        float(c.get("credits") or 0) for c in courses
+        if not (earned_only and str(c.get("grade") or "").upper() in _FAILING_GRADES)
+    )
+
+
+def _matches(reported, *candidates: float) -> bool:
+    return reported is not None and any(abs(float(reported) - c) <= _CREDIT_TOLERANCE for c in candidates)
+
+
+def merge_transcript_results(results: Sequence[Dict], log=None) -> Dict:
+    '''
+    chunk별 추출 결과를 하나의 final_result로 합친다.
+
+    - student_info: field별로 처음 나온 null이 아닌 값
+    - semesters: (year, semester) 기준으로 합치고 course는 (name, grade, credits)로 중복 제거
+      보고된 total_credits가 course 합계(전체 또는 F/NP 제외 취득학점)와 맞지 않으면 취득학점 합계로 교체
+    - credit_summary: 처음 나온 값 사용, total_credits는 학기 합계와 맞지 않으면 학기 합계로 교체
+      credits_by_category / multi_major_credits는 key별 최대값
+    '''
+    log = log or (lambda message: None)
+    student_info: Dict = {}
+    semesters: Dict[Tuple, Dict] = {}
+    summary: Dict = {}
+
+    for result in results:
+        if not isinstance(result, dict):
+            continue
+        for key, value in (result.get("student_info") or {}).items():
+            if student_info.get(key) is None:
+                student_info[key] = value
+
+        for semester in result.get("semesters") or []:
+            key = (semester.get("year"), semester.get("semester"))
+            merged = semesters.get(key)
+            if merged is None:
+                merged = semesters[key] = {**semester, "courses": [], "_seen": set()}
+            for field in ("total_credits", "gpa", "percentage"):
+                if merged.get(field) is None and semester.get(field) is not None:
+                    merged[field] = semester[field]
+            for course in semester.get("courses") or []:
+                course_key = _course_key(course)
+                if course_key in merged["_seen"]:
+                    continue
+                merged["_seen"].add(course_key)
+                merged["courses"].append(course)
+
+        for key, value in (result.get("credit_summary") or {}).items():
+            if isinstance(value, dict):
+                bucket = summary.setdefault(key, {})
+                for sub_key, sub_value in value.items():
+                    if isinstance(sub_value, (int, float)):
+                        bucket[sub_key] = max(bucket.get(sub_key, sub_value), sub_value)
+                    else:
+                        bucket.setdefault(sub_key, sub_value)
+            elif summary.get(key) is None:
+                summary[key] = value
+
+    merged_semesters = []
+    for semester in sorted(semesters.values(), key=lambda s: (s.get("year") or 0, str(s.get("semester") or ""))):
+        semester.pop("_seen", None)
+        credits = _credits_sum(semester["courses"], earned_only=True)
+        reported = semester.get("total_credits")
+        if not _matches(reported, credits, _credits_sum(semester["courses"])):
+            if reported is not None:
+                log(f"{semester.get('year')} {semester.get('semester')}: total_credits {reported} -> {credits} (course sum)")
+            semester["total_credits"] = credits
+        merged_semesters.append(semester)
+
+    total = sum(float(s["total_credits"] or 0) for s in merged_semesters)
+    reported_total = summary.get("total_credits")
+    if reported_total is None or (merged_semesters and not _matches(reported_total, total)):
+        if reported_total is not None:
+            log(f"credit_summary.total_credits {reported_total} -> {total} (semester sum)")
+        summary["total_credits"] = total
+
+    return {
+        "student_info": student_info,
+        "semesters": merged_semesters,
+        "credit_summary": summary,
+    }
+
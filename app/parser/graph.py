@@ -1,8 +1,17 @@
 from .upstage_parser import UpstageOCRNode, UpstageParseNode
 from .ocrparser  import GroupXYLine, OCRTableBoundaryDetectorNode, SplitByYBoundaryNode
-from .processing import CreateElementsNode, TableValidationNode, ElementIntegrationNode, ExtractJsonNode
+from .processing import (
+    CreateElementsNode, TableValidationNode, ElementIntegrationNode, ExtractJsonNode,
+    LayoutFingerprintNode, ApplyLayoutProfileNode, RecordLayoutNode, known_layout,
+)
 from .state import OCRParseState, ParseState
 from .base import BaseNode
+from .cache import get_cache
+from .table_scorer import TableQualityScorer
+from .rule_extractor import RuleBasedTranscriptExtractor
+from .layout_registry import get_layout_registry
+from app.core.graph_registry import graph_registry, get_graph
+from app.core.tracing import span
 from langgraph.graph import StateGraph
 from langgraph.graph.state import CompiledStateGraph
 import os
@@ -13,12 +22,16 @@ from queue import Queue
 
 def ocr_grade_extractor_graph(queue: Queue=None) -> CompiledStateGraph:
     upstage_ocr_node = UpstageOCRNode(
-        api_key=os.environ["UPSTAGE_API_KEY"], verbose=True, track_time=True, queue=queue
+        api_key=os.environ["UPSTAGE_API_KEY"], verbose=True, track_time=True, queue=queue, cache=get_cache("ocr")
     )
 
     group_xy_line_node = GroupXYLine(verbose=True, queue=queue)
 
-    ocr_extract_boundary_node = OCRTableBoundaryDetectorNode(verbose=True, track_time=True, queue=queue)
+    # 규칙 기반 boundary confidence가 이 값보다 낮을 때만 LLM 호출 (1.0 초과로 두면 항상 LLM)
+    ocr_extract_boundary_node = OCRTableBoundaryDetectorNode(
+        verbose=True, track_time=True, queue=queue,
+        min_confidence=float(os.environ.get("OCR_BOUNDARY_MIN_CONFIDENCE", 0.7)),
+    )
     
     grade_table_integrated_node = SplitByYBoundaryNode(verbose=True, queue=queue)
 
@@ -43,72 +56,160 @@ def ocr_grade_extractor_graph(queue: Queue=None) -> CompiledStateGraph:
 class OCRSubGraphNode(BaseNode):
     '''
     element에서 ocrparser가 필요하다면 ocr_subgraph를 실행시키는 node
+
+    ocr_need인 element들을 모아 한 번 compile한 ocr_subgraph로 batch 실행한다.
+    - max_concurrency: 동시에 실행할 element 수 (1이면 순차 실행)
+    - 결과는 element 순서대로 반영하고, 실패한 element는 document parser 결과(content)를 그대로 유지
     '''
-    def __init__(self, verbose=False, **kwargs):
+    def __init__(self, verbose=False, max_concurrency: int = 4, **kwargs):
         super().__init__(verbose=verbose, **kwargs)
+        self.max_concurrency = max(1, max_concurrency)
+
+    @property
+    def ocr_graph(self) -> CompiledStateGraph:
+        # 공유 compile된 subgraph, event queue는 부모 config(RunContext)를 따라간다
+        return get_graph("ocr_grade_extractor")
+
+    def _ocr_input(self, state: ParseState, elem) -> OCRParseState:
+        profile = (state.get('layout') or {}).get('profile') or {}
+        return {
+            'element' : elem,
+            'grade_image_filepath': state['filepath'],
+            'element_id' : elem.id,
+            'image_handle': elem.image_handle,
+            'boundary_strategy': profile.get('boundary_strategy'),
+        }
+
+    @staticmethod
+    def _boundary_source(result) -> str:
+        for item in result.get('metadata') or []:
+            if 'boundary' in item:
+                return item['boundary'].get('source')
+        return None
+
+    def ocr_element(self, state: ParseState, elem) -> bool:
+        '''단일 element OCR (TableValidationNode pipelined mode에서 사용). 실패 시 parser content 유지'''
+        try:
+            with span("ocr_subgraph", kind="graph", elements=1):
+                result = self.ocr_graph.invoke(self._ocr_input(state, elem), config=RunnableConfig(recursion_limit=5))
+        except Exception as e:
+            self.log(f"OCR sub graph failed for element {elem.id}, keep parser content: {e!r}")
+            return False
+        elem.content = result['result_element']
+        return True
 
     def run(self, state: ParseState):
-        
-        config = RunnableConfig(recursion_limit=5) 
-        for elem in state['elements']:
-            if elem.ocr_need :
-                self.log(f"START OCR sub graph element table number {elem.id}")
-                ocr_graph = ocr_grade_extractor_graph(queue=self.queue)
-                result : OCRParseState = ocr_graph.invoke(
-                    input=
-                        {
-                        'element' : elem, 
-                        'grade_image_filepath': state['filepath'], 
-                        'element_id' : elem.id, 
-                        'base64_encoding': elem.base64_encoding
-                        },
-                    config=config
-                    )
-                elem.content = result['result_element']
-        return {"elements": state["elements"]}
+        completed = set(state.get('ocr_completed_elements_id', []))
+        targets = [elem for elem in state['elements'] if elem.ocr_need and str(elem.id) not in completed]
+        if not targets:
+            return {"elements": state["elements"]}
+
+        self.log(f"START OCR sub graph element table numbers {[elem.id for elem in targets]}")
+        config = RunnableConfig(recursion_limit=5, max_concurrency=self.max_concurrency)
+        with span("ocr_subgraph", kind="graph", elements=len(targets)):
+            results = self.ocr_graph.batch(
+                [self._ocr_input(state, elem) for elem in targets],
+                config=config,
+                return_exceptions=True,
+            )
+
+        boundary_sources = []
+        for elem, result in zip(targets, results):
+            if isinstance(result, Exception):
+                self.log(f"OCR sub graph failed for element {elem.id}, keep parser content: {result!r}")
+                continue
+            elem.content = result['result_element']
+            boundary_sources.append(self._boundary_source(result))
+        # RecordLayoutNode가 layout별 boundary 방식을 기억할 수 있도록 남김
+        return {"elements": state["elements"], "metadata": [{'ocr': {'boundary_sources': boundary_sources}}]}
 
 
 # Route node    
 def need_ocr_tool(state: ParseState) -> str:
-    if len(state.get("needs_ocr_elements_id", [])) > 0:
+    pending = set(state.get("needs_ocr_elements_id", [])) - set(state.get("ocr_completed_elements_id", []))
+    if len(pending) > 0:
         return True
     return False
 
 
 def transcript_extract_graph(queue: Queue=None) ->CompiledStateGraph:
+    # UPSTAGE_PARSE_PAGES_PER_CHUNK > 0 이면 긴 PDF를 page 단위로 나눠 동시에 parse (pypdf 필요)
     upstage_document_parse_node = UpstageParseNode(
-        api_key=os.environ["UPSTAGE_API_KEY"], verbose=True, queue=queue
+        api_key=os.environ["UPSTAGE_API_KEY"], verbose=True, queue=queue, cache=get_cache("document-parse"),
+        pages_per_chunk=int(os.environ.get("UPSTAGE_PARSE_PAGES_PER_CHUNK", 0)),
+        max_concurrency=int(os.environ.get("UPSTAGE_PARSE_MAX_CONCURRENCY", 4)),
     )
     preprocessing_elements_node = CreateElementsNode(verbose=True, queue=queue)
 
-    table_elements_validation_node = TableValidationNode(verbose=True, track_time=True, queue=queue)
+    # LAYOUT_ROUTING=0 이면 layout registry를 쓰지 않고 항상 table 검증부터 진행
+    layout_registry = get_layout_registry() if os.environ.get("LAYOUT_ROUTING", "1") == "1" else None
+    layout_fingerprint_node = LayoutFingerprintNode(verbose=True, queue=queue, registry=layout_registry)
+    apply_layout_profile_node = ApplyLayoutProfileNode(verbose=True, queue=queue)
+    record_layout_node = RecordLayoutNode(verbose=True, queue=queue, registry=layout_registry)
 
-    ocr_subgraph_node = OCRSubGraphNode(verbose=True, queue=queue)
+    ocr_subgraph_node = OCRSubGraphNode(
+        verbose=True, queue=queue, max_concurrency=int(os.environ.get("OCR_MAX_CONCURRENCY", 4))
+    )
+
+    # TABLE_VALIDATION_PIPELINE_OCR=1 이면 검증 결과가 YES인 table부터 바로 OCR 시작
+    pipeline_ocr = os.environ.get("TABLE_VALIDATION_PIPELINE_OCR", "0") == "1"
+    table_elements_validation_node = TableValidationNode(
+        verbose=True, track_time=True, queue=queue,
+        max_concurrency=int(os.environ.get("TABLE_VALIDATION_MAX_CONCURRENCY", 4)),
+        ocr_runner=ocr_subgraph_node if pipeline_ocr else None,
+        scorer=TableQualityScorer(
+            accept_threshold=float(os.environ.get("TABLE_SCORER_ACCEPT", 0.8)),
+            reject_threshold=float(os.environ.get("TABLE_SCORER_REJECT", 0.35)),
+        ),
+        decision_log_path=os.environ.get("TABLE_VALIDATION_DECISION_LOG"),
+    )
 
     integrate_elements_node = ElementIntegrationNode(verbose=True, queue=queue)
 
-    extract_json_node = ExtractJsonNode(verbose=True, queue=queue)
+    # EXTRACT_RULE_BASED=0 이면 항상 LLM으로 JSON 추출
+    # EXTRACT_CHUNK_MAX_CHARS > 0 이면 그보다 긴 transcript는 학기 단위로 나눠 동시에 추출
+    extract_json_node = ExtractJsonNode(
+        verbose=True, queue=queue,
+        rule_extractor=RuleBasedTranscriptExtractor() if os.environ.get("EXTRACT_RULE_BASED", "1") == "1" else None,
+        chunk_max_chars=int(os.environ.get("EXTRACT_CHUNK_MAX_CHARS", 0)),
+        max_concurrency=int(os.environ.get("EXTRACT_MAX_CONCURRENCY", 4)),
+    )
     
     upstage_document_parser_workflow = StateGraph(ParseState)
 
     upstage_document_parser_workflow.add_node('upstage_document_parse_node', upstage_document_parse_node)
     upstage_document_parser_workflow.add_node('preprocessing_elements_node', preprocessing_elements_node)
+    upstage_document_parser_workflow.add_node('layout_fingerprint_node', layout_fingerprint_node)
+    upstage_document_parser_workflow.add_node('apply_layout_profile_node', apply_layout_profile_node)
     upstage_document_parser_workflow.add_node('table_elements_validation_node', table_elements_validation_node)
     upstage_document_parser_workflow.add_node('ocr_subgraph_node', ocr_subgraph_node)
     upstage_document_parser_workflow.add_node('integrate_elements_node', integrate_elements_node)
     upstage_document_parser_workflow.add_node('extract_json_node', extract_json_node)
+    upstage_document_parser_workflow.add_node('record_layout_node', record_layout_node)
 
     upstage_document_parser_workflow.add_edge('upstage_document_parse_node', 'preprocessing_elements_node')
-    upstage_document_parser_workflow.add_edge('preprocessing_elements_node','table_elements_validation_node')
+    upstage_document_parser_workflow.add_edge('preprocessing_elements_node','layout_fingerprint_node')
     upstage_document_parser_workflow.add_conditional_edges(
-        'table_elements_validation_node',
-        need_ocr_tool,
-        {False: 'integrate_elements_node', True: 'ocr_subgraph_node'}
+        'layout_fingerprint_node',
+        known_layout,
+        {False: 'table_elements_validation_node', True: 'apply_layout_profile_node'}
     )
+    for decision_node in ('table_elements_validation_node', 'apply_layout_profile_node'):
+        upstage_document_parser_workflow.add_conditional_edges(
+            decision_node,
+            need_ocr_tool,
+            {False: 'integrate_elements_node', True: 'ocr_subgraph_node'}
+        )
     upstage_document_parser_workflow.add_edge('ocr_subgraph_node','integrate_elements_node')
     upstage_document_parser_workflow.add_edge('integrate_elements_node','extract_json_node')
+    upstage_document_parser_workflow.add_edge('extract_json_node','record_layout_node')
 
     upstage_document_parser_workflow.set_entry_point('upstage_document_parse_node')
-    upstage_document_parser_workflow.set_finish_point('extract_json_node')
+    upstage_document_parser_workflow.set_finish_point('record_layout_node')
     
-    return upstage_document_parser_workflow.compile(checkpointer=MemorySaver())
\ No newline at end of file
+    return upstage_document_parser_workflow.compile(checkpointer=MemorySaver())
+
+
+# 요청마다 build/compile하지 않도록 process 당 한 번 compile해서 공유 (queue는 run_config로 전달)
+graph_registry.register("ocr_grade_extractor", ocr_grade_extractor_graph)
+graph_registry.register("transcript_extract", transcript_extract_graph)
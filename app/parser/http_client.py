@@ -0,0 +1,154 @@
+import os
+import time
+import random
+import asyncio
+import threading
+import weakref
+from functools import lru_cache
+from typing import Any, Dict, Optional
+
+import httpx
+
+from app.core.tracing import span
+
+
+UPSTAGE_BASE_URL = "https://api.upstage.ai/v1"
+
+RETRY_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+
+class UpstageClient:
+    '''
+    Upstage API 호출에 공유해서 쓰는 keep-alive HTTP client (sync + async).
+
+    - connect / read timeout 분리 설정
+    - 429, 5xx, 네트워크 오류는 jitter가 들어간 exponential backoff로 재시도 (Retry-After 우선)
+    - max_in_flight로 동시에 나가는 요청 수 제한 (sync / async 각각)
+    '''
+    def __init__(
+        self,
+        base_url: str = UPSTAGE_BASE_URL,
+        connect_timeout: float = 10.0,
+        read_timeout: float = 120.0,
+        max_retries: int = 3,
+        backoff_base: float = 0.5,
+        backoff_max: float = 8.0,
+        max_in_flight: int = 8,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(
+            max_connections=max_in_flight,
+            max_keepalive_connections=max_in_flight,
+        )
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.max_in_flight = max_in_flight
+
+        self._client: Optional[httpx.Client] = None
+        self._client_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        # AsyncClient / Semaphore는 event loop에 묶이므로 loop별로 관리
+        self._async: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, tuple]" = weakref.WeakKeyDictionary()
+
+    def _url(self, path: str) -> str:
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    @property
+    def client(self) -> httpx.Client:
+        with self._client_lock:
+            if self._client is None:
+                self._client = httpx.Client(timeout=self.timeout, limits=self.limits)
+            return self._client
+
+    def _async_client(self) -> tuple:
+        loop = asyncio.get_running_loop()
+        entry = self._async.get(loop)
+        if entry is None:
+            entry = (
+                httpx.AsyncClient(timeout=self.timeout, limits=self.limits),
+                asyncio.Semaphore(self.max_in_flight),
+            )
+            self._async[loop] = entry
+        return entry
+
+    def _backoff(self, attempt: int, response: Optional[httpx.Response] = None) -> float:
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after:
+                try:
+                    return min(float(retry_after), self.backoff_max)
+                except ValueError:
+                    pass
+        # full jitter
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    @staticmethod
+    def _rewind(files: Optional[Dict[str, Any]]):
+        '''재시도 시 file object를 처음부터 다시 보내도록 seek(0)'''
+        for value in (files or {}).values():
+            fileobj = value[1] if isinstance(value, tuple) else value
+            if hasattr(fileobj, "seek"):
+                fileobj.seek(0)
+
+    def post(self, path: str, **kwargs) -> httpx.Response:
+        files = kwargs.get("files")
+        for attempt in range(self.max_retries + 1):
+            self._rewind(files)
+            response = None
+            try:
+                with self._slots, span(f"POST {path}", kind="http", retry=attempt) as http_span:
+                    response = self.client.post(self._url(path), **kwargs)
+                    if http_span is not None:
+                        http_span.set(status_code=response.status_code)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+            time.sleep(self._backoff(attempt, response))
+
+    async def apost(self, path: str, **kwargs) -> httpx.Response:
+        client, slots = self._async_client()
+        files = kwargs.get("files")
+        for attempt in range(self.max_retries + 1):
+            self._rewind(files)
+            response = None
+            try:
+                async with slots:
+                    with span(f"POST {path}", kind="http", retry=attempt) as http_span:
+                        response = await client.post(self._url(path), **kwargs)
+                        if http_span is not None:
+                            http_span.set(status_code=response.status_code)
+            except httpx.TransportError:
+                if attempt >= self.max_retries:
+                    raise
+            else:
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                    return response
+            await asyncio.sleep(self._backoff(attempt, response))
+
+    def close(self):
+        with self._client_lock:
+            if self._client is not None:
+                self._client.close()
+                self._client = None
+
+    async def aclose(self):
+        entry = self._async.pop(asyncio.get_running_loop(), None)
+        if entry is not None:
+            await entry[0].aclose()
+
+
+@lru_cache(maxsize=None)
+def get_upstage_client() -> UpstageClient:
+    '''환경변수 설정을 읽어 만든 process-wide UpstageClient (import 시점이 아니라 처음 쓸 때 읽으므로 .env 값도 반영)'''
+    return UpstageClient(
+        base_url=os.environ.get("UPSTAGE_BASE_URL", UPSTAGE_BASE_URL),
+        connect_timeout=float(os.environ.get("UPSTAGE_CONNECT_TIMEOUT", 10)),
+        read_timeout=float(os.environ.get("UPSTAGE_READ_TIMEOUT", 120)),
+        max_retries=int(os.environ.get("UPSTAGE_MAX_RETRIES", 3)),
+        max_in_flight=int(os.environ.get("UPSTAGE_MAX_IN_FLIGHT", 8)),
+    )
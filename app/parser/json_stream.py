@@ -0,0 +1,133 @@
+import json
+from typing import Any, Iterable, List, Optional, Sequence, Tuple, Union
+
+
+PathPart = Union[str, int]
+Path = Tuple[PathPart, ...]
+
+# path pattern에서 array index 자리를 나타내는 wildcard
+ANY_INDEX = int
+
+
+class IncrementalJSONParser:
+    '''
+    LLM stream chunk를 받아, 완성된 object/array 중 watch pattern에 맞는 것을 바로 돌려주는 incremental JSON parser.
+
+    문자 단위로 string / escape / object key / array index 상태만 추적하고,
+    container가 닫히는 순간 그 구간만 json.loads 한다.
+    최상위 '{' 이전의 문자(```json 같은 fence)는 무시한다.
+
+        parser = IncrementalJSONParser([("semesters", ANY_INDEX, "courses", ANY_INDEX)])
+        for chunk in llm.stream(...):
+            for path, value in parser.feed(chunk.content):
+                ...
+    '''
+    def __init__(self, patterns: Iterable[Sequence[Any]]):
+        self.patterns = [tuple(p) for p in patterns]
+        self._chunks: List[str] = []
+        self._length = 0
+        # stack item: [type('{' | '['), path, start offset, current key/index, expect_key]
+        self._stack: List[list] = []
+        self._in_string = False
+        self._escape = False
+        self._key_chars: Optional[List[str]] = None
+        self._done = False
+
+    def _matches(self, path: Path) -> bool:
+        for pattern in self.patterns:
+            if len(pattern) != len(path):
+                continue
+            if all((p is ANY_INDEX and isinstance(v, int)) or p == v for p, v in zip(pattern, path)):
+                return True
+        return False
+
+    def _child_path(self) -> Path:
+        if not self._stack:
+            return ()
+        parent = self._stack[-1]
+        return parent[1] + (parent[3],)
+
+    def _slice(self, start: int, end: int) -> str:
+        if len(self._chunks) > 1:
+            self._chunks = ["".join(self._chunks)]
+        return self._chunks[0][start:end] if self._chunks else ""
+
+    def feed(self, chunk: str) -> List[Tuple[Path, Any]]:
+        completed = []
+        if self._done or not chunk:
+            return completed
+        offset = self._length
+        self._chunks.append(chunk)
+        self._length += len(chunk)
+
+        for i, ch in enumerate(chunk):
+            pos = offset + i
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    if self._key_chars is not None:
+                        top = self._stack[-1]
+                        top[3] = json.loads('"' + "".join(self._key_chars) + '"')
+                        top[4] = False
+                        self._key_chars = None
+                    continue
+                if self._key_chars is not None:
+                    self._key_chars.append(ch)
+            elif ch == '"':
+                if self._stack:
+                    self._in_string = True
+                    top = self._stack[-1]
+                    if top[0] == "{" and top[4]:
+                        self._key_chars = []
+            elif ch in "{[":
+                if self._stack or ch == "{":
+                    path = self._child_path()
+                    self._stack.append([ch, path, pos, 0 if ch == "[" else None, ch == "{"])
+            elif ch in "}]" and self._stack:
+                container = self._stack.pop()
+                if self._matches(container[1]):
+                    completed.append((container[1], json.loads(self._slice(container[2], pos + 1))))
+                if not self._stack:
+                    self._done = True
+                    break
+            elif ch == "," and self._stack:
+                top = self._stack[-1]
+                if top[0] == "[":
+                    top[3] += 1
+                else:
+                    top[4] = True
+        return completed
+
+    @property
+    def text(self) -> str:
+        return self._slice(0, self._length)
+
+    @property
+    def done(self) -> bool:
+        '''최상위 object가 닫혔는지'''
+        return self._done
+
+
+TRANSCRIPT_STREAM_PATTERNS = [
+    ("student_info",),
+    ("semesters", ANY_INDEX, "courses", ANY_INDEX),
+    ("semesters", ANY_INDEX),
+    ("credit_summary",),
+]
+
+
+def transcript_partial_event(path: Path, value: Any) -> Optional[dict]:
+    '''IncrementalJSONParser 결과를 WebSocket partial event payload로 변환'''
+    if path == ("student_info",):
+        return {"kind": "student_info", "student_info": value}
+    if path == ("credit_summary",):
+        return {"kind": "credit_summary", "credit_summary": value}
+    if len(path) == 2 and path[0] == "semesters":
+        return {"kind": "semester", "semester_index": path[1], "semester": value}
+    if len(path) == 4 and path[2] == "courses":
+        return {"kind": "course", "semester_index": path[1], "course_index": path[3], "course": value}
+    return None
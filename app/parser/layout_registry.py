@@ -0,0 +1,204 @@
+import os
+import re
+import json
+import hashlib
+import tempfile
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Union
+
+from pydantic import BaseModel, Field
+
+try:
+    import fcntl
+except ImportError:  # Windows: process 간 lock 없이 동작
+    fcntl = None
+
+from .element import Element
+from .table_scorer import markdown_rows
+
+
+DEFAULT_REGISTRY_PATH = Path(".cache/layouts.json")
+
+_VOLATILE_RE = re.compile(r"[\d\s#*|:.,\-_/()\[\]]+")
+
+
+def _normalize(text: str) -> str:
+    '''학생마다 달라지는 숫자/공백/구두점을 지운 layout 비교용 text'''
+    return _VOLATILE_RE.sub("", text or "").lower()
+
+
+class LayoutFingerprint(BaseModel):
+    digest: str
+    headings: List[str] = Field(default_factory=list)
+    table_shapes: List[List] = Field(default_factory=list, description="table별 [column 수, 정규화된 header row]")
+    category_sequence: List[str] = Field(default_factory=list, description="연속된 같은 category는 하나로 합친 순서")
+
+    @classmethod
+    def from_elements(cls, elements: Sequence[Element]) -> "LayoutFingerprint":
+        '''
+        heading text, table 모양(column 수 + header row), category 순서로 layout fingerprint 생성.
+
+        행 수, 학기 수, 숫자처럼 학생마다 달라지는 값은 넣지 않는다.
+        '''
+        headings, table_shapes, sequence = [], [], []
+        for elem in elements:
+            if not sequence or sequence[-1] != elem.category:
+                sequence.append(elem.category)
+            if elem.category == "heading1":
+                headings.append(_normalize(elem.content))
+            elif elem.category == "table":
+                rows = markdown_rows(elem.content)
+                header = rows[0] if rows else []
+                table_shapes.append([len(header), "|".join(_normalize(cell) for cell in header)])
+
+        payload = json.dumps([headings, table_shapes, sequence], ensure_ascii=False, separators=(",", ":"))
+        return cls(
+            digest=hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16],
+            headings=headings,
+            table_shapes=table_shapes,
+            category_sequence=sequence,
+        )
+
+
+class LayoutProfile(BaseModel):
+    '''
+    같은 fingerprint로 관찰된 run의 결정.
+
+    - ocr_tables: table 순서(index)별 OCR 필요 여부
+    - boundary_strategy: OCR subgraph boundary 결정 방식 ("rule" | "llm" | None)
+    - observations: 위 결정이 연속으로 같았던 run 수 (min_observations 이상이면 known)
+    '''
+    digest: str
+    ocr_tables: List[bool] = Field(default_factory=list)
+    boundary_strategy: Optional[str] = None
+    observations: int = 0
+    hits: int = 0
+
+
+class LayoutRegistry:
+    '''
+    fingerprint -> LayoutProfile 을 JSON 파일로 들고 있는 local registry.
+
+    - lookup(): known layout이면 profile, 아니면 None (hits / misses 카운트)
+    - record(): 정상 종료한 run의 결정을 누적. 이전 결정과 다르면 observations를 1부터 다시 센다
+    - 파일은 tmp 파일 rename으로 교체, process 내 동시 요청은 lock으로 보호
+    - 여러 worker가 같은 파일을 쓰므로 record()는 file lock 아래에서 파일을 다시 읽어 합친 뒤 쓴다
+      (lookup()은 파일이 바뀌었으면 다시 읽어 다른 worker가 배운 layout도 사용)
+    '''
+    def __init__(self, path: Union[str, Path] = DEFAULT_REGISTRY_PATH, min_observations: int = 3):
+        self.path = Path(path)
+        self.min_observations = max(1, min_observations)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        # 아직 파일에 쓰지 않은 lookup hit 수 (digest별)
+        self._pending_hits: Dict[str, int] = {}
+        self._mtime: Optional[int] = None
+        self._profiles: Dict[str, LayoutProfile] = self._load()
+
+    def _file_mtime(self) -> Optional[int]:
+        try:
+            return self.path.stat().st_mtime_ns
+        except OSError:
+            return None
+
+    def _load(self) -> Dict[str, LayoutProfile]:
+        self._mtime = self._file_mtime()
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        profiles = {digest: LayoutProfile(**profile) for digest, profile in raw.items()}
+        for digest, hits in self._pending_hits.items():
+            if digest in profiles:
+                profiles[digest].hits += hits
+        return profiles
+
+    def _refresh(self):
+        '''다른 worker가 파일을 바꿨으면 다시 읽는다 (self._lock 안에서 호출)'''
+        if self._file_mtime() != self._mtime:
+            self._profiles = self._load()
+
+    @contextmanager
+    def _file_lock(self):
+        '''같은 registry 파일을 쓰는 process 간 lock (<path>.lock에 flock)'''
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(f"{self.path}.lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _save(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({d: p.model_dump() for d, p in self._profiles.items()}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+        self._pending_hits.clear()
+        self._mtime = self._file_mtime()
+
+    def lookup(self, fingerprint: LayoutFingerprint) -> Optional[LayoutProfile]:
+        with self._lock:
+            self._refresh()
+            profile = self._profiles.get(fingerprint.digest)
+            if profile is None or profile.observations < self.min_observations:
+                self.misses += 1
+                return None
+            self.hits += 1
+            profile.hits += 1
+            self._pending_hits[fingerprint.digest] = self._pending_hits.get(fingerprint.digest, 0) + 1
+            return profile.model_copy()
+
+    def record(self, fingerprint: LayoutFingerprint, ocr_tables: List[bool], boundary_strategy: Optional[str]) -> LayoutProfile:
+        with self._lock, self._file_lock():
+            # 다른 worker가 그 사이에 쓴 profile을 잃지 않도록 파일 기준으로 합친다
+            self._profiles = self._load()
+            profile = self._profiles.get(fingerprint.digest)
+            if profile is not None and profile.ocr_tables == ocr_tables and profile.boundary_strategy == boundary_strategy:
+                profile.observations += 1
+            else:
+                profile = LayoutProfile(
+                    digest=fingerprint.digest,
+                    ocr_tables=ocr_tables,
+                    boundary_strategy=boundary_strategy,
+                    observations=1,
+                    hits=profile.hits if profile else 0,
+                )
+                self._profiles[fingerprint.digest] = profile
+            self._save()
+            return profile.model_copy()
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._refresh()
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "known_layouts": sum(p.observations >= self.min_observations for p in self._profiles.values()),
+                "layouts": {
+                    d: {"observations": p.observations, "hits": p.hits, "known": p.observations >= self.min_observations}
+                    for d, p in self._profiles.items()
+                },
+            }
+
+
+@lru_cache(maxsize=None)
+def get_layout_registry() -> LayoutRegistry:
+    '''process-wide LayoutRegistry (LAYOUT_REGISTRY_PATH, LAYOUT_REGISTRY_MIN_OBSERVATIONS). 환경변수는 처음 만들 때 읽는다 (.env 로드 후)'''
+    return LayoutRegistry(
+        path=os.environ.get("LAYOUT_REGISTRY_PATH", DEFAULT_REGISTRY_PATH),
+        min_observations=int(os.environ.get("LAYOUT_REGISTRY_MIN_OBSERVATIONS", 3)),
+    )
@@ -0,0 +1,187 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from .element import OCRElement
+
+
+@dataclass
+class OCRWords:
+    '''
+    OCR word들을 column 단위(NumPy array)로 들고 있는 compact 표현.
+
+    - ids, x, y: 좌측 상단 좌표 기준 (int64)
+    - confidence: float64
+    - text: word 문자열 list (index가 array와 대응)
+
+    confidence filter, column 분류, y 정렬, 줄 grouping을 모두 array 연산으로 처리하고
+    GroupXYLine / export.group_by_lines가 같은 구현(group_line_indices)을 공유한다.
+    '''
+    ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    x: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    y: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int64))
+    confidence: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.float64))
+    text: List[str] = field(default_factory=list)
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    @classmethod
+    def from_upstage_words(
+        cls,
+        words: Iterable[Dict],
+        min_confidence: Optional[float] = None,
+        clean: Optional[Callable[[str], str]] = None,
+    ) -> OCRWords:
+        '''
+        Upstage OCR 응답의 pages[i]['words']로부터 생성.
+        min_confidence가 주어지면 confidence <= min_confidence인 word는 제외한다.
+        '''
+        # dict를 한 번만 훑으면서 filter + column 분리 (word마다 pydantic 객체를 만들지 않는다)
+        rows = []
+        for i, w in enumerate(words):
+            confidence = float(w.get('confidence', 0))
+            if min_confidence is not None and confidence <= min_confidence:
+                continue
+            vertex = w['boundingBox']['vertices'][0]
+            rows.append((w.get('id', i), vertex['x'], vertex['y'], confidence, w['text']))
+        if not rows:
+            return cls()
+
+        ids, x, y, confidence, text = zip(*rows)
+        result = cls(
+            ids=np.array(ids, dtype=np.int64),
+            x=np.array(x, dtype=np.int64),
+            y=np.array(y, dtype=np.int64),
+            confidence=np.array(confidence, dtype=np.float64),
+            text=list(text),
+        )
+        if clean is not None:
+            result.text = [clean(t) for t in result.text]
+        return result
+
+    def select(self, mask_or_index: np.ndarray) -> OCRWords:
+        index = np.flatnonzero(mask_or_index) if mask_or_index.dtype == bool else mask_or_index
+        return OCRWords(
+            ids=self.ids[index],
+            x=self.x[index],
+            y=self.y[index],
+            confidence=self.confidence[index],
+            text=[self.text[i] for i in index],
+        )
+
+    def to_records(self) -> Dict[str, list]:
+        '''JSON 직렬화용 (cache 저장)'''
+        return {
+            'ids': self.ids.tolist(),
+            'x': self.x.tolist(),
+            'y': self.y.tolist(),
+            'confidence': self.confidence.tolist(),
+            'text': list(self.text),
+        }
+
+    @classmethod
+    def from_records(cls, records: Dict[str, list]) -> OCRWords:
+        return cls(
+            ids=np.asarray(records['ids'], dtype=np.int64),
+            x=np.asarray(records['x'], dtype=np.int64),
+            y=np.asarray(records['y'], dtype=np.int64),
+            confidence=np.asarray(records['confidence'], dtype=np.float64),
+            text=list(records['text']),
+        )
+
+    def to_elements(self) -> List[OCRElement]:
+        return [
+            OCRElement(id=int(i), vertices={'x': int(x), 'y': int(y)}, text=t)
+            for i, x, y, t in zip(self.ids, self.x, self.y, self.text)
+        ]
+
+    def to_prompt_source(self) -> List[Tuple[str, int, int]]:
+        '''LLM prompt 입력용 (text, x, y) tuple list'''
+        return [(t, int(x), int(y)) for t, x, y in zip(self.text, self.x, self.y)]
+
+    def _line_order(self, page_width: float, num_cols: int, y_threshold: int) -> Tuple[np.ndarray, np.ndarray]:
+        '''
+        ## Rule
+        1. x 좌표로 num_cols개의 column에 분류 (x // (page_width / num_cols))
+        2. column 순서 → column 내부 y 순서로 읽기 순서를 만든다 (stable)
+        3. 읽기 순서대로, 줄의 첫 word y(anchor)와의 차이가 y_threshold 이하인 word를 같은 줄로 묶는다
+        4. 각 줄은 x 기준 정렬 (stable)
+
+        :return: (줄 순서 + 줄 내부 x 순서로 정렬된 word index, 각 줄의 시작 위치)
+        '''
+        empty = np.empty(0, dtype=np.int64)
+        if len(self) == 0:
+            return empty, empty
+
+        col_width = page_width / num_cols
+        cols = np.minimum(np.floor_divide(self.x, col_width).astype(np.int64), num_cols - 1)
+        valid = np.flatnonzero(cols >= 0)
+        if len(valid) == 0:
+            return empty, empty
+
+        # column → y 순 stable 정렬 (lexsort는 마지막 key가 primary)
+        order = valid[np.lexsort((self.y[valid], cols[valid]))]
+        ys = self.y[order]
+        cs = cols[order]
+        n = len(order)
+
+        # (column, y)를 하나의 정렬된 key로 만들어, 모든 word에 대해
+        # "같은 column에서 y > y_i + threshold 인 첫 위치"를 한 번의 searchsorted로 계산
+        span = int(ys.max() - ys.min()) + 2 * y_threshold + 1
+        key = cs * span + (ys - ys.min())
+        next_start = np.searchsorted(key, key + y_threshold, side='right').tolist()
+        seg_end = np.searchsorted(cs, cs, side='right').tolist()
+        ys_list = ys.tolist()
+
+        # anchor를 따라가며 줄 시작 위치만 뽑는다 (줄 수 만큼의 정수 연산)
+        starts = []
+        i = 0
+        while i < n:
+            starts.append(i)
+            anchor = ys_list[i]
+            k = next_start[i]
+            # column 끝까지 같은 줄이면 다음 column 앞부분이 anchor 범위 안인지 확인
+            while k == seg_end[k - 1] and k < n and abs(ys_list[k] - anchor) <= y_threshold:
+                k += 1
+                while k < n and k < seg_end[k - 1] and ys_list[k] - anchor <= y_threshold:
+                    k += 1
+            i = k
+
+        starts = np.asarray(starts, dtype=np.int64)
+        line_ids = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+        # 줄 내부 x 기준 stable 정렬
+        ordered = order[np.lexsort((self.x[order], line_ids))]
+        return ordered, starts
+
+    def group_line_indices(self, page_width: float, num_cols: int = 3, y_threshold: int = 3) -> List[np.ndarray]:
+        '''줄마다 word index array (x 정렬됨). 규칙은 _line_order 참고'''
+        ordered, starts = self._line_order(page_width, num_cols, y_threshold)
+        if len(ordered) == 0:
+            return []
+        return np.split(ordered, starts[1:])
+
+    def group_lines(self, page_width: float, num_cols: int = 3, y_threshold: int = 3) -> List[Tuple[str, int, int]]:
+        '''줄 단위 (merged_text, min_x, min_y)'''
+        ordered, starts = self._line_order(page_width, num_cols, y_threshold)
+        if len(ordered) == 0:
+            return []
+        min_x = np.minimum.reduceat(self.x[ordered], starts).tolist()
+        min_y = np.minimum.reduceat(self.y[ordered], starts).tolist()
+        tokens = self._split_text(ordered, starts)
+        return [(" ".join(t), x, y) for t, x, y in zip(tokens, min_x, min_y)]
+
+    def group_line_tokens(self, page_width: float, num_cols: int = 3, y_threshold: int = 3) -> List[List[str]]:
+        '''줄 단위 word list (x 정렬)'''
+        ordered, starts = self._line_order(page_width, num_cols, y_threshold)
+        if len(ordered) == 0:
+            return []
+        return self._split_text(ordered, starts)
+
+    def _split_text(self, ordered: np.ndarray, starts: np.ndarray) -> List[List[str]]:
+        text = self.text
+        flat = [text[i] for i in ordered.tolist()]
+        bounds = starts.tolist() + [len(flat)]
+        return [flat[a:b] for a, b in zip(bounds[:-1], bounds[1:])]
@@ -1,4 +1,3 @@
-from collections import defaultdict
 from pathlib import Path
 from typing import Optional
 
@@ -10,6 +9,8 @@ from app.core.util import load_prompt_template
 from .state import OCRParseState
 from .base import BaseNode
 from .element import TableBoundary
+from .ocr_words import OCRWords
+from .boundary_detector import GradeTableBoundaryDetector
 
 
 PROMPTS_DIR = Path(__file__).resolve().parent / "prompts"
@@ -29,73 +30,42 @@ class GroupXYLine(BaseNode):
         ## Rule
         OCR 데이터를 열(column) 기준으로 분류하고, 줄 단위로 y값 그룹핑 후
         텍스트는 x 기준 정렬, (text, min_x, min_y) 반환
+        (구현은 OCRWords.group_lines, export.group_by_lines와 공유)
 
         ## parameter
-        - ocr_data: upstage api를 통해 얻은 json값
+        - ocr_words: upstage api를 통해 얻은 OCR word (OCRWords)
         - page_width: 페이지의 폭
         - num_cols: 성적표가 세로로 나누어진 칸 수
         - y_threshold: ocr결과에서 같은 줄이라고 볼 수 있는 y값의 오차범위
         '''
-        ocr_data = state['ocr_data']
+        ocr_words: OCRWords = state['ocr_words']
         page_width = state['page_width']
         num_cols = 3
         y_threshold = 3
 
-        col_width = page_width / num_cols
-        columns = defaultdict(list)
-
-        # 열 분류
-        for ocr_elem in ocr_data:
-            x0 = ocr_elem.vertices['x']
-            y0 = ocr_elem.vertices['y']
-            col_index = int(x0 // col_width)
-            col_index = min(col_index, num_cols - 1)
-            columns[col_index].append((y0, x0, ocr_elem.text))
-
-        # 열 순서대로 정렬
-        all_texts = []
-        for col in range(num_cols):
-            sorted_col = sorted(columns[col], key=lambda t: t[0])  # y 기준 정렬
-            all_texts.extend(sorted_col)
-
-        # 줄 단위 그룹핑
-        lines = []
-        current_line = []
-        current_y = None
-
-        for y, x, text in all_texts:
-            if current_y is None:
-                current_y = y
-                current_line.append((x, text, y))
-            elif abs(y - current_y) <= y_threshold:
-                current_line.append((x, text, y))
-            else:
-                current_line_sorted = sorted(current_line, key=lambda t: t[0])  # x 정렬
-                merged_text = " ".join(t[1] for t in current_line_sorted)
-                min_x = min(t[0] for t in current_line_sorted)
-                min_y = min(t[2] for t in current_line_sorted)
-                lines.append((merged_text, min_x, min_y))
-
-                current_line = [(x, text, y)]
-                current_y = y
-
-        # 마지막 줄 처리
-        if current_line:
-            current_line_sorted = sorted(current_line, key=lambda t: t[0])
-            merged_text = " ".join(t[1] for t in current_line_sorted)
-            min_x = min(t[0] for t in current_line_sorted)
-            min_y = min(t[2] for t in current_line_sorted)
-            lines.append((merged_text, min_x, min_y))
+        lines = ocr_words.group_lines(page_width, num_cols=num_cols, y_threshold=y_threshold)
         return {'grouped_elements' : lines}
 
 
 class OCRTableBoundaryDetectorNode(BaseNode):
 
-    def __init__(self, verbose=False, llm: Optional[BaseChatModel] = None, **kwargs):
+    def __init__(
+        self,
+        verbose=False,
+        llm: Optional[BaseChatModel] = None,
+        detector: Optional[GradeTableBoundaryDetector] = None,
+        min_confidence: float = 0.7,
+        **kwargs,
+    ):
         '''
         ocr 추출된 데이터의 좌표정보와 의미정보를 활용하여,
         table의 boundary를 성적과 관련된 table의 경계부분을 추출하는 node
 
+        GroupXYLine 결과에 규칙 기반 detector를 먼저 적용하고,
+        confidence가 min_confidence 미만일 때만 LLM을 호출한다.
+        known layout의 boundary_strategy가 주어지면 그 방식을 그대로 사용
+        ("rule": confidence와 상관없이 rule 결과 사용, "llm": rule 생략).
+
         output format: 
             {
                 "y_top": { y_top },
@@ -104,6 +74,8 @@ class OCRTableBoundaryDetectorNode(BaseNode):
         '''
         super().__init__(verbose=verbose, **kwargs)
         self.llm =llm or self._init_llm() 
+        self.detector = detector or GradeTableBoundaryDetector()
+        self.min_confidence = min_confidence
 
     def _init_llm(self):
         llm = ChatOpenAI(
@@ -112,9 +84,8 @@ class OCRTableBoundaryDetectorNode(BaseNode):
         )
         return llm
 
-    def run(self, state: OCRParseState):
-        
-        source=state['ocr_data']
+    def _detect_with_llm(self, state: OCRParseState) -> TableBoundary:
+        source=state['ocr_words'].to_prompt_source()
 
         prompt_template = load_prompt_template(PROMPTS_DIR / 'boundary_detector.yaml')
 
@@ -122,9 +93,28 @@ class OCRTableBoundaryDetectorNode(BaseNode):
         
         chain = prompt_template | self.llm | parser
 
-        result = chain.invoke({'source' : source})
+        return chain.invoke({'source' : source})
 
-        return {'grade_table_boundary' : result}
+    def run(self, state: OCRParseState):
+        strategy = state.get('boundary_strategy')
+        if strategy == 'llm':
+            self.log("known layout boundary strategy: LLM")
+            return {'grade_table_boundary': self._detect_with_llm(state), 'metadata': [{'boundary': {'source': 'llm', 'strategy': strategy}}]}
+
+        estimate = self.detector.detect(state.get('grouped_elements') or [])
+        boundary_metadata = {'rule_confidence': estimate.confidence, 'features': estimate.features}
+        min_confidence = 0.0 if strategy == 'rule' else self.min_confidence
+
+        if estimate.boundary is not None and estimate.confidence >= min_confidence:
+            self.log(f"rule based boundary {estimate.boundary.model_dump()} (confidence {estimate.confidence:.2f})")
+            result = estimate.boundary
+            boundary_metadata['source'] = 'rule'
+        else:
+            self.log(f"rule based confidence {estimate.confidence:.2f} < {min_confidence}, fallback to LLM")
+            result = self._detect_with_llm(state)
+            boundary_metadata['source'] = 'llm'
+
+        return {'grade_table_boundary' : result, 'metadata': [{'boundary': boundary_metadata}]}
     
 
 class SplitByYBoundaryNode(BaseNode):
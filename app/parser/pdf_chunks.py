@@ -0,0 +1,93 @@
+import importlib.util
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+
+@dataclass
+class PdfChunk:
+    path: str
+    page_offset: int  # 원본 PDF에서 이 chunk 앞에 있는 page 수
+    num_pages: int
+
+
+def pypdf_available() -> bool:
+    '''chunk 분할에 필요한 pypdf(선택 의존성) 설치 여부'''
+    return importlib.util.find_spec("pypdf") is not None
+
+
+def split_pdf(filepath: str, pages_per_chunk: int, output_dir: str) -> Optional[List[PdfChunk]]:
+    '''
+    PDF를 pages_per_chunk 단위 page range 파일로 나눈다.
+
+    pypdf는 선택 의존성이라 설치되어 있지 않거나, 나눌 필요가 없는(page 수 <= pages_per_chunk) 경우
+    None을 반환하고 호출하는 쪽은 문서 전체를 한 번에 보낸다.
+    '''
+    if pages_per_chunk <= 0:
+        return None
+    try:
+        from pypdf import PdfReader, PdfWriter
+    except ImportError:
+        return None
+
+    reader = PdfReader(filepath)
+    num_pages = len(reader.pages)
+    if num_pages <= pages_per_chunk:
+        return None
+
+    base = os.path.splitext(os.path.basename(filepath))[0]
+    chunks = []
+    for start in range(0, num_pages, pages_per_chunk):
+        end = min(start + pages_per_chunk, num_pages)
+        writer = PdfWriter()
+        for page in reader.pages[start:end]:
+            writer.add_page(page)
+        chunk_path = os.path.join(output_dir, f"{base}_pages_{start + 1}-{end}.pdf")
+        with open(chunk_path, "wb") as f:
+            writer.write(f)
+        chunks.append(PdfChunk(path=chunk_path, page_offset=start, num_pages=end - start))
+    return chunks
+
+
+def _merge_usage(usages: Sequence[Dict]) -> Dict:
+    merged: Dict = {}
+    for usage in usages:
+        for key, value in (usage or {}).items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                merged[key] = merged.get(key, 0) + value
+            else:
+                merged.setdefault(key, value)
+    return merged
+
+
+def merge_document_parse_responses(responses: Sequence[Dict], chunks: Sequence[PdfChunk]) -> Dict:
+    '''
+    chunk별 document-parse 응답을 하나의 응답 형태로 합친다.
+
+    - element page는 chunk의 page_offset만큼 더해 원본 PDF 기준으로 맞춤
+    - element는 (page, chunk 내 id) 순으로 정렬 후 id를 0부터 다시 부여
+    - usage는 숫자 항목끼리 합산, content(html/markdown/text)는 순서대로 이어붙임
+    '''
+    elements = []
+    for chunk, response in zip(chunks, responses):
+        for element in response.get("elements", []):
+            element = dict(element)
+            element["page"] = element.get("page", 1) + chunk.page_offset
+            elements.append(element)
+    elements.sort(key=lambda e: (e["page"], e.get("id", 0)))
+    for new_id, element in enumerate(elements):
+        element["id"] = new_id
+
+    content = {}
+    for response in responses:
+        for key, value in (response.get("content") or {}).items():
+            content[key] = f"{content[key]}\n{value}" if key in content else value
+
+    first = responses[0]
+    return {
+        "api": first.get("api"),
+        "model": first.get("model"),
+        "usage": _merge_usage([r.get("usage") for r in responses]),
+        "content": content,
+        "elements": elements,
+    }
@@ -1,14 +1,23 @@
+import json
+import threading
 from pathlib import Path
-from typing import Optional
+from typing import Optional, List, Tuple, Dict
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
 from langchain_openai import ChatOpenAI
 from langchain_core.language_models.chat_models import BaseChatModel
 from langchain_core.output_parsers import JsonOutputParser
 
 from app.core.util import load_prompt_template
+from app.core.context import submit_in_context
 from .base import BaseNode
 from .state import ParseState
 from .element import Element, CheckParsedResult
+from .table_scorer import TableQualityScorer, TableScore
+from .rule_extractor import RuleBasedTranscriptExtractor
+from .json_stream import IncrementalJSONParser, TRANSCRIPT_STREAM_PATTERNS, transcript_partial_event
+from .extract_chunks import split_transcript_text, merge_transcript_results
+from .layout_registry import LayoutFingerprint, LayoutRegistry
 
 
 PROMPTS_DIR = Path(__file__).resolve().parent / "prompts"
@@ -17,10 +26,31 @@ PROMPTS_DIR = Path(__file__).resolve().parent / "prompts"
 class TableValidationNode(BaseNode):
     '''
     Parsing된 elements의 table중 OCR할 element 분류
+
+    - scorer(TableQualityScorer)가 확신하는 table은 LLM 호출 없이 ocr_need 결정
+    - 판단이 애매한 table만 CheckParsedResult chain으로 검증 (max_concurrency 만큼 동시에 batch 실행)
+    - ocr_runner(OCRSubGraphNode)가 주어지면 pipelined mode:
+      결정이 "YES"인 table은 나머지 table 검증을 기다리지 않고 바로 OCR subgraph를 시작
+    - decision_log_path가 주어지면 table별 결정(rule/llm, confidence, features)을 JSONL로 기록
+      (labelled fixture와 비교해서 scorer threshold 조정용)
     '''
-    def __init__(self, llm: Optional[BaseChatModel] = None, verbose=False, **kwargs):
+    def __init__(
+        self,
+        llm: Optional[BaseChatModel] = None,
+        verbose=False,
+        max_concurrency: int = 4,
+        ocr_runner=None,
+        scorer: Optional[TableQualityScorer] = None,
+        decision_log_path: Optional[str] = None,
+        **kwargs,
+    ):
         super().__init__(verbose=verbose, **kwargs)
         self.llm = llm or self._init_llm()
+        self.max_concurrency = max(1, max_concurrency)
+        self.ocr_runner = ocr_runner
+        self.scorer = scorer
+        self.decision_log_path = decision_log_path
+        self._decision_log_lock = threading.Lock()
 
 
     def _init_llm(self):
@@ -29,23 +59,118 @@ class TableValidationNode(BaseNode):
             temperature=0,
         )
         return llm 
-    
-    def run(self, state: ParseState) -> ParseState:
+
+    def _build_chain(self):
         prompt_template = load_prompt_template(PROMPTS_DIR / 'parsed_result_checker_prompt.yaml')
+        return prompt_template | self.llm.with_structured_output(CheckParsedResult)
 
-        chain = prompt_template | self.llm.with_structured_output(CheckParsedResult)
-        for elem in state['elements']:
-            if elem.category == 'table':
-                print('table_id  :' ,elem.id)
-                source = elem.content
-                result : CheckParsedResult = chain.invoke({'source' : source})
-                if result.decision == 'YES':
-                    elem.ocr_need = True
-                    state['needs_ocr_elements_id'] = state['needs_ocr_elements_id'] + [str(elem.id)]
-                    print(state['needs_ocr_elements_id'])
-            else :
+    def _record_decision(self, elem: Element, source: str, decision: Optional[str], score: Optional[TableScore] = None, error: str = ""):
+        record = {
+            'element_id': elem.id,
+            'source': source,
+            'decision': decision,
+            'confidence': score.confidence if score else None,
+            'quality': score.quality if score else None,
+            'features': score.features if score else None,
+        }
+        if error:
+            record['error'] = error
+        self.log(f"table_id {elem.id} decision: {decision} ({source})", **{k: v for k, v in record.items() if k not in ('element_id', 'source', 'decision')})
+
+        if self.decision_log_path:
+            with self._decision_log_lock, open(self.decision_log_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _score_tables(self, tables: List[Element]) -> Tuple[List[Element], List[Element], Dict[int, TableScore]]:
+        '''scorer로 확신하는 YES table과 LLM 검증이 필요한 table을 분리'''
+        if self.scorer is None:
+            return [], list(tables), {}
+
+        rule_yes, llm_tables, scores = [], [], {}
+        for elem in tables:
+            score = self.scorer.score(elem.content)
+            scores[elem.id] = score
+            if score.decision is None:
+                llm_tables.append(elem)
                 continue
-        return state
+            self._record_decision(elem, 'rule', score.decision, score)
+            if score.decision == 'YES':
+                rule_yes.append(elem)
+        return rule_yes, llm_tables, scores
+
+    def _needs_ocr(self, elem: Element, result, score: Optional[TableScore] = None) -> bool:
+        if isinstance(result, Exception):
+            # 검증 실패 시 document parser 결과를 그대로 사용
+            self._record_decision(elem, 'llm', None, score, error=repr(result))
+            return False
+        self._record_decision(elem, 'llm', result.decision, score)
+        return result.decision == 'YES'
+
+    def _validate_batch(self, chain, llm_tables: List[Element], scores: Dict[int, TableScore]) -> List[Element]:
+        if not llm_tables:
+            return []
+        results = chain.batch(
+            [{'source': elem.content} for elem in llm_tables],
+            config={'max_concurrency': self.max_concurrency},
+            return_exceptions=True,
+        )
+        return [elem for elem, result in zip(llm_tables, results) if self._needs_ocr(elem, result, scores.get(elem.id))]
+
+    def _validate_pipelined(self, chain, rule_yes: List[Element], llm_tables: List[Element], scores: Dict[int, TableScore], state: ParseState) -> Tuple[List[Element], List[Element]]:
+        needs_ocr, completed = list(rule_yes), []
+        ocr_workers = getattr(self.ocr_runner, 'max_concurrency', self.max_concurrency)
+
+        with ThreadPoolExecutor(max_workers=self.max_concurrency) as validate_pool, \
+             ThreadPoolExecutor(max_workers=ocr_workers) as ocr_pool:
+            # scorer가 YES로 확정한 table은 바로 OCR 시작
+            ocr_futures = {submit_in_context(ocr_pool, self.ocr_runner.ocr_element, state, elem): elem for elem in rule_yes}
+            validate_futures = {
+                submit_in_context(validate_pool, chain.invoke, {'source': elem.content}): elem for elem in llm_tables
+            }
+            for future in as_completed(validate_futures):
+                elem = validate_futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = e
+                if self._needs_ocr(elem, result, scores.get(elem.id)):
+                    needs_ocr.append(elem)
+                    ocr_futures[submit_in_context(ocr_pool, self.ocr_runner.ocr_element, state, elem)] = elem
+
+            for future in as_completed(ocr_futures):
+                future.result()
+                completed.append(ocr_futures[future])
+
+        return needs_ocr, completed
+
+    def run(self, state: ParseState) -> ParseState:
+        tables = [elem for elem in state['elements'] if elem.category == 'table']
+        if not tables:
+            return {'elements': state['elements']}
+
+        rule_yes, llm_tables, scores = self._score_tables(tables)
+        chain = self._build_chain() if llm_tables else None
+
+        if self.ocr_runner is None:
+            needs_ocr = rule_yes + self._validate_batch(chain, llm_tables, scores)
+            completed = []
+        else:
+            needs_ocr, completed = self._validate_pipelined(chain, rule_yes, llm_tables, scores, state)
+
+        for elem in needs_ocr:
+            elem.ocr_need = True
+
+        # element 순서대로 정렬
+        order = {elem.id: i for i, elem in enumerate(tables)}
+        needs_ocr_ids = [str(elem.id) for elem in sorted(needs_ocr, key=lambda e: order[e.id])]
+        completed_ids = [str(elem.id) for elem in sorted(completed, key=lambda e: order[e.id])]
+
+        self.log(f"needs_ocr_elements_id: {needs_ocr_ids}", rule_decided=len(tables) - len(llm_tables), llm_checked=len(llm_tables))
+        return {
+            'elements': state['elements'],
+            'needs_ocr_elements_id': needs_ocr_ids,
+            'ocr_completed_elements_id': completed_ids,
+        }
 
 
 
@@ -75,7 +200,7 @@ class CreateElementsNode(BaseNode):
                 elem = Element(
                     category=element['category'],
                     content=element['content']['markdown'] + self.newline,
-                    base64_encoding=element['base64_encoding'],
+                    image_handle=element.get('image_handle'),
                     id=element['id'],
                     coordinates=element['coordinates'],
                 )
@@ -122,15 +247,35 @@ class ElementIntegrationNode(BaseNode):
             if content:
                 text_blocks.append(content)
         result = "\n\n".join(text_blocks)
+        # JSON 추출 전에 parse 결과를 먼저 확인할 수 있도록 바로 전송
+        self.emit_event("partial", kind="transcript_text", transcript_text=result)
         return {'transcript_text' : result}
     
 class ExtractJsonNode(BaseNode):
     '''
     도출된 transcript text를 json구조형태로 추출하는 Node
+
+    rule_extractor(RuleBasedTranscriptExtractor)가 주어지면 elements를 template 기반으로 먼저 읽고,
+    맞는 template이 없거나 검증에 실패한 경우에만 LLM으로 추출한다.
+    LLM 추출은 stream으로 받아 student_info / course / semester / credit_summary가 완성될 때마다
+    "partial" event로 내보낸다.
+    chunk_max_chars > 0 이고 transcript_text가 그보다 길면 학기 단위 chunk로 나눠 동시에 추출한 뒤
+    merge_transcript_results로 합친다 (course 중복 제거, 학점 합계 보정).
     '''
-    def __init__(self, llm: Optional[BaseChatModel] = None, verbose=False, **kwargs):
+    def __init__(
+        self,
+        llm: Optional[BaseChatModel] = None,
+        verbose=False,
+        rule_extractor: Optional[RuleBasedTranscriptExtractor] = None,
+        chunk_max_chars: int = 0,
+        max_concurrency: int = 4,
+        **kwargs,
+    ):
         super().__init__(verbose=verbose, **kwargs)
         self.llm = llm or self._init_llm()
+        self.rule_extractor = rule_extractor
+        self.chunk_max_chars = chunk_max_chars
+        self.max_concurrency = max(1, max_concurrency)
         
     def _init_llm(self):
         llm = ChatOpenAI(
@@ -139,11 +284,157 @@ class ExtractJsonNode(BaseNode):
         )
         return llm 
     
-    def run(self, state: ParseState) -> ParseState:
+    def _emit_partial(self, path, value):
+        event = transcript_partial_event(path, value)
+        if event is not None:
+            self.emit_event("partial", **event)
+
+    def _extract_chunks_with_llm(self, chunks: List[str]):
         extract_prompt = load_prompt_template(PROMPTS_DIR / 'extractor_json.yaml')
         chain = extract_prompt | self.llm | JsonOutputParser()
 
-        transcript_text = state['transcript_text']
-        result_json = chain.invoke({'transcript_text': transcript_text})
+        self.log(f"extract {len(chunks)} transcript chunks concurrently", chunk_chars=[len(c) for c in chunks])
+        results = chain.batch(
+            [{'transcript_text': chunk} for chunk in chunks],
+            config={'max_concurrency': self.max_concurrency},
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, Exception)]
+        if errors:
+            # 일부 chunk가 빠진 결과를 내보내지 않도록 전체 text로 다시 추출
+            self.log(f"chunk extraction failed ({errors[0]!r}), retry with whole transcript")
+            return None
+
+        merged = merge_transcript_results(results, log=self.log)
+        for index, semester in enumerate(merged['semesters']):
+            self._emit_partial(('semesters', index), semester)
+        return merged
+
+    def _extract_with_llm(self, transcript_text: str):
+        chunks = split_transcript_text(transcript_text, self.chunk_max_chars)
+        if len(chunks) > 1:
+            merged = self._extract_chunks_with_llm(chunks)
+            if merged is not None:
+                return merged
+
+        extract_prompt = load_prompt_template(PROMPTS_DIR / 'extractor_json.yaml')
+        chain = extract_prompt | self.llm
+
+        stream_parser = IncrementalJSONParser(TRANSCRIPT_STREAM_PATTERNS)
+        for chunk in chain.stream({'transcript_text': transcript_text}):
+            for path, value in stream_parser.feed(chunk.content):
+                self._emit_partial(path, value)
+        # 최종 결과는 기존과 같이 JsonOutputParser로 (fence 제거 등)
+        return JsonOutputParser().parse(stream_parser.text)
+
+    def run(self, state: ParseState) -> ParseState:
+        if self.rule_extractor is not None:
+            extracted = self.rule_extractor.extract(state.get('elements') or [])
+            extraction_metadata = {'template': extracted.template, 'errors': extracted.errors}
+            if extracted.ok:
+                self.log(f"rule based extraction with template {extracted.template}")
+                for index, semester in enumerate(extracted.data['semesters']):
+                    self._emit_partial(('semesters', index), semester)
+                return {'final_result': extracted.data, 'metadata': [{'extraction': {'source': 'rule', **extraction_metadata}}]}
+            self.log("rule based extraction failed, fallback to LLM", errors=extracted.errors)
+        else:
+            extraction_metadata = {}
+
+        result_json = self._extract_with_llm(state['transcript_text'])
         
-        return {'final_result': result_json}
+        return {'final_result': result_json, 'metadata': [{'extraction': {'source': 'llm', **extraction_metadata}}]}
+
+
+class LayoutFingerprintNode(BaseNode):
+    '''
+    CreateElementsNode 결과로 layout fingerprint를 만들고 registry에서 known layout인지 조회하는 Node
+
+    known layout이면 state['layout']['profile']에 저장된 결정을 넣어
+    table 검증 없이 ApplyLayoutProfileNode로 route 된다 (known_layout).
+    registry가 None이면 fingerprint만 기록하고 항상 기존 경로로 진행.
+    '''
+    def __init__(self, verbose=False, registry: Optional[LayoutRegistry] = None, **kwargs):
+        super().__init__(verbose=verbose, **kwargs)
+        self.registry = registry
+
+    def run(self, state: ParseState) -> ParseState:
+        fingerprint = LayoutFingerprint.from_elements(state['elements'])
+        if self.registry is None:
+            return {'layout': {'fingerprint': fingerprint.model_dump(), 'profile': None}}
+
+        profile = self.registry.lookup(fingerprint)
+        stats = self.registry.stats()
+        layout_metadata = {
+            'digest': fingerprint.digest,
+            'known': profile is not None,
+            'hit_rate': stats['hit_rate'],
+            'hits': stats['hits'],
+            'misses': stats['misses'],
+        }
+        self.log(f"layout {fingerprint.digest} {'known' if profile else 'unknown'}", hit_rate=f"{stats['hit_rate']:.2f}")
+        return {
+            'layout': {'fingerprint': fingerprint.model_dump(), 'profile': profile.model_dump() if profile else None},
+            'metadata': [{'layout': layout_metadata}],
+        }
+
+
+class ApplyLayoutProfileNode(BaseNode):
+    '''
+    known layout의 table별 OCR 결정을 그대로 적용하는 Node (TableValidationNode 대신 실행)
+    '''
+    def __init__(self, verbose=False, **kwargs):
+        super().__init__(verbose=verbose, **kwargs)
+
+    def run(self, state: ParseState) -> ParseState:
+        ocr_tables = state['layout']['profile']['ocr_tables']
+        tables = [elem for elem in state['elements'] if elem.category == 'table']
+
+        needs_ocr_ids = []
+        for elem, ocr_need in zip(tables, ocr_tables):
+            elem.ocr_need = ocr_need
+            if ocr_need:
+                needs_ocr_ids.append(str(elem.id))
+
+        self.log(f"needs_ocr_elements_id from layout profile: {needs_ocr_ids}")
+        return {'elements': state['elements'], 'needs_ocr_elements_id': needs_ocr_ids}
+
+
+class RecordLayoutNode(BaseNode):
+    '''
+    unknown layout으로 끝까지 처리한 run의 결정(table별 OCR 여부, boundary 방식)을 registry에 기록하는 Node
+
+    - known layout으로 처리한 run은 profile을 그대로 쓴 것이므로 다시 기록하지 않음
+    - 학기를 하나도 추출하지 못한 run은 기록하지 않음
+    '''
+    def __init__(self, verbose=False, registry: Optional[LayoutRegistry] = None, **kwargs):
+        super().__init__(verbose=verbose, **kwargs)
+        self.registry = registry
+
+    @staticmethod
+    def _boundary_strategy(metadata: List[Dict]) -> Optional[str]:
+        sources = [source for item in metadata for source in (item.get('ocr') or {}).get('boundary_sources', [])]
+        if not sources:
+            return None
+        return 'rule' if all(source == 'rule' for source in sources) else 'llm'
+
+    def run(self, state: ParseState) -> ParseState:
+        layout = state.get('layout') or {}
+        final_result = state.get('final_result')
+        if (
+            self.registry is None
+            or not layout.get('fingerprint')
+            or layout.get('profile') is not None
+            or not isinstance(final_result, dict)
+            or not final_result.get('semesters')
+        ):
+            return {'metadata': []}
+
+        fingerprint = LayoutFingerprint(**layout['fingerprint'])
+        ocr_tables = [elem.ocr_need for elem in state['elements'] if elem.category == 'table']
+        profile = self.registry.record(fingerprint, ocr_tables, self._boundary_strategy(state.get('metadata') or []))
+        self.log(f"layout {fingerprint.digest} recorded", observations=profile.observations)
+        return {'metadata': [{'layout': {'digest': fingerprint.digest, 'observations': profile.observations}}]}
+
+
+def known_layout(state: ParseState) -> bool:
+    return bool((state.get('layout') or {}).get('profile'))
@@ -0,0 +1,408 @@
+import re
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+from .element import Element
+from .table_scorer import GRADE_TOKEN_RE, markdown_rows
+
+
+CREDIT_VALUE_RE = re.compile(r"^\d{1,2}(?:\.\d{1,2})?$")
+NUMBER_RE = re.compile(r"\d+(?:\.\d+)?")
+DATE_RE = re.compile(r"(\d{4})\s*[.\-/년]\s*(\d{1,2})\s*[.\-/월]\s*(\d{1,2})")
+SECTION_BANNER_RE = re.compile(r"^━+\[(?P<section>[^\]]+)\]━+$")
+
+KOREAN_4_5_SCALE = {
+    "A+": 4.5, "A0": 4.0, "A": 4.0, "B+": 3.5, "B0": 3.0, "B": 3.0,
+    "C+": 2.5, "C0": 2.0, "C": 2.0, "D+": 1.5, "D0": 1.0, "D": 1.0, "F": 0.0,
+}
+
+
+class TranscriptTemplate(BaseModel):
+    '''
+    대학별 성적표 column / label mapping.
+
+    university_keywords가 비어있으면 어떤 성적표에도 시도하는 generic template.
+    columns: canonical field(year, semester, name, credits, grade, category) → table header 후보
+    positional_columns: 뜻이 여러 가지인 header(예: "평점"은 성적 column일 수도, 평점 숫자 column일 수도 있음) →
+        (field, 바로 앞 column의 field). 그 위치에 정확히 일치할 때만, group에 같은 field header가 없을 때만 인정
+    '''
+    name: str
+    university_keywords: List[str] = Field(default_factory=list)
+    columns: Dict[str, List[str]] = Field(default_factory=dict)
+    positional_columns: Dict[str, Tuple[str, str]] = Field(default_factory=dict)
+    semester_pattern: str = r"(?P<year>\d{4})\s*(?:학?년도?)?\s*[-/.]?\s*(?P<term>[12]\s*학기|여름\s*학기|겨울\s*학기|하계|동계)"
+    total_labels: Dict[str, List[str]] = Field(default_factory=dict)
+    student_info_labels: Dict[str, List[str]] = Field(default_factory=dict)
+    category_labels: Dict[str, str] = Field(default_factory=dict, description="course category code → credits_by_category key")
+    grade_points: Dict[str, float] = Field(default_factory=lambda: dict(KOREAN_4_5_SCALE))
+    pass_grades: List[str] = Field(default_factory=lambda: ["P", "NP", "S", "U", "PASS", "FAIL"])
+    max_course_credits: float = 12.0
+
+    def matches(self, text: str) -> bool:
+        return not self.university_keywords or any(k in text for k in self.university_keywords)
+
+
+DEFAULT_TEMPLATE = TranscriptTemplate(
+    name="korean_default",
+    columns={
+        "year": ["년도", "연도", "학년도"],
+        "semester": ["학기"],
+        "name": ["과목명", "교과목명", "교과목", "과목"],
+        "credits": ["학점", "이수학점"],
+        "grade": ["성적", "등급", "평가"],
+        "category": ["이수구분", "구분", "영역"],
+    },
+    # "학점 | 평점" 배치일 때만 평점을 성적 column으로 (평점평균 / 평점 숫자 column 오인 방지)
+    positional_columns={"평점": ("grade", "credits")},
+    total_labels={
+        "total_credits": ["취득학점", "이수학점계", "학점계", "합계"],
+        "gpa": ["평점평균", "평균평점"],
+        "percentage": ["백분율", "환산점수"],
+    },
+    student_info_labels={
+        "name": ["성명", "이름"],
+        "university": ["대학교"],
+        "department": ["학과", "학부", "전공"],
+        "degree": ["학위"],
+        "date_of_birth": ["생년월일"],
+        "gender": ["성별"],
+        "admission_date": ["입학일자", "입학일"],
+        "graduation_date": ["졸업일자", "졸업일"],
+        "degree_number": ["학위번호", "학위등록번호"],
+    },
+)
+
+TEMPLATE_REGISTRY: Dict[str, TranscriptTemplate] = {}
+
+
+def register_template(template: TranscriptTemplate) -> TranscriptTemplate:
+    '''대학별 template 등록 (같은 name이면 교체)'''
+    TEMPLATE_REGISTRY[template.name] = template
+    return template
+
+
+register_template(DEFAULT_TEMPLATE)
+
+
+class ExtractionResult(BaseModel):
+    template: Optional[str] = None
+    data: Optional[Dict] = None
+    errors: List[str] = Field(default_factory=list)
+
+    @property
+    def ok(self) -> bool:
+        return self.data is not None and not self.errors
+
+
+def _compact(text: str) -> str:
+    return re.sub(r"\s+", "", text)
+
+
+def _to_float(text: str) -> Optional[float]:
+    match = NUMBER_RE.search(text or "")
+    return float(match.group()) if match else None
+
+
+class _TemplateParser:
+    '''template 하나로 elements를 읽어 성적표 JSON을 만든다 (RuleBasedTranscriptExtractor 내부용)'''
+    def __init__(self, template: TranscriptTemplate):
+        self.t = template
+        self.semester_re = re.compile(template.semester_pattern)
+        self.semesters: Dict[Tuple[int, str], Dict] = {}
+        self.current: Optional[Dict] = None
+        self.summary_totals: Dict[str, float] = {}
+        self.student_info: Dict[str, Optional[str]] = {k: None for k in (
+            "name", "university", "department", "degree", "date_of_birth",
+            "gender", "admission_date", "graduation_date", "degree_number",
+        )}
+        self.section: Optional[str] = None
+        self.errors: List[str] = []
+        # 지금 읽는 table row에서 나온 course (column 검사용)
+        self._row_courses: List[Dict] = []
+
+    # ---- semester / totals ----
+    def _semester(self, year: int, term: str) -> Dict:
+        term = _compact(term)
+        term = {"하계": "여름학기", "동계": "겨울학기"}.get(term, term)
+        if term.isdigit():
+            term = f"{term}학기"
+        key = (year, term)
+        if key not in self.semesters:
+            self.semesters[key] = {"year": year, "semester": term, "courses": [], "reported": {}}
+        self.current = self.semesters[key]
+        return self.current
+
+    def _match_semester(self, text: str) -> bool:
+        match = self.semester_re.search(text)
+        if not match:
+            return False
+        self._semester(int(match.group("year")), match.group("term"))
+        return True
+
+    def _match_totals(self, text: str) -> bool:
+        compact = _compact(text)
+        found = False
+        for field, labels in self.t.total_labels.items():
+            for label in labels:
+                index = compact.find(label)
+                if index < 0:
+                    continue
+                value = _to_float(compact[index + len(label):])
+                if value is None:
+                    continue
+                target = self.current["reported"] if self.current is not None and self.section != "Other Table" else self.summary_totals
+                target.setdefault(field, value)
+                found = True
+                break
+        return found
+
+    # ---- course rows ----
+    def _add_course(self, name: str, grade: str, credits: float, category: Optional[str]) -> bool:
+        if self.current is None:
+            self.errors.append(f"course row before any semester header: {name!r}")
+            return False
+        course = {"name": name, "grade": grade.upper(), "credits": credits, "category": category}
+        self.current["courses"].append(course)
+        self._row_courses.append(course)
+        return True
+
+    def _parse_course_tokens(self, tokens: List[str]) -> bool:
+        grade_index = next((i for i in range(len(tokens) - 1, -1, -1) if GRADE_TOKEN_RE.match(tokens[i])), None)
+        credit_index = next((i for i in range(len(tokens) - 1, -1, -1) if i != grade_index and CREDIT_VALUE_RE.match(tokens[i])), None)
+        if grade_index is None or credit_index is None:
+            return False
+        rest = [t for i, t in enumerate(tokens) if i not in (grade_index, credit_index)]
+        category = None
+        if rest and rest[-1] in self.t.category_labels:
+            category = rest.pop()
+        name = " ".join(rest).strip()
+        if not name:
+            return False
+        return self._add_course(name, tokens[grade_index], float(tokens[credit_index]), category)
+
+    def _match_student_info(self, text: str):
+        for field, labels in self.t.student_info_labels.items():
+            if self.student_info.get(field):
+                continue
+            if field == "university":
+                # "OO대학교" 형태 token을 그대로 사용
+                match = re.search(rf"(\S+(?:{'|'.join(map(re.escape, labels))}))", text)
+                if match:
+                    self.student_info[field] = match.group(1)
+                continue
+            for label in labels:
+                match = re.search(rf"(?:^|[\s|(]){re.escape(label)}\s*[:：]?\s*([^\s|]+)", text)
+                if not match:
+                    continue
+                value = match.group(1)
+                if field == "date_of_birth" or field.endswith("_date"):
+                    date = DATE_RE.search(text, match.start(1))
+                    if not date:
+                        continue
+                    value = f"{date.group(1)}-{int(date.group(2)):02d}-{int(date.group(3)):02d}"
+                self.student_info[field] = value
+                break
+
+    def parse_line(self, line: str):
+        line = line.strip()
+        if not line:
+            return
+        banner = SECTION_BANNER_RE.match(line)
+        if banner:
+            self.section = banner.group("section").strip()
+            return
+        if self._match_semester(line):
+            rest = self.semester_re.sub("", line, count=1).strip()
+            if rest:
+                self.parse_line(rest)
+            return
+        if self._parse_course_tokens(line.split()):
+            return
+        if self._match_totals(line):
+            return
+        self._match_student_info(line)
+
+    # ---- markdown tables ----
+    def _header_field(self, cell: str) -> Optional[str]:
+        compact = _compact(cell)
+        if not compact:
+            return None
+        for field, aliases in self.t.columns.items():
+            if compact in aliases:
+                return field
+        for field, aliases in self.t.columns.items():
+            if any(alias in compact for alias in aliases):
+                return field
+        return None
+
+    def _header_fields(self, row: List[str]) -> List[Optional[str]]:
+        fields = [self._header_field(cell) for cell in row]
+        for index, cell in enumerate(row):
+            positional = self.t.positional_columns.get(_compact(cell))
+            if fields[index] is not None or positional is None or index == 0:
+                continue
+            field, previous = positional
+            # 기대한 column 바로 뒤에 있고, (다단이면 group마다) 같은 field의 header가 따로 없을 때만
+            if fields[index - 1] == previous and fields.count(field) < fields.count("name"):
+                fields[index] = field
+        return fields
+
+    def _header_groups(self, row: List[str]) -> List[Dict[str, int]]:
+        '''한 row에 같은 header가 반복되면(다단 성적표) column group 여러 개로 나눈다'''
+        groups, current = [], {}
+        for index, field in enumerate(self._header_fields(row)):
+            if field is None:
+                continue
+            if field in current:
+                groups.append(current)
+                current = {}
+            current[field] = index
+        if current:
+            groups.append(current)
+        return [g for g in groups if {"name", "credits", "grade"} <= set(g)]
+
+    def parse_table(self, markdown: str):
+        groups: List[Dict[str, int]] = []
+        for row in markdown_rows(markdown):
+            header = self._header_groups(row)
+            if header:
+                groups = header
+                continue
+            if not groups:
+                self.parse_line(" ".join(row))
+                continue
+            for group in groups:
+                cell = lambda field: row[group[field]].strip() if field in group and group[field] < len(row) else ""
+                name, grade, credits = cell("name"), cell("grade"), cell("credits")
+                if not any((name, grade, credits)):
+                    continue
+                year = _to_float(cell("year"))
+                if year and cell("semester"):
+                    self._semester(int(year), cell("semester"))
+                self._row_courses = []
+                if name and GRADE_TOKEN_RE.match(grade) and CREDIT_VALUE_RE.match(credits):
+                    self._add_course(name, grade, float(credits), cell("category") or None)
+                else:
+                    self.parse_line(" ".join(c for c in (name, credits, grade) if c))
+                self._check_row_columns(group)
+
+    def _check_row_columns(self, group: Dict[str, int]):
+        '''table row에서 나온 course가 header group의 column을 모두 채웠는지 (년도 / 학기는 앞 row에서 이어짐)'''
+        expected = set(group) - {"year", "semester"}
+        for course in self._row_courses:
+            missing = sorted(field for field in expected if course.get(field) in (None, ""))
+            if missing:
+                self.errors.append(f"course {course['name']!r} is missing columns {missing}")
+
+    # ---- result ----
+    def _gpa(self, courses: Iterable[Dict]) -> Tuple[float, float]:
+        points = credits = 0.0
+        for course in courses:
+            point = self.t.grade_points.get(course["grade"])
+            if point is None:
+                continue
+            points += point * course["credits"]
+            credits += course["credits"]
+        return points, credits
+
+    def _check_course_values(self, semester: Dict, course: Dict):
+        label = f"{semester['year']} {semester['semester']} {course['name']!r}"
+        if course["grade"] not in self.t.grade_points and course["grade"] not in self.t.pass_grades:
+            self.errors.append(f"{label}: unknown grade {course['grade']!r}")
+        if not 0 <= course["credits"] <= self.t.max_course_credits:
+            self.errors.append(f"{label}: credits {course['credits']} out of range")
+
+    def result(self, credit_tolerance: float) -> Dict:
+        semesters = []
+        all_courses = []
+        for semester in sorted(self.semesters.values(), key=lambda s: (s["year"], s["semester"])):
+            courses = semester["courses"]
+            if not courses:
+                self.errors.append(f"no courses in {semester['year']} {semester['semester']}")
+                continue
+            for course in courses:
+                self._check_course_values(semester, course)
+            credits = sum(c["credits"] for c in courses)
+            reported = semester["reported"]
+            if "total_credits" in reported and abs(reported["total_credits"] - credits) > credit_tolerance:
+                self.errors.append(
+                    f"{semester['year']} {semester['semester']}: reported {reported['total_credits']} credits, parsed {credits}"
+                )
+            points, graded = self._gpa(courses)
+            semesters.append({
+                "year": semester["year"],
+                "semester": semester["semester"],
+                "courses": courses,
+                "total_credits": reported.get("total_credits", credits),
+                "gpa": reported.get("gpa", round(points / graded, 2) if graded else None),
+                "percentage": reported.get("percentage"),
+            })
+            all_courses.extend(courses)
+
+        if not semesters:
+            self.errors.append("no semester with courses found")
+
+        points, graded = self._gpa(all_courses)
+        by_category: Dict[str, float] = {}
+        for course in all_courses:
+            if course["category"]:
+                key = self.t.category_labels.get(course["category"], course["category"])
+                by_category[key] = by_category.get(key, 0.0) + course["credits"]
+
+        return {
+            "student_info": self.student_info,
+            "semesters": semesters,
+            "credit_summary": {
+                "total_credits": self.summary_totals.get("total_credits", sum(c["credits"] for c in all_courses)),
+                "total_gpa_points": round(points, 2),
+                "overall_gpa": self.summary_totals.get("gpa", round(points / graded, 2) if graded else None),
+                "overall_percentage": self.summary_totals.get("percentage"),
+                "credits_by_category": by_category,
+                "multi_major_credits": {},
+            },
+        }
+
+
+class RuleBasedTranscriptExtractor:
+    '''
+    ExtractJsonNode의 LLM 호출 전에 시도하는 규칙 기반 추출기.
+
+    - Upstage table markdown은 header(년도/학기/과목명/학점/성적 ...)를 template.columns로 매핑해서 읽고
+    - OCR sub graph 결과(SplitByYBoundaryNode section text)와 나머지 element는 줄 단위로 읽는다
+      (학기 header → course line(과목명 ... 학점 성적) → 취득학점/평점평균 줄)
+    - 텍스트에 university_keywords가 있는 template부터, 마지막으로 generic template 순서로 시도
+    - 검증(학기별 course 존재, table row가 header의 column을 모두 채움, template이 아는 성적 / 범위 안의 학점,
+      보고된 취득학점과 합계 일치 등)을 통과한 첫 결과를 사용하고
+      모두 실패하면 ok=False (ExtractJsonNode가 LLM으로 fallback)
+    '''
+    def __init__(self, templates: Optional[List[TranscriptTemplate]] = None, credit_tolerance: float = 0.5):
+        self.templates = templates
+        self.credit_tolerance = credit_tolerance
+
+    def candidates(self, text: str) -> List[TranscriptTemplate]:
+        templates = self.templates if self.templates is not None else list(TEMPLATE_REGISTRY.values())
+        specific = [t for t in templates if t.university_keywords and t.matches(text)]
+        generic = [t for t in templates if not t.university_keywords]
+        return specific + generic
+
+    def extract_with(self, template: TranscriptTemplate, elements: List[Element]) -> ExtractionResult:
+        parser = _TemplateParser(template)
+        for elem in elements:
+            content = elem.content or ""
+            if elem.category == "table" and markdown_rows(content):
+                parser.parse_table(content)
+            else:
+                for line in content.splitlines():
+                    parser.parse_line(line.lstrip("#").strip())
+        data = parser.result(self.credit_tolerance)
+        return ExtractionResult(template=template.name, data=data, errors=parser.errors)
+
+    def extract(self, elements: List[Element]) -> ExtractionResult:
+        text = "\n".join(elem.content or "" for elem in elements)
+        last = ExtractionResult(errors=["no template matched"])
+        for template in self.candidates(text):
+            last = self.extract_with(template, elements)
+            if last.ok:
+                return last
+        return last
@@ -1,11 +1,16 @@
 from typing import TypedDict, Annotated, List, Dict, Tuple
 import operator
-from .element import Element, TableBoundary, OCRElement
+from .element import Element, TableBoundary
+from .ocr_words import OCRWords
 
 
 class ParseState(TypedDict):
     filepath: Annotated[str, "filepath"]  # 원본 파일 경로
 
+    file_sha256 : Annotated[str, 'file_sha256']  # 업로드 시 계산한 원본 파일 SHA-256 (없으면 parse node에서 계산)
+
+    blob_store_id : Annotated[str, 'blob_store_id']  # element 이미지 bytes를 들고 있는 run 단위 BlobStore
+
     original_document_parser_filepath : Annotated[str, 'original_document_parser_filepath']
 
     metadata: Annotated[
@@ -16,8 +21,12 @@ class ParseState(TypedDict):
 
     elements: Annotated[List[Element], "elements"]  # Final cleaned elements
 
+    layout : Annotated[Dict, 'layout']  # {'fingerprint': LayoutFingerprint dump, 'profile': known layout이면 LayoutProfile dump}
+
     needs_ocr_elements_id : Annotated[List[str], 'needs_ocr_elements', operator.add]
 
+    ocr_completed_elements_id : Annotated[List[str], 'ocr_completed_elements', operator.add]  # pipelined mode에서 이미 OCR 처리된 element
+
     transcript_text : Annotated[str, 'text_result']
 
     final_result : Annotated[str, 'final_json_result']
@@ -27,7 +36,7 @@ class OCRParseState(TypedDict):
     
     grade_image_filepath: Annotated[str, "base_filepath"]
 
-    base64_encoding : Annotated[str, "base64_encoding"]
+    image_handle : Annotated[str, "BlobStore handle of the element image"]
 
     element_dir : Annotated[str, "element_dir"]
 
@@ -35,7 +44,7 @@ class OCRParseState(TypedDict):
 
     image_file_path : Annotated[str, "image_file_path"]
 
-    ocr_data: Annotated[List[OCRElement], operator.add]
+    ocr_words: Annotated[OCRWords, "columnar OCR words (x, y, confidence, id, text)"]
 
     page_width: Annotated[int, 'page_width']
 
@@ -49,6 +58,8 @@ class OCRParseState(TypedDict):
 
     grouped_elements : Annotated[List[Tuple[str, int ,int]], "rulebased_elements"]
 
+    boundary_strategy : Annotated[str, "known layout의 boundary 결정 방식 ('rule' | 'llm'), 없으면 None"]
+
     grade_table_boundary: Annotated[TableBoundary, 'output grade_table_boundary']
 
     result_element : Annotated[str, "result_element"]
@@ -0,0 +1,139 @@
+import re
+import json
+from typing import Dict, Iterable, List, Literal, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+
+GRADE_TOKEN_RE = re.compile(r"^(?:[A-D][+0-]|[A-D]|F|P|NP|S|U|PASS|FAIL)$", re.IGNORECASE)
+_SEPARATOR_CELL_RE = re.compile(r"^:?-{2,}:?$")
+
+
+def markdown_rows(markdown: str) -> List[List[str]]:
+    '''markdown table을 cell list의 row list로 변환 (구분선 row 제외)'''
+    rows = []
+    for line in markdown.splitlines():
+        line = line.strip()
+        if not line.startswith("|"):
+            continue
+        cells = [c.strip() for c in line.strip("|").split("|")]
+        if cells and all(_SEPARATOR_CELL_RE.match(c) for c in cells if c):
+            continue
+        rows.append(cells)
+    return rows
+
+
+class TableScore(BaseModel):
+    decision: Optional[Literal["YES", "NO"]] = Field(
+        None, description='"YES" = OCR 필요, "NO" = parser 결과 사용, None = 판단 보류(LLM으로 넘김)'
+    )
+    confidence: float = Field(0.0, description="decision에 대한 확신도 (0~1)")
+    quality: float = Field(0.0, description="table 구조 품질 점수 (0~1)")
+    features: Dict[str, float] = Field(default_factory=dict)
+
+
+class TableQualityScorer:
+    '''
+    Element.content(markdown table)를 규칙 기반으로 채점해서 OCR 필요 여부를 판단.
+
+    ## features
+    - column_consistency: 최빈 column 수와 같은 row의 비율
+    - empty_cell_ratio: 빈 cell 비율
+    - grade_density: 성적 token(A+, B0, P ...)이 들어있는 row 비율
+    - packed_cell_ratio: 한 cell에 성적 token이 2개 이상 뭉친 cell 비율 (column이 무너진 신호)
+    - grade_tokens: 성적 token 수 (pipe table이 없으면 본문 전체에서)
+    - rows: data row 수
+
+    CheckParsedResult prompt와 같이 "YES"는 구조가 무너졌고 **성적 내용이 있을 때만**:
+    - 성적 token이 없으면 (학적 정보 table, pipe table이 아닌 본문 등) 구조와 무관하게 "NO"
+    - 성적은 있지만 row가 min_rows 미만이거나 pipe table이 아니면 decision=None (LLM 판단)
+    - 그 외 quality >= accept_threshold 이면 "NO", quality <= reject_threshold 이면 "YES", 그 사이는 None
+    '''
+    def __init__(self, accept_threshold: float = 0.8, reject_threshold: float = 0.35, min_rows: int = 2):
+        self.accept_threshold = accept_threshold
+        self.reject_threshold = reject_threshold
+        self.min_rows = min_rows
+
+    def features(self, markdown: str) -> Dict[str, float]:
+        rows = markdown_rows(markdown or "")
+        if not rows:
+            grade_tokens = sum(1 for tok in (markdown or "").split() if GRADE_TOKEN_RE.match(tok))
+            return {
+                "rows": 0, "column_consistency": 0.0, "empty_cell_ratio": 1.0,
+                "grade_density": 0.0, "packed_cell_ratio": 0.0, "grade_tokens": grade_tokens,
+            }
+
+        col_counts = [len(r) for r in rows]
+        modal = max(set(col_counts), key=col_counts.count)
+        cells = [c for r in rows for c in r]
+        grade_counts = [sum(1 for tok in c.split() if GRADE_TOKEN_RE.match(tok)) for c in cells]
+
+        # 첫 row는 header로 보고 data row만 grade token 밀도 계산
+        data_rows = rows[1:] or rows
+        grade_rows = sum(
+            1 for r in data_rows if any(GRADE_TOKEN_RE.match(tok) for c in r for tok in c.split())
+        )
+        return {
+            "rows": len(data_rows),
+            "column_consistency": col_counts.count(modal) / len(rows),
+            "empty_cell_ratio": sum(1 for c in cells if not c) / len(cells),
+            "grade_density": grade_rows / len(data_rows),
+            "packed_cell_ratio": sum(1 for n in grade_counts if n >= 2) / len(cells),
+            "grade_tokens": sum(grade_counts),
+        }
+
+    def score(self, markdown: str) -> TableScore:
+        f = self.features(markdown)
+        if not f["grade_tokens"]:
+            # 성적 내용이 없으면 OCR로 다시 읽을 이유가 없다 (prompt의 2번 조건)
+            return TableScore(decision="NO", confidence=0.9, quality=0.0, features=f)
+        if f["rows"] < self.min_rows:
+            # 성적은 있지만 table 구조로 판단할 근거가 부족 → LLM
+            return TableScore(decision=None, confidence=0.0, quality=0.0, features=f)
+
+        quality = (
+            0.35 * f["column_consistency"]
+            + 0.25 * (1.0 - f["empty_cell_ratio"])
+            + 0.25 * f["grade_density"]
+            + 0.15 * min(1.0, f["rows"] / 5)
+        )
+        quality = max(0.0, quality - min(0.5, 2.0 * f["packed_cell_ratio"]))
+
+        if quality >= self.accept_threshold:
+            return TableScore(decision="NO", confidence=quality, quality=quality, features=f)
+        if quality <= self.reject_threshold:
+            return TableScore(decision="YES", confidence=1.0 - quality, quality=quality, features=f)
+        return TableScore(decision=None, confidence=0.0, quality=quality, features=f)
+
+    def evaluate(self, fixtures: Iterable[Tuple[str, str]]) -> Dict[str, float]:
+        '''
+        labelled fixture [(markdown, "YES"|"NO"), ...]로 threshold를 점검.
+        coverage = LLM 없이 결정한 비율, accuracy = 결정한 것 중 정답 비율
+        '''
+        total = decided = correct = 0
+        for markdown, label in fixtures:
+            total += 1
+            result = self.score(markdown)
+            if result.decision is None:
+                continue
+            decided += 1
+            correct += int(result.decision == label)
+        return {
+            "total": total,
+            "decided": decided,
+            "correct": correct,
+            "coverage": decided / total if total else 0.0,
+            "accuracy": correct / decided if decided else 0.0,
+        }
+
+
+def load_fixtures(path: str) -> List[Tuple[str, str]]:
+    '''JSONL fixture ({"markdown": ..., "label": "YES"|"NO"}) 로드'''
+    fixtures = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            fixtures.append((row["markdown"], row["label"]))
+    return fixtures
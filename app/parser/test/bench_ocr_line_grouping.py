@@ -0,0 +1,112 @@
+import time
+import random
+from collections import defaultdict
+from typing import Dict, List
+
+from app.parser.element import OCRElement
+from app.parser.ocr_words import OCRWords
+
+
+GRADES = ["A+", "A0", "B+", "B0", "C+", "C0", "D+", "P", "F"]
+
+
+def make_page(n_words: int, page_width: int = 2400, num_cols: int = 3, seed: int = 0) -> List[Dict]:
+    """Synthetic Upstage OCR words: three column-split transcript pages with jittered baselines."""
+    rng = random.Random(seed)
+    col_width = page_width // num_cols
+    words_per_line = 6
+    lines_per_col = max(1, n_words // (words_per_line * num_cols))
+    words = []
+    for col in range(num_cols):
+        for line in range(lines_per_col):
+            base_y = 40 + line * 14
+            for k in range(words_per_line):
+                text = rng.choice(GRADES) if k == 4 else f"w{col}_{line}_{k}"
+                words.append({
+                    "id": len(words),
+                    "text": text,
+                    "confidence": rng.uniform(0.4, 1.0),
+                    "boundingBox": {"vertices": [{
+                        "x": col * col_width + 10 + k * 60 + rng.randint(-3, 3),
+                        "y": base_y + rng.randint(-2, 2),
+                    }]},
+                })
+    rng.shuffle(words)
+    return words
+
+
+def legacy_ingest(words: List[Dict], min_confidence: float = 0.6) -> List[OCRElement]:
+    """What UpstageOCRNode did before OCRWords: one pydantic OCRElement per kept word."""
+    return [
+        OCRElement(id=w["id"], vertices=w["boundingBox"]["vertices"][0], text=w["text"])
+        for w in words
+        if float(w.get("confidence", "0")) > min_confidence
+    ]
+
+
+def legacy_group_lines(ocr_data: List[OCRElement], page_width: float, num_cols: int = 3, y_threshold: int = 3):
+    """Pure-Python grouping that GroupXYLine used before OCRWords (kept here as the reference)."""
+    col_width = page_width / num_cols
+    columns = defaultdict(list)
+    for elem in ocr_data:
+        x0 = elem.vertices["x"]
+        y0 = elem.vertices["y"]
+        col_index = min(int(x0 // col_width), num_cols - 1)
+        columns[col_index].append((y0, x0, elem.text))
+
+    all_texts = []
+    for col in range(num_cols):
+        all_texts.extend(sorted(columns[col], key=lambda t: t[0]))
+
+    lines, current_line, current_y = [], [], None
+    for y, x, text in all_texts:
+        if current_y is None:
+            current_y = y
+            current_line.append((x, text, y))
+        elif abs(y - current_y) <= y_threshold:
+            current_line.append((x, text, y))
+        else:
+            current_line_sorted = sorted(current_line, key=lambda t: t[0])
+            lines.append((" ".join(t[1] for t in current_line_sorted), min(t[0] for t in current_line_sorted), min(t[2] for t in current_line_sorted)))
+            current_line = [(x, text, y)]
+            current_y = y
+    if current_line:
+        current_line_sorted = sorted(current_line, key=lambda t: t[0])
+        lines.append((" ".join(t[1] for t in current_line_sorted), min(t[0] for t in current_line_sorted), min(t[2] for t in current_line_sorted)))
+    return lines
+
+
+def bench(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    page_width = 2400
+    print("ingest = Upstage words -> stored representation, group = GroupXYLine on the stored words")
+    print(f"{'words':>8} {'lines':>7} {'legacy_ingest':>14} {'array_ingest':>13} {'legacy_group':>13} {'array_group':>12} {'total_speedup':>14}")
+    for n_words in (5_000, 20_000, 50_000):
+        words = make_page(n_words, page_width=page_width)
+        elements = legacy_ingest(words)
+        ocr_words = OCRWords.from_upstage_words(words, min_confidence=0.6)
+
+        expected = legacy_group_lines(elements, page_width)
+        assert ocr_words.group_lines(page_width) == expected, "OCRWords.group_lines differs from the legacy grouping"
+
+        legacy_in = bench(lambda: legacy_ingest(words))
+        array_in = bench(lambda: OCRWords.from_upstage_words(words, min_confidence=0.6))
+        legacy_gr = bench(lambda: legacy_group_lines(elements, page_width))
+        array_gr = bench(lambda: ocr_words.group_lines(page_width))
+        speedup = (legacy_in + legacy_gr) / (array_in + array_gr)
+        print(
+            f"{len(words):>8} {len(expected):>7} {legacy_in * 1e3:>12.1f}ms {array_in * 1e3:>11.1f}ms "
+            f"{legacy_gr * 1e3:>11.1f}ms {array_gr * 1e3:>10.1f}ms {speedup:>13.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,24 @@
+from pathlib import Path
+
+from app.parser.table_scorer import TableQualityScorer, load_fixtures
+
+
+FIXTURES = Path(__file__).with_name("table_scorer_fixtures.jsonl")
+
+
+def main():
+    """Score every labelled fixture; rule decisions must match the label (None = left to the LLM)."""
+    scorer = TableQualityScorer()
+    fixtures = load_fixtures(str(FIXTURES))
+    wrong = 0
+    for index, (markdown, label) in enumerate(fixtures):
+        result = scorer.score(markdown)
+        ok = result.decision in (None, label)
+        wrong += not ok
+        print(f"{index:>3} label={label:<3} decision={str(result.decision):<4} quality={result.quality:.2f} {'ok' if ok else 'WRONG'}")
+    print(scorer.evaluate(fixtures))
+    assert not wrong, f"{wrong} fixture(s) decided against their label"
+
+
+if __name__ == "__main__":
+    main()
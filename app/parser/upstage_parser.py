@@ -1,16 +1,22 @@
-import requests
-import json
+import logging
 import os
 import time
 import re
-import base64
-import io
-from PIL import Image
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 from .base import BaseNode
 from .state import ParseState, OCRParseState
-from .element import OCRElement
+from .ocr_words import OCRWords
+from .cache import DiskCache, file_sha256
+from .http_client import UpstageClient, get_upstage_client
+from .blob_store import BlobStore, open_blob_store, resolve_blob
+from .pdf_chunks import split_pdf, merge_document_parse_responses, pypdf_available
+from .artifacts import ArtifactWriter, get_artifact_writer
 
 
+logger = logging.getLogger(__name__)
+
 
 DEFAULT_CONFIG = {
     "ocr": "auto",    # "auto" | "force"
@@ -22,52 +28,97 @@ DEFAULT_CONFIG = {
 
 
 class UpstageParseNode(BaseNode):
-    def __init__(self, api_key, verbose=False, **kwargs):
+    def __init__(
+        self,
+        api_key,
+        verbose=False,
+        cache: Optional[DiskCache] = None,
+        client: Optional[UpstageClient] = None,
+        pages_per_chunk: int = 0,
+        max_concurrency: int = 4,
+        artifacts: Optional[ArtifactWriter] = None,
+        **kwargs,
+    ):
         """
         DocumentParse 클래스의 생성자
 
         :param api_key: Upstage API 인증을 위한 API 키
         :param config: API 요청에 사용할 설정값. None인 경우 기본 설정 사용
+        :param cache: PDF SHA-256 + config를 key로 API 응답을 저장하는 DiskCache. None이면 캐시 사용 X
+        :param client: 공유 keep-alive UpstageClient. None이면 process-wide client 사용
+        :param pages_per_chunk: 0보다 크면 PDF를 이 page 수 단위로 나눠 동시에 parse 후 합침 (pypdf 필요, 없으면 문서 전체를 한 번에 요청)
+        :param max_concurrency: chunk parse 동시 요청 수
+        :param artifacts: API 응답을 background로 저장하는 ArtifactWriter. None이면 process-wide writer 사용
         """
         super().__init__(verbose=verbose, **kwargs)
         self.api_key = api_key
         self.config = DEFAULT_CONFIG
+        self.cache = cache
+        self.client = client or get_upstage_client()
+        self.pages_per_chunk = pages_per_chunk
+        if pages_per_chunk > 0 and not pypdf_available():
+            # verbose와 상관없이 남김: 설정만 하고 pypdf가 없으면 chunk parse가 조용히 꺼진다
+            logger.warning(
+                "UPSTAGE_PARSE_PAGES_PER_CHUNK=%d is set but pypdf is not installed; "
+                "PDFs will be parsed as a whole document (pip install pypdf to enable chunking)",
+                pages_per_chunk,
+            )
+        self.max_concurrency = max(1, max_concurrency)
+        self.artifacts = artifacts or get_artifact_writer()
 
-    def _parse_document_via_upstage(self, input_file_path : str):
-        """
-        Upstage의 Document Parse API를 호출하여 문서 분석을 수행합니다.
-
-        :param input_file: 분석할 PDF 파일의 경로
-        :return: 분석 결과가 저장된 JSON 파일의 경로
-        """
-
+    def _request_document_parse(self, input_file_path: str) -> dict:
+        """Document Parse API 요청 한 번 (응답 JSON 반환)"""
         # API request header
         headers = {'Authorization' : f'Bearer {self.api_key}'}
 
         # post API requests
         with open(input_file_path, 'rb') as f:
             files = {"document": f}
-            response = requests.post(
-                "https://api.upstage.ai/v1/document-digitization",
+            response = self.client.post(
+                "/document-digitization",
                 headers=headers,
                 data=self.config,
                 files=files
             )
         
 
-        # API 응답 처리 및 결과 저장
         if response.status_code == 200:
-            # 분석 결과를 저장할 JSON 파일 경로 생성
-            output_file_path = os.path.splitext(input_file_path)[0] + ".json"
-
-            # 분석 결과를 JSON 파일로 저장
-            with open(output_file_path, "w") as f:
-                json.dump(response.json(), f, ensure_ascii=False, indent=2)
-
-            return output_file_path
+            return response.json()
         else:
             # API 요청이 실패한 경우 예외 발생
             raise ValueError(f"Unexpected status code: {response.status_code}")
+
+    def _parse_document_in_chunks(self, input_file_path: str) -> Optional[dict]:
+        """
+        PDF를 page range로 나눠 동시에 parse하고, 전체 문서 응답과 같은 형태로 합친다.
+        나눌 수 없으면(pypdf 미설치, page 수 <= pages_per_chunk) None.
+        """
+        if self.pages_per_chunk <= 0:
+            return None
+
+        with tempfile.TemporaryDirectory(prefix="parse-chunks-", dir=os.path.dirname(input_file_path) or None) as chunk_dir:
+            chunks = split_pdf(input_file_path, self.pages_per_chunk, chunk_dir)
+            if chunks is None:
+                self.log(f"Chunked parse skipped (pypdf unavailable or <= {self.pages_per_chunk} pages), parse whole document")
+                return None
+
+            self.log(f"Parse {len(chunks)} chunks of {self.pages_per_chunk} pages concurrently")
+            with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(chunks))) as pool:
+                responses = list(pool.map(self._request_document_parse, [chunk.path for chunk in chunks]))
+
+        return merge_document_parse_responses(responses, chunks)
+
+    def _parse_document_via_upstage(self, input_file_path : str):
+        """
+        Upstage의 Document Parse API를 호출하여 문서 분석을 수행합니다.
+
+        :param input_file: 분석할 PDF 파일의 경로
+        :return: 분석 결과 (API 응답 JSON)
+        """
+        data = self._parse_document_in_chunks(input_file_path)
+        if data is None:
+            data = self._request_document_parse(input_file_path)
+        return data
     
     def run(self, state: ParseState):
         """
@@ -79,52 +130,92 @@ class UpstageParseNode(BaseNode):
     
         start_time = time.time()
         filepath = state['filepath']
-        parsed_document_json_file_path = self._parse_document_via_upstage(filepath)
 
-        with open(parsed_document_json_file_path, 'r') as f:
-            data = json.load(f)
+        cache_key = None
+        data = None
+        if self.cache is not None:
+            # 업로드하면서 계산한 digest가 있으면 파일을 다시 읽지 않는다
+            cache_key = self.cache.make_key(state.get('file_sha256') or file_sha256(filepath), self.config)
+            data = self.cache.get(cache_key)
+        cache_hit = data is not None
+
+        if cache_hit:
+            self.log(f"Document parse cache hit: {cache_key}")
+            parsed_document_json_file_path = str(self.cache.path_for(cache_key))
+        else:
+            # 응답은 바로 state로 넘기고, 파일은 background에서 compact gzip으로만 남긴다
+            data = self._parse_document_via_upstage(filepath)
+            parsed_document_json_file_path = self.artifacts.submit(data, os.path.splitext(filepath)[0] + ".json")
+
+            if self.cache is not None:
+                self.cache.set(cache_key, data)
+
+        # base64 이미지는 디코딩해서 BlobStore에 한 번만 두고, element에는 handle만 남긴다
+        # (data는 artifact writer가 background에서 직렬화 중일 수 있으므로 수정하지 않고 복사본을 만든다)
+        blob_store = open_blob_store(state.get('blob_store_id'))
+        elements = []
+        for element in data['elements']:
+            base64_encoding = element.get('base64_encoding')
+            if base64_encoding:
+                element = {k: v for k, v in element.items() if k != 'base64_encoding'}
+                element['image_handle'] = blob_store.put_base64(base64_encoding)
+            elements.append(element)
 
         metadata = {
-            'api' : data.pop('api'),
-            'model' : data.pop('model'),
-            'usage' : data.pop('usage'),
+            'api' : data.get('api'),
+            'model' : data.get('model'),
+            'usage' : data.get('usage'),
+        }
+        if self.cache is not None:
+            metadata['cache'] = {'hit': cache_hit, **self.cache.stats()}
+
+        return {
+            "metadata": [metadata],
+            "elements_from_parser": elements,
+            "original_document_parser_filepath": parsed_document_json_file_path,
+            "blob_store_id": blob_store.id,
         }
-
-        return {"metadata": [metadata], "elements_from_parser": data["elements"], "original_document_parser_filepath": parsed_document_json_file_path}
 
 
 class UpstageOCRNode(BaseNode):
-    def __init__(self, api_key, verbose=False, **kwargs):
+    # 이 값 또는 _cleaning_text 규칙이 바뀌면 OCR 캐시 key도 달라지도록 key에 포함
+    MIN_CONFIDENCE = 0.6
+    CACHE_VERSION = 2
+
+    def __init__(
+        self,
+        api_key,
+        verbose=False,
+        cache: Optional[DiskCache] = None,
+        client: Optional[UpstageClient] = None,
+        artifacts: Optional[ArtifactWriter] = None,
+        **kwargs,
+    ):
         """
         DocumentParse 클래스의 생성자
 
         :param api_key: Upstage API 인증을 위한 API 키
         :param config: API 요청에 사용할 설정값. None인 경우 기본 설정 사용
+        :param cache: 잘라낸 table 이미지 bytes의 hash를 key로 OCR 결과를 저장하는 DiskCache
+        :param client: 공유 keep-alive UpstageClient. None이면 process-wide client 사용
+        :param artifacts: OCR 응답을 background로 저장하는 ArtifactWriter. None이면 process-wide writer 사용
         """
         super().__init__(verbose=verbose, **kwargs)
         self.api_key = api_key
+        self.cache = cache
+        self.client = client or get_upstage_client()
+        self.artifacts = artifacts or get_artifact_writer()
 
-    def _document_ocr_via_upstage(self, input_file_path,  dirname, index):
-        url = "https://api.upstage.ai/v1/document-digitization"
+    def _document_ocr_via_upstage(self, input_file_path) -> dict:
         headers = {"Authorization": f"Bearer {self.api_key}"}
 
-        files = {"document": open(input_file_path, "rb")}
         data = {"model": 'ocr'}
-        response = requests.post(url, headers=headers, files=files, data=data)
-
-        ocr_filename = (
-            f"grade_element_{index}_ocr_.json"
-        )
-        ocr_file_path = os.path.join(dirname, ocr_filename)
+        with open(input_file_path, "rb") as f:
+            files = {"document": f}
+            response = self.client.post("/document-digitization", headers=headers, files=files, data=data)
 
         if response.status_code == 200:
-            # 분석 결과를 저장할 JSON 파일 경로 생성
-
-            # 분석 결과를 JSON 파일로 저장
-            with open(ocr_file_path, "w") as f:
-                json.dump(response.json(), f, ensure_ascii=False, indent=2)
-
-            return ocr_file_path
+            return response.json()
         else:
             # API 요청이 실패한 경우 예외 발생
             raise ValueError(f"Unexpected status code: {response.status_code}")
@@ -135,8 +226,8 @@ class UpstageOCRNode(BaseNode):
         # data['pages'][0]['words'][0]['boundingBox']['vertices'][0]  => x,y 좌측 상단 좌표
         # data['metadata']['pages'][0] =>  metadata {height, width, page} 
         metadata['model']=data['modelVersion']
-        data['metadata']['pages'][0].pop('page') # metadata에서 height, width값만 
-        metadata['size']=data['metadata']['pages'][0]
+        # metadata에서 height, width값만 (data는 artifact writer가 직렬화 중일 수 있어 수정하지 않음)
+        metadata['size']={k: v for k, v in data['metadata']['pages'][0].items() if k != 'page'}
         metadata['text']=data['text']
         return metadata
 
@@ -148,13 +239,7 @@ class UpstageOCRNode(BaseNode):
         text = text.replace('|', 'I') # '|' → 'I'
         return text
 
-    def _save_to_png(self, base64_encoding, dirname, index):
-        # base64 디코딩
-        image_data = base64.b64decode(base64_encoding)
-
-        # 바이트 데이터를 이미지로 변환
-        image = Image.open(io.BytesIO(image_data))
-
+    def _save_to_png(self, image_handle: str, dirname, index):
         # basename_prefix를 사용하여 이미지 파일명 생성
         image_filename = (
             f"grade_element_{index}.png"
@@ -162,9 +247,8 @@ class UpstageOCRNode(BaseNode):
         image_path = os.path.join(dirname, image_filename)
         abs_image_path = os.path.abspath(image_path)
 
-        # 이미지 저장
-        image.save(abs_image_path)
-        return abs_image_path
+        # 이미지 저장 (BlobStore의 bytes가 이미 PNG이면 re-encode 없이 그대로 기록)
+        return resolve_blob(image_handle).write_png(image_handle, abs_image_path)
     
 
     def run(self, state: OCRParseState):
@@ -181,27 +265,47 @@ class UpstageOCRNode(BaseNode):
         os.makedirs(element_dir, exist_ok=True)
         state['element_dir'] = element_dir
 
-        image_file_path = self._save_to_png(state['base64_encoding'], element_dir, state['element_id'])
-        ocr_json_file_path = self._document_ocr_via_upstage(image_file_path, element_dir, state['element_id'])
-        state['image_file_path'] = image_file_path
-
-        with open(ocr_json_file_path, 'r') as f:
-            data = json.load(f)
-
-        metadata = self._metadata_ocr_json(data)
-
-        update_words = []
-        for word in data['pages'][0]['words']:
-            confidence = word.get('confidence', '0')
-            if float(confidence) <= 0.6:
-                continue
-            elem = None
-            elem = OCRElement(
-                id=word['id'],
-                vertices=word['boundingBox']['vertices'][0], # 좌측상단 좌표만 추출
-                text=self._cleaning_text(word['text'])
+        # handle에 이미지 bytes의 sha256이 들어있으므로 bytes를 다시 읽지 않고 캐시 조회
+        image_handle = state['image_handle']
+
+        cache_key = None
+        cached = None
+        if self.cache is not None:
+            cache_key = self.cache.make_key(
+                BlobStore.digest(image_handle),
+                {'model': 'ocr', 'min_confidence': self.MIN_CONFIDENCE, 'version': self.CACHE_VERSION},
+            )
+            cached = self.cache.get(cache_key)
+
+        if cached is not None:
+            self.log(f"OCR cache hit: element {state['element_id']}")
+            metadata = cached['metadata']
+            ocr_words = OCRWords.from_records(cached['words'])
+            ocr_json_file_path = str(self.cache.path_for(cache_key))
+        else:
+            image_file_path = self._save_to_png(image_handle, element_dir, state['element_id'])
+            data = self._document_ocr_via_upstage(image_file_path)
+            ocr_json_file_path = self.artifacts.submit(
+                data, os.path.join(element_dir, f"grade_element_{state['element_id']}_ocr_.json")
             )
-            
-            update_words.append(elem)
+            state['image_file_path'] = image_file_path
+
+            metadata = self._metadata_ocr_json(data)
+
+            # confidence filter / text 정리는 column 단위로 한 번에 처리
+            ocr_words = OCRWords.from_upstage_words(
+                data['pages'][0]['words'],
+                min_confidence=self.MIN_CONFIDENCE,
+                clean=self._cleaning_text,
+            )
+
+            if self.cache is not None:
+                self.cache.set(cache_key, {
+                    'metadata': metadata,
+                    'words': ocr_words.to_records(),
+                })
+
+        if self.cache is not None:
+            metadata = {**metadata, 'cache': {'hit': cached is not None, **self.cache.stats()}}
 
-        return {'metadata': [metadata], 'ocr_data': update_words, 'page_width': metadata['size']['width'], 'ocr_json_file_path' : ocr_json_file_path}
+        return {'metadata': [metadata], 'ocr_words': ocr_words, 'page_width': metadata['size']['width'], 'ocr_json_file_path' : ocr_json_file_path}
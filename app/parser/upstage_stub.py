@@ -0,0 +1,196 @@
+'''
+Upstage document-digitization API의 로컬 stand-in 서버.
+
+네트워크 / API key 없이 UpstageClient, UpstageParseNode, UpstageOCRNode를 확인할 때 사용한다.
+
+    python -m app.parser.upstage_stub --port 8765 --fail-first 2
+    UPSTAGE_BASE_URL=http://127.0.0.1:8765/v1 uv run python -m uvicorn main:app
+
+또는 코드에서:
+
+    with UpstageStubServer(fail_first=1) as stub:
+        client = UpstageClient(base_url=stub.base_url)
+'''
+import json
+import time
+import argparse
+import threading
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+
+# 1x1 PNG
+STUB_PNG_BASE64 = "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR42mNkYPhfDwAChwGA60e6kgAAAABJRU5ErkJggg=="
+
+STUB_TABLE_MARKDOWN = (
+    "| 년도 | 학기 | 과목명 | 학점 | 성적 |\n"
+    "| --- | --- | --- | --- | --- |\n"
+    "| 2021 | 1 | 자료구조 | 3.0 | A+ |\n"
+    "| 2021 | 1 | 선형대수 | 3.0 | B0 |\n"
+)
+
+
+def document_parse_response() -> Dict:
+    return {
+        "api": "2.0",
+        "model": "document-parse-stub",
+        "usage": {"pages": 1},
+        "content": {"html": "", "markdown": "", "text": ""},
+        "elements": [
+            {
+                "id": 0,
+                "page": 1,
+                "category": "heading1",
+                "content": {"html": "<h1>성적증명서</h1>", "markdown": "# 성적증명서", "text": "성적증명서"},
+                "coordinates": [],
+            },
+            {
+                "id": 1,
+                "page": 1,
+                "category": "table",
+                "content": {"html": "<table></table>", "markdown": STUB_TABLE_MARKDOWN, "text": ""},
+                "base64_encoding": STUB_PNG_BASE64,
+                "coordinates": [],
+            },
+        ],
+    }
+
+
+def ocr_response() -> Dict:
+    rows = [
+        ("2021년도 1학기", 10, 10),
+        ("자료구조", 10, 30), ("A+", 200, 30), ("3.0", 260, 30),
+        ("선형대수", 10, 50), ("B0", 200, 50), ("3.0", 260, 50),
+        ("취득학점 6.0", 10, 80),
+    ]
+    words = [
+        {
+            "id": i,
+            "text": text,
+            "confidence": 0.99,
+            "boundingBox": {"vertices": [{"x": x, "y": y}, {"x": x + 40, "y": y}, {"x": x + 40, "y": y + 12}, {"x": x, "y": y + 12}]},
+        }
+        for i, (text, x, y) in enumerate(rows)
+    ]
+    return {
+        "apiVersion": "1.1",
+        "modelVersion": "ocr-stub",
+        "metadata": {"pages": [{"page": 1, "width": 300, "height": 100}]},
+        "numBilledPages": 1,
+        "pages": [{"id": 0, "width": 300, "height": 100, "text": " ".join(r[0] for r in rows), "words": words}],
+        "text": " ".join(r[0] for r in rows),
+    }
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    server: "UpstageStubServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _form_fields(self) -> Dict[str, str]:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length)
+        content_type = self.headers.get("Content-Type", "")
+        if not content_type.startswith("multipart/"):
+            return {}
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + body
+        )
+        fields = {}
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name and part.get_filename() is None:
+                fields[name] = part.get_payload(decode=True).decode("utf-8").strip()
+        return fields
+
+    def _send_json(self, status: int, payload: Dict, headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        fields = self._form_fields()
+        stub = self.server
+        with stub.lock:
+            stub.request_count += 1
+            should_fail = stub.request_count <= stub.fail_first
+
+        if stub.delay:
+            time.sleep(stub.delay)
+
+        if self.path.rstrip("/") != "/v1/document-digitization":
+            self._send_json(404, {"error": "not found"})
+            return
+        if should_fail:
+            self._send_json(stub.fail_status, {"error": "stub failure"}, headers={"Retry-After": "0"})
+            return
+        if fields.get("model") == "ocr":
+            self._send_json(200, ocr_response())
+        else:
+            self._send_json(200, document_parse_response())
+
+
+class UpstageStubServer(ThreadingHTTPServer):
+    '''
+    :param fail_first: 처음 n개의 요청은 fail_status로 응답 (retry 확인용)
+    :param delay: 요청마다 응답 전 대기 시간(초)
+    '''
+    daemon_threads = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, fail_first: int = 0, fail_status: int = 503, delay: float = 0.0):
+        super().__init__((host, port), _StubHandler)
+        self.fail_first = fail_first
+        self.fail_status = fail_status
+        self.delay = delay
+        self.request_count = 0
+        self.lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "UpstageStubServer":
+        self._thread = threading.Thread(target=self.serve_forever, name="upstage-stub", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+        if self._thread is not None:
+            self._thread.join()
+
+    def __enter__(self) -> "UpstageStubServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local stand-in for the Upstage document-digitization API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fail-first", type=int, default=0)
+    parser.add_argument("--fail-status", type=int, default=503)
+    parser.add_argument("--delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    server = UpstageStubServer(args.host, args.port, args.fail_first, args.fail_status, args.delay)
+    print(f"Upstage stub listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -2,12 +2,23 @@ from fastapi import FastAPI
 from app.api.route import router, CLIENT_DATA_DIR
 from dotenv import load_dotenv
 from fastapi.staticfiles import StaticFiles
+from app.core.graph_registry import graph_registry
+from app.api.upload import UploadSizeLimitMiddleware, max_upload_bytes
 
 load_dotenv()
 (CLIENT_DATA_DIR / "users").mkdir(parents=True, exist_ok=True)
 
 app = FastAPI()
 app.include_router(router)
+# 너무 큰 upload는 body를 받기 전에 413
+app.add_middleware(UploadSizeLimitMiddleware, max_bytes=max_upload_bytes())
+
+
+@app.on_event("startup")
+def compile_graphs():
+    # 요청마다 compile하지 않도록 graph를 startup 시점에 한 번 compile
+    graph_registry.warmup()
+
 app.mount(
     "/artifacts",
     StaticFiles(directory=str(CLIENT_DATA_DIR / "users")),
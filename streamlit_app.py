@@ -94,6 +94,11 @@ async def listen_to_websocket(placeholder, session_id):
                 if data.get("event") == "keepalive":
                     continue
 
+                # server job queue is full: show position until the run starts
+                if data.get("event") == "queued":
+                    placeholder.text(f"Waiting in {data.get('queue', '')} queue… (position {data.get('position')})")
+                    continue
+
                 if "name" in data and "status" in data:
                     status = data["status"]
                     if status == "start":
@@ -105,6 +110,17 @@ async def listen_to_websocket(placeholder, session_id):
                             placeholder.text(f"Processing: {data['name']}… ({comp}/{total})")
                         else:
                             placeholder.text(f"Processing: {data['name']}…")
+                    elif status == "partial":
+                        kind = data.get("kind")
+                        if kind == "transcript_text":
+                            preview = (data.get("transcript_text") or "")[:500]
+                            placeholder.text(f"Parsed transcript (extracting JSON…):\n{preview}")
+                        elif kind == "course":
+                            course = data.get("course") or {}
+                            placeholder.text(f"Extracting: {course.get('name', '')} {course.get('grade', '')}")
+                        elif kind == "semester":
+                            semester = data.get("semester") or {}
+                            placeholder.text(f"Extracted: {semester.get('year', '')} {semester.get('semester', '')}")
                     elif status == "end":
                         if "duration" in data:
                             placeholder.text(f"Finished: {data['name']} in {data['duration']}s")
@@ -121,30 +137,50 @@ async def listen_to_websocket(placeholder, session_id):
         pass
 
 
+async def _run_job(client: httpx.AsyncClient, submitted: httpx.Response) -> dict:
+    # job으로 제출하고 끝날 때까지 상태를 polling (긴 요청 하나를 붙잡고 있지 않음)
+    submitted.raise_for_status()
+    job_id = submitted.json()["job_id"]
+    st.session_state.last_job_id = job_id
+    while True:
+        status = (await client.get(f"{BACKEND_URL}/jobs/{job_id}")).json().get("status")
+        if status in ("succeeded", "failed", "cancelled"):
+            break
+        await asyncio.sleep(1.0)
+    response = await client.get(f"{BACKEND_URL}/jobs/{job_id}/result")
+    response.raise_for_status()
+    return response.json()
+
+
+async def _follow_with_websocket(placeholder, call) -> None:
+    # 결과가 먼저 오면(캐시 hit 등으로 eof를 놓친 경우) WebSocket 대기를 오래 끌지 않는다
+    listener = asyncio.create_task(listen_to_websocket(placeholder, session_id))
+    try:
+        await call()
+    finally:
+        try:
+            await asyncio.wait_for(listener, timeout=2.0)
+        except asyncio.TimeoutError:
+            pass
+
+
 async def parse_with_backend(file, placeholder) -> None: 
 
     async def _upload_pdf(): 
         files = {"file": (file.name, file.getvalue(), "application/pdf")} 
-        async with httpx.AsyncClient(timeout=300) as client: 
-            response = await client.post(f"{BACKEND_URL}/upload/{session_id}", files=files) 
-            response.raise_for_status() 
-            data = response.json() 
+        async with httpx.AsyncClient(timeout=30) as client: 
+            data = await _run_job(client, await client.post(f"{BACKEND_URL}/jobs/upload/{session_id}", files=files))
             st.session_state.final_text = data.get("final_result") 
-    await asyncio.gather(
-        listen_to_websocket(placeholder, session_id),
-        _upload_pdf()
-    )
+    await _follow_with_websocket(placeholder, _upload_pdf)
 
 async def run_analysis(transcript_payload: dict, report_placeholder):
     spec = build_analysis_spec_from_session_state()
     async def _call_analyze():
-        async with httpx.AsyncClient(timeout=600) as client:
-            response = await client.post(
-                f"{BACKEND_URL}/analyze/{session_id}",
+        async with httpx.AsyncClient(timeout=30) as client:
+            response_state = await _run_job(client, await client.post(
+                f"{BACKEND_URL}/jobs/analyze/{session_id}",
                 json={"transcript": transcript_payload, "analyst": spec, "url": PUBLIC_BACKEND_URL}
-            )
-        response.raise_for_status()
-        response_state = response.json()
+            ))
         st.session_state.analysis_report = response_state.get("report")
         cost = response_state.get("cost", 0.0)
         st.session_state.cost = cost
@@ -155,10 +191,7 @@ async def run_analysis(transcript_payload: dict, report_placeholder):
         report_path.parent.mkdir(parents=True, exist_ok=True)
         with open(report_path, "w") as f:
             f.write(response_state.get("report"))
-    await asyncio.gather(
-        listen_to_websocket(report_placeholder, session_id),
-        _call_analyze()
-    )
+    await _follow_with_websocket(report_placeholder, _call_analyze)
 
 
 st.title("📄 Transcript Insight")